@@ -16,4 +16,5 @@ from .agents.oas_discovery import OASDiscoveryAgent
 from .agents.oas_retrieval import OASRetrievalAgent
 from .agents.pre_research import PreResearchAgent
 from .agents.product_requirements import ProductReqResearchAgent
+from .agents.requirements_research import RequirementsResearchAgent
 from .state import State
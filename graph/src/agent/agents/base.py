@@ -1,4 +1,20 @@
+from __future__ import annotations
+
+import hashlib
+import json
 from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Optional
+
+from gpt_researcher.config import Config
+
+from ..metrics import attach_timers
+from ..utils import prompt_cache_kwargs
+
+if TYPE_CHECKING:
+    from gpt_researcher import GPTResearcher
+
+    from ..embedding_cache import EmbeddingCache
+    from ..sources import SourceStore
 
 
 class ResearchAgent(ABC):
@@ -13,7 +29,75 @@ class ResearchAgent(ABC):
         self.service_name = service_name
         self.prompt = prompt
         self.source_urls = source_urls
+        self.source_store: Optional[SourceStore] = None
+        self.embedding_cache: Optional[EmbeddingCache] = None
 
     @abstractmethod
     async def research(self) -> tuple[str, str]:
         pass
+
+    def share_resources(self, researcher: GPTResearcher) -> None:
+        """
+        Serve the researcher's scraping from the run's source store and its
+        embeddings from the embedding cache, when they are set, and time its
+        searches and scraping for the node metrics.
+        """
+        attach_timers(researcher)
+        if self.source_store is not None:
+            self.source_store.attach(researcher)
+        if self.embedding_cache is not None:
+            self.embedding_cache.attach(researcher)
+
+    def cache_report_prompt(
+        self, researcher: GPTResearcher, system_prompt: str
+    ) -> None:
+        """
+        Mark the researcher's role, the system message of its report-writing
+        call, as a cacheable prompt prefix for that call only. The researcher's
+        other calls keep their own system messages.
+        """
+        cache_kwargs = prompt_cache_kwargs(researcher.cfg, system_prompt)
+        if not cache_kwargs:
+            return
+        write_report = researcher.write_report
+
+        async def cached_write_report(*args: Any, **kwargs: Any) -> str:
+            llm_kwargs = researcher.cfg.llm_kwargs
+            researcher.cfg.llm_kwargs = {
+                **llm_kwargs,
+                "model_kwargs": {
+                    **llm_kwargs.get("model_kwargs", {}),
+                    **cache_kwargs["model_kwargs"],
+                },
+            }
+            try:
+                return await write_report(*args, **kwargs)
+            finally:
+                researcher.cfg.llm_kwargs = llm_kwargs
+
+        researcher.write_report = cached_write_report
+
+    def cache_fields(self) -> dict[str, Any]:
+        """
+        Everything the research result depends on. Subclasses add their extra inputs.
+        """
+        config = Config()
+        return {
+            "agent": type(self).__name__,
+            "service_name": self.service_name,
+            "prompt": self.prompt,
+            "source_urls": self.source_urls,
+            "models": [
+                self.agent_model,
+                config.fast_llm,
+                config.smart_llm,
+                config.strategic_llm,
+            ],
+        }
+
+    def cache_key(self) -> str:
+        """
+        Content address of the research result.
+        """
+        fields = json.dumps(self.cache_fields(), sort_keys=True, default=str)
+        return hashlib.sha256(fields.encode()).hexdigest()
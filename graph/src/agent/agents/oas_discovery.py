@@ -1,11 +1,14 @@
+from typing import Any, Optional
+
 from gpt_researcher import GPTResearcher
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
-from graph.src.prompts.oas_discovery import oas_discovery_prompt, role_prompt
+from graph.src.prompts.oas_discovery import oas_discovery_prompt, oas_url_list_prompt
 
+from ..configuration import Configuration
+from ..llm import get_chat_model
 from .base import ResearchAgent
 
 
@@ -14,51 +17,51 @@ class OASDiscoveryAgent(ResearchAgent):
     Agent that conducts OAS discovery.
     """
 
-    def __init__(self, agent_model: str, service_name: str):
+    def __init__(
+        self,
+        agent_model: str,
+        service_name: str,
+        configuration: Optional[Configuration] = None,
+    ):
         super().__init__(
             agent_model=agent_model,
             service_name=service_name,
             prompt=oas_discovery_prompt(service_name=service_name),
             source_urls=None,
         )
+        self.configuration = configuration or Configuration()
+
+    def cache_fields(self) -> dict[str, Any]:
+        return {
+            **super().cache_fields(),
+            "oas_url_model": self.configuration.oas_url_model,
+            "oas_url_prompt": oas_url_list_prompt(service_name=self.service_name),
+        }
 
     async def research(self) -> tuple[str, str]:
         researcher = GPTResearcher(
             query=self.prompt,
             report_type="custom_report",
         )
+        self.share_resources(researcher)
 
         research_result = await researcher.conduct_research()
         report = await researcher.write_report()
 
-        oas_url_list = self._get_oas_url(report)
+        oas_url_list = await self._get_oas_url(report)
         return report, oas_url_list
 
-    def _get_oas_url(self, research_result: str) -> str:
-        client = ChatOpenAI(
-            model="gpt-4o-search-preview",
+    async def _get_oas_url(self, research_result: str) -> str:
+        client = get_chat_model(
+            self.configuration.oas_url_model,
+            self.configuration,
             web_search_options={"search_context_size": "high"},
         )
 
         prompt = PromptTemplate.from_template(
-            role_prompt(service_name=self.service_name)
-            + """
-            
-            List the most likely URLs with the official documentation for the latest OAS spec of this service, and explain why.
-
-            Format as properly formatted MarkDown that includes the following keys: 
-            - "url": Return only the URL
-            - "confidence_level": Numeric confidence level: 1-4 (1 is lowest, 4 is highest)
-            - "popularity": URL popularity as per Google rank: 1-4 (1 is lowest, 4 is highest)
-            - "validated": Did you validate that OAS available through a web request? 1 = True, 0 = False
-            - "explanation": Detailed explanation
-
-            <research_result>
-            {research_result}
-            </research_result>
-            """
+            oas_url_list_prompt(service_name=self.service_name)
         )
 
         chain = prompt | client | StrOutputParser()
-        response = chain.invoke(research_result)
+        response = await chain.ainvoke(research_result)
         return response
@@ -25,6 +25,7 @@ class OASRetrievalAgent(ResearchAgent):
             agent=self.agent_model,
             source_urls=self.source_urls,
         )
+        self.share_resources(researcher)
 
         research_result = await researcher.conduct_research()
         report = await researcher.write_report()
@@ -1,33 +1,100 @@
+import asyncio
+import hashlib
+from typing import Any, Optional
+
 from gpt_researcher import GPTResearcher
 
-from graph.src.prompts.pre_research import pre_research_prompt
+from graph.src.agent.utils import count_tokens, split_into_chunks
+from graph.src.prompts.pre_research import (
+    pre_research_chunk_prompt,
+    pre_research_prompt,
+)
 
+from ..configuration import Configuration
+from ..llm import get_chat_model
 from .base import ResearchAgent
 
 
 class PreResearchAgent(ResearchAgent):
     """
     Agent that conducts pre-research, finding relevant endpoints and resources.
+
+    Documents larger than `chunk_tokens` are split into chunks whose endpoints are
+    extracted in parallel, and the research runs over the merged extractions.
+    The document is only put in the prompt once the research starts, so the
+    prompt of a large document is never built in full.
     """
 
-    def __init__(self, agent_model: str, service_name: str, html: str):
+    def __init__(
+        self,
+        agent_model: str,
+        service_name: str,
+        html: str,
+        chunk_tokens: int = 24000,
+        concurrency: int = 4,
+        chunk_model: str = "gpt-4o-mini",
+        configuration: Optional[Configuration] = None,
+    ):
         super().__init__(
             agent_model=agent_model,
             service_name=service_name,
-            prompt=pre_research_prompt(html),
+            prompt=pre_research_prompt(""),
             source_urls=None,
         )
+        self.html = html
+        self.chunk_tokens = chunk_tokens
+        self.concurrency = concurrency
+        self.chunk_model = chunk_model
+        self.configuration = configuration or Configuration()
+
+    def cache_fields(self) -> dict[str, Any]:
+        return {
+            **super().cache_fields(),
+            "html": hashlib.sha256(self.html.encode()).hexdigest(),
+            "chunk_tokens": self.chunk_tokens,
+            "chunk_model": self.chunk_model,
+            "chunk_prompt": pre_research_chunk_prompt("", 0, 0),
+        }
 
     async def research(self) -> tuple[str, str]:
+        document = self.html
+        if count_tokens(self.html) > self.chunk_tokens:
+            document = await self._extract_endpoints()
+
         researcher = GPTResearcher(
-            query=self.prompt,
+            query=pre_research_prompt(document),
             report_type="custom_report",
             agent=self.agent_model,
             source_urls=self.source_urls,
             verbose=True,
         )
+        self.share_resources(researcher)
 
         research_result = await researcher.conduct_research()
         report = await researcher.write_report()
 
         return research_result, report
+
+    async def _extract_endpoints(self) -> str:
+        chunks = split_into_chunks(self.html, self.chunk_tokens)
+        print(f"Extracting endpoints from {len(chunks)} chunks...")
+
+        llm = get_chat_model(self.chunk_model, self.configuration, temperature=0)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def extract(index: int, chunk: str) -> str:
+            async with semaphore:
+                response = await llm.ainvoke(
+                    pre_research_chunk_prompt(chunk, index, len(chunks))
+                )
+            return response.content
+
+        extractions = await asyncio.gather(
+            *(extract(index, chunk) for index, chunk in enumerate(chunks, start=1))
+        )
+
+        return "\n\n".join(
+            extraction
+            for extraction in extractions
+            if extraction.strip().strip('"') != "None"
+        )
@@ -0,0 +1,62 @@
+from typing import Any, Optional
+
+from graph.src.prompts.dev_req_research import dev_req_research_prompt
+from graph.src.prompts.product_req_research import product_req_research_prompt
+
+from ..configuration import Configuration
+from .dev_requirement_research import DevReqResearchAgent
+from .product_requirements import ProductReqResearchAgent
+from .sdk_research import SDKResearchAgent
+
+
+class RequirementsResearchAgent(SDKResearchAgent):
+    """
+    Agent that gathers the research context of both the product and developer
+    requirements reports, so their sources are scraped and compressed once.
+    """
+
+    sdk_capabilities = tuple(
+        dict.fromkeys(
+            ProductReqResearchAgent.sdk_capabilities
+            + DevReqResearchAgent.sdk_capabilities
+        )
+    )
+    sdk_excluded_schemas = tuple(
+        set(ProductReqResearchAgent.sdk_excluded_schemas)
+        & set(DevReqResearchAgent.sdk_excluded_schemas)
+    )
+
+    def __init__(
+        self,
+        agent_model: str,
+        service_name: str,
+        source_urls: list[str],
+        pre_research: str,
+        configuration: Optional[Configuration] = None,
+    ):
+        super().__init__(
+            agent_model=agent_model,
+            service_name=service_name,
+            prompt=product_req_research_prompt(service_name=service_name),
+            source_urls=source_urls,
+            pre_research=pre_research,
+            configuration=configuration,
+        )
+        self.dev_prompt = dev_req_research_prompt()
+
+    def instruction_prompts(self) -> dict[str, str]:
+        return {"product_req_prompt": self.prompt, "dev_req_prompt": self.dev_prompt}
+
+    def cache_fields(self) -> dict[str, Any]:
+        return {**super().cache_fields(), "dev_prompt": self.dev_prompt}
+
+    async def research(self) -> tuple[str, str]:
+        """
+        Return the research context and the list of visited sources.
+        """
+        researcher = self.create_researcher()
+        context = await researcher.conduct_research()
+        if not isinstance(context, str):
+            context = "\n\n".join(str(item) for item in context)
+
+        return context, "\n".join(sorted(researcher.visited_urls))
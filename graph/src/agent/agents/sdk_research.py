@@ -0,0 +1,108 @@
+from typing import Any, Optional
+
+from gpt_researcher import GPTResearcher
+from gpt_researcher.config import Config
+
+from graph.src.agent.utils import compose_prompt
+from graph.src.prompts.sdk_open_api import (
+    connector_target_prompt,
+    initial_read_prompt,
+    sdk_spec_prompt,
+)
+
+from ..configuration import Configuration
+from ..metrics import record_prompt_tokens
+from .base import ResearchAgent
+
+
+class SDKResearchAgent(ResearchAgent):
+    """
+    Base class of the requirements research agents, which research a service
+    for a connector against the Lumos connector spec.
+    """
+
+    # The SDK capabilities and models the research is about.
+    sdk_capabilities: tuple[str, ...] = ()
+    sdk_excluded_schemas: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        agent_model: str,
+        service_name: str,
+        prompt: str,
+        source_urls: list[str],
+        pre_research: str,
+        configuration: Optional[Configuration] = None,
+        context: str = "",
+    ):
+        super().__init__(
+            agent_model=agent_model,
+            service_name=service_name,
+            prompt=prompt,
+            source_urls=source_urls,
+        )
+        self.pre_research = pre_research
+        self.configuration = configuration or Configuration()
+        self.context = context
+
+    def instruction_prompts(self) -> dict[str, str]:
+        """
+        The instruction prompts of the research, as `compose_prompt` sections.
+        """
+        return {}
+
+    def cache_fields(self) -> dict[str, Any]:
+        return {
+            **super().cache_fields(),
+            "pre_research": self.pre_research,
+            "context": self.context,
+            "prompt_token_budget": self.configuration.prompt_token_budget,
+            "sdk_prompt": initial_read_prompt(
+                service_name=self.service_name,
+                capabilities=self.sdk_capabilities,
+                excluded_schemas=self.sdk_excluded_schemas,
+            ),
+        }
+
+    def create_researcher(self) -> GPTResearcher:
+        """
+        Create the researcher, with a query composed within the prompt budget.
+        """
+        # The connector spec is the same for every service, so it is sent as the
+        # system prompt where provider prompt caches can reuse it across runs.
+        # Setting the role also skips GPT Researcher's agent selection call.
+        sdk_prompt = sdk_spec_prompt(self.sdk_capabilities, self.sdk_excluded_schemas)
+        prompt = compose_prompt(
+            pre_research=self.pre_research,
+            sdk_prompt=connector_target_prompt(service_name=self.service_name),
+            **self.instruction_prompts(),
+            max_tokens=self.configuration.prompt_token_budget,
+            model=Config().smart_llm_model,
+            system_prompt=sdk_prompt,
+        )
+        breakdown = prompt.breakdown()
+        record_prompt_tokens(type(self).__name__, breakdown)
+        print(f"{type(self).__name__} prompt tokens: {breakdown}")
+
+        researcher = GPTResearcher(
+            query=prompt.text,
+            report_type="custom_report",
+            agent=self.agent_model,
+            role=sdk_prompt,
+            source_urls=self.source_urls,
+        )
+        self.share_resources(researcher)
+        self.cache_report_prompt(researcher, sdk_prompt)
+        return researcher
+
+    async def research(self) -> tuple[str, str]:
+        researcher = self.create_researcher()
+        if self.context:
+            # The sources were already researched once for both reports.
+            research_result = self.context
+            report = await researcher.write_report(ext_context=self.context)
+        else:
+            research_result = await researcher.conduct_research()
+            report = await researcher.write_report()
+
+        return research_result, report
@@ -0,0 +1,89 @@
+"""Run outputs stored per service and thread, deduplicated by content hash."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+from .configuration import Configuration
+from .utils import slugify
+
+
+class ArtifactStore:
+    """Content-addressed objects with a directory of named files per run.
+
+    Each distinct content is written once under `objects/`, and the files of a
+    run, `runs/<service>/<thread id>/<name>`, are hard links to it. Writes go
+    through a temporary file and an atomic rename in a worker thread, so they
+    never block the event loop and readers never see a partial file.
+    """
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+
+    @classmethod
+    def from_configuration(cls, configuration: Configuration) -> ArtifactStore:
+        return cls(configuration.artifacts_dir)
+
+    def run_dir(self, service_name: str, run_id: str) -> Path:
+        """The directory holding the files of one run of a service."""
+        return (
+            self.root
+            / "runs"
+            / slugify(service_name, "service")
+            / slugify(run_id, "default")
+        )
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    @staticmethod
+    def _replace(path: Path, write) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            self._replace(path, lambda tmp_path: tmp_path.write_bytes(data))
+        return digest
+
+    def _write(self, path: Path, data: bytes) -> str:
+        digest = self._put(data)
+        target = self._object_path(digest)
+
+        def link(tmp_path: Path) -> None:
+            try:
+                os.link(target, tmp_path)
+            except OSError:
+                # Filesystems without hard links get a copy instead.
+                tmp_path.write_bytes(data)
+
+        self._replace(path, link)
+        return digest
+
+    async def put(self, content: str) -> str:
+        """Store content once and return its hash."""
+        return await asyncio.to_thread(self._put, content.encode())
+
+    async def get(self, digest: str) -> str:
+        """Read the content stored under a hash."""
+        data = await asyncio.to_thread(self._object_path(digest).read_bytes)
+        return data.decode()
+
+    async def write(
+        self, service_name: str, run_id: str, name: str, content: str
+    ) -> Path:
+        """Write a named file of a run, sharing storage with identical content."""
+        path = self.run_dir(service_name, run_id) / name
+        await asyncio.to_thread(self._write, path, content.encode())
+        return path
@@ -0,0 +1,118 @@
+"""Run the research graph over many services concurrently."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from .sources import release_source_store
+from .utils import slugify
+
+SERVICE_NAME_KEYS = ("input", "service_name", "service", "name")
+
+
+@dataclass
+class BatchResult:
+    """The outcome of researching a single service in a batch."""
+
+    service_name: str
+    thread_id: str
+    status: str
+    duration: float
+    error: str = ""
+
+
+def load_services(path: str | Path, key: Optional[str] = None) -> list[str]:
+    """Load service names from a JSONL or plain text file.
+
+    Each non-empty line is either a JSON string, a JSON object holding the
+    service name under `key` (or one of `SERVICE_NAME_KEYS`), or plain text.
+    """
+    service_names = []
+    for line in Path(path).read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line[0] in '{"':
+            service_names.append(_service_name_from_json(json.loads(line), key))
+        else:
+            service_names.append(line)
+
+    return service_names
+
+
+def _service_name_from_json(record: Any, key: Optional[str]) -> str:
+    if isinstance(record, str):
+        return record
+
+    for candidate in (key,) if key else SERVICE_NAME_KEYS:
+        if record.get(candidate):
+            return str(record[candidate])
+
+    raise ValueError(f"No service name found in batch record: {record}")
+
+
+def new_thread_id(service_name: str) -> str:
+    """Create a unique, readable thread id for a service run."""
+    return f"{slugify(service_name, 'service')}-{uuid.uuid4().hex[:8]}"
+
+
+async def run_batch(
+    compiled_graph, service_names: Iterable[str], concurrency: int = 4
+) -> list[BatchResult]:
+    """Research every service on its own thread, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_service(service_name: str) -> BatchResult:
+        thread_id = new_thread_id(service_name)
+        async with semaphore:
+            print(f"Researching {service_name} on thread {thread_id}...")
+            started = time.perf_counter()
+            try:
+                await compiled_graph.ainvoke(
+                    {"input": service_name},
+                    {"configurable": {"thread_id": thread_id}},
+                )
+            except Exception as e:
+                print(f"Error researching {service_name}: {e}")
+                return BatchResult(
+                    service_name=service_name,
+                    thread_id=thread_id,
+                    status="error",
+                    duration=time.perf_counter() - started,
+                    error=str(e),
+                )
+            finally:
+                release_source_store(thread_id)
+
+            return BatchResult(
+                service_name=service_name,
+                thread_id=thread_id,
+                status="success",
+                duration=time.perf_counter() - started,
+            )
+
+    return await asyncio.gather(*(run_service(name) for name in service_names))
+
+
+def write_summary(
+    results: list[BatchResult], path: str | Path, wall_time: float
+) -> None:
+    """Write the per-service status and timings of a batch as JSON."""
+    summary = {
+        "total": len(results),
+        "succeeded": sum(1 for result in results if result.status == "success"),
+        "failed": sum(1 for result in results if result.status == "error"),
+        "wall_time": wall_time,
+        "services": [asdict(result) for result in results],
+    }
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(summary, indent=2))
@@ -0,0 +1,364 @@
+r"""Benchmark the research graph offline by replaying recorded fixtures.
+
+Record the fixtures of a few services once, with network access:
+
+    python -m graph.src.agent.benchmark services.txt --record
+
+Then replay them as often as needed, without any network access, to measure
+the latency and memory of each node:
+
+    python -m graph.src.agent.benchmark services.txt --repeat 5 \
+        --baseline my-docs/benchmark.json --max-regression 0.2
+
+Since replayed responses arrive instantly, the time a node takes is the
+overhead of orchestration and local work, the part this code controls.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from .batch import load_services, new_thread_id
+from .browser import close_browser_pool
+from .embedding_cache import close_embedding_caches
+from .fetch import close_http_client
+from .graph import graph
+from .llm import close_chat_models
+from .replay import use_cassette
+from .sources import close_source_stores, release_source_store
+from .utils import slugify
+
+# Every cache is off, so that each run does, and records, the whole work.
+BENCHMARK_CONFIGURABLE = {
+    "checkpointer": "memory",
+    "result_cache": False,
+    "http_cache": False,
+    "llm_cache": False,
+    "embedding_cache": False,
+    "source_store_persistent": False,
+}
+
+
+@dataclass
+class NodeStats:
+    """Latency and retained memory of a node over every measured run."""
+
+    runs: int
+    mean: float
+    p50: float
+    p95: float
+    max: float
+    retained_bytes: Optional[int] = None
+
+
+@dataclass
+class BenchmarkReport:
+    """The outcome of replaying the fixtures of a set of services."""
+
+    services: list[str]
+    repeat: int
+    nodes: dict[str, NodeStats]
+    wall_time: NodeStats
+    recorded_network_time: float
+    replayed_requests: int
+    max_rss_bytes: Optional[int]
+    peak_traced_bytes: Optional[int] = None
+    errors: list[str] = field(default_factory=list)
+
+
+def benchmark_configurable(artifacts_dir: str) -> dict[str, Any]:
+    """The configuration of benchmark runs writing their artifacts to a directory."""
+    # The metrics of benchmark runs must not add up with those of real runs.
+    return {
+        **BENCHMARK_CONFIGURABLE,
+        "artifacts_dir": artifacts_dir,
+        "metrics_file": str(Path(artifacts_dir) / "metrics.prom"),
+    }
+
+
+def fixture_path(fixtures_dir: str | Path, service_name: str) -> Path:
+    """Where the fixture of a service is recorded."""
+    return Path(fixtures_dir) / f"{slugify(service_name, 'service')}.json"
+
+
+def _stats(durations: list[float], retained: Optional[list[int]] = None) -> NodeStats:
+    ordered = sorted(durations)
+    return NodeStats(
+        runs=len(ordered),
+        mean=statistics.fmean(ordered),
+        p50=statistics.median(ordered),
+        p95=ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))],
+        max=ordered[-1],
+        retained_bytes=int(statistics.fmean(retained)) if retained else None,
+    )
+
+
+def _max_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        # Unix only.
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+async def run_once(
+    compiled_graph, service_name: str, configurable: dict[str, Any]
+) -> tuple[float, dict[str, float], dict[str, int]]:
+    """Run the graph for a service, timing every node from its events.
+
+    Returns the wall time of the run, and the time taken and the memory
+    retained (when tracing allocations) by each node.
+    """
+    thread_id = new_thread_id(service_name)
+    config = {"configurable": {**configurable, "thread_id": thread_id}}
+    started: dict[str, tuple[float, int]] = {}
+    durations: dict[str, float] = {}
+    retained: dict[str, int] = {}
+
+    run_started = time.perf_counter()
+    try:
+        async for event in compiled_graph.astream_events(
+            {"input": service_name}, config, version="v2"
+        ):
+            node = event["metadata"].get("langgraph_node")
+            # Only the node runnables themselves, not the chains they run.
+            if event["name"] != node or node == "__start__":
+                continue
+
+            traced = tracemalloc.get_traced_memory()[0]
+            if event["event"] == "on_chain_start":
+                started[event["run_id"]] = (time.perf_counter(), traced)
+            elif event["event"] == "on_chain_end":
+                node_started, node_traced = started.pop(event["run_id"])
+                durations[node] = time.perf_counter() - node_started
+                retained[node] = traced - node_traced
+    finally:
+        release_source_store(thread_id)
+
+    return time.perf_counter() - run_started, durations, retained
+
+
+async def record(compiled_graph, service_names: list[str], fixtures_dir: str) -> None:
+    """Run every service against the network, recording its fixture."""
+    with tempfile.TemporaryDirectory() as artifacts_dir:
+        configurable = benchmark_configurable(artifacts_dir)
+        for service_name in service_names:
+            path = fixture_path(fixtures_dir, service_name)
+            with use_cassette(path, mode="record") as cassette:
+                wall_time, _, _ = await run_once(
+                    compiled_graph, service_name, configurable
+                )
+            print(
+                f"Recorded {cassette.recorded} requests for {service_name} "
+                f"in {wall_time:.1f}s to {path}"
+            )
+
+
+async def replay(
+    compiled_graph,
+    service_names: list[str],
+    fixtures_dir: str,
+    repeat: int = 3,
+    warmup: int = 1,
+    trace_memory: bool = False,
+) -> BenchmarkReport:
+    """Replay the fixture of every service `repeat` times, after `warmup` runs."""
+    node_durations: dict[str, list[float]] = {}
+    node_retained: dict[str, list[int]] = {}
+    wall_times: list[float] = []
+    recorded_network_time = 0.0
+    replayed_requests = 0
+    errors = []
+
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as artifacts_dir:
+            configurable = benchmark_configurable(artifacts_dir)
+            for service_name in service_names:
+                path = fixture_path(fixtures_dir, service_name)
+                for run in range(warmup + repeat):
+                    with use_cassette(path, mode="replay") as cassette:
+                        try:
+                            wall_time, durations, retained = await run_once(
+                                compiled_graph, service_name, configurable
+                            )
+                        except Exception as e:
+                            print(f"Error replaying {service_name}: {e}")
+                            errors.append(f"{service_name}: {e}")
+                            break
+
+                    if run < warmup:
+                        continue
+                    wall_times.append(wall_time)
+                    recorded_network_time += cassette.network_time
+                    replayed_requests += cassette.replayed
+                    for node, duration in durations.items():
+                        node_durations.setdefault(node, []).append(duration)
+                        if trace_memory:
+                            node_retained.setdefault(node, []).append(retained[node])
+
+        peak_traced_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    return BenchmarkReport(
+        services=service_names,
+        repeat=repeat,
+        nodes={
+            node: _stats(durations, node_retained.get(node))
+            for node, durations in node_durations.items()
+        },
+        wall_time=_stats(wall_times or [0.0]),
+        recorded_network_time=recorded_network_time / max(len(wall_times), 1),
+        replayed_requests=replayed_requests,
+        max_rss_bytes=_max_rss_bytes(),
+        peak_traced_bytes=peak_traced_bytes,
+        errors=errors,
+    )
+
+
+def print_report(report: BenchmarkReport) -> None:
+    """Print the latency of every node and the memory used."""
+    print(f"{'node':<24} {'runs':>5} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}")
+    rows = [*report.nodes.items(), ("total", report.wall_time)]
+    for node, stats in rows:
+        print(
+            f"{node:<24} {stats.runs:>5} {stats.mean:>7.3f}s {stats.p50:>7.3f}s "
+            f"{stats.p95:>7.3f}s {stats.max:>7.3f}s"
+        )
+    print(
+        f"Network time of the recorded runs: {report.recorded_network_time:.1f}s, "
+        f"{report.replayed_requests} requests replayed"
+    )
+    if report.max_rss_bytes is not None:
+        print(f"Max RSS: {report.max_rss_bytes / 2**20:.1f} MiB")
+    if report.peak_traced_bytes is not None:
+        print(f"Peak traced memory: {report.peak_traced_bytes / 2**20:.1f} MiB")
+
+
+def find_regressions(
+    report: BenchmarkReport, baseline: dict[str, Any], max_regression: float
+) -> list[str]:
+    """Nodes whose mean latency grew by more than `max_regression` (a fraction)."""
+    regressions = []
+    current = {**report.nodes, "total": report.wall_time}
+    previous = {**baseline["nodes"], "total": baseline["wall_time"]}
+    for node, stats in current.items():
+        if node not in previous or not previous[node]["mean"]:
+            continue
+        change = stats.mean / previous[node]["mean"] - 1
+        if change > max_regression:
+            regressions.append(
+                f"{node}: {previous[node]['mean']:.3f}s -> {stats.mean:.3f}s "
+                f"(+{change:.0%})"
+            )
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    """Record or replay the fixtures, returning the exit status."""
+    service_names = load_services(args.services, key=args.key)
+    compiled_graph = graph()
+    try:
+        if args.record:
+            await record(compiled_graph, service_names, args.fixtures)
+            return 0
+
+        report = await replay(
+            compiled_graph,
+            service_names,
+            args.fixtures,
+            repeat=args.repeat,
+            warmup=args.warmup,
+            trace_memory=args.memory,
+        )
+    finally:
+        await close_browser_pool()
+        await close_http_client()
+        await close_chat_models()
+        close_source_stores()
+        close_embedding_caches()
+
+    # The baseline is read first, as it may be the report about to be replaced.
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    print_report(report)
+    if args.output:
+        path = Path(args.output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(asdict(report), indent=2))
+        print(f"Report written to {path}")
+
+    if report.errors:
+        return 1
+    if baseline:
+        regressions = find_regressions(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"Regression in {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the research graph on recorded fixtures."
+    )
+    parser.add_argument(
+        "services", help="JSONL or text file with one service name per line"
+    )
+    parser.add_argument(
+        "--key", help="JSON field holding the service name in each record"
+    )
+    parser.add_argument(
+        "--fixtures",
+        default="my-docs/fixtures",
+        help="Directory holding one recorded fixture per service",
+    )
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="Run against the network and record the fixtures instead",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Measured runs per service"
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="Unmeasured runs per service first"
+    )
+    parser.add_argument(
+        "--memory",
+        action="store_true",
+        help="Trace allocations to report the memory retained by each node",
+    )
+    parser.add_argument(
+        "--output",
+        default="my-docs/benchmark.json",
+        help="Where to write the report as JSON",
+    )
+    parser.add_argument(
+        "--baseline", help="A previous report to compare the node latencies to"
+    )
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="Fail when a node is slower than the baseline by this fraction",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,62 @@
+"""Keep large state fields out of checkpoints by storing them as blob references."""
+
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from .artifacts import ArtifactStore
+from .configuration import Configuration
+
+BLOB_REF_PREFIX = "blob:sha256:"
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REF_PREFIX)
+
+
+class BlobStore:
+    """Swaps strings of at least `min_bytes` for references to stored objects.
+
+    Objects live in the artifact store, so a report referenced from the state
+    shares its storage with the report file written for the run.
+    """
+
+    def __init__(self, artifacts: ArtifactStore, min_bytes: int):
+        self.artifacts = artifacts
+        self.min_bytes = min_bytes
+
+    @classmethod
+    def from_configuration(cls, configuration: Configuration) -> BlobStore:
+        return cls(
+            ArtifactStore.from_configuration(configuration),
+            min_bytes=configuration.state_blob_min_bytes,
+        )
+
+    async def ref(self, value: Any) -> Any:
+        """Return a reference to a large string, or the value itself."""
+        if not isinstance(value, str) or is_blob_ref(value):
+            return value
+        if len(value.encode()) < self.min_bytes:
+            return value
+        return BLOB_REF_PREFIX + await self.artifacts.put(value)
+
+    async def resolve(self, value: Any) -> Any:
+        """Return the string a reference points to, or the value itself."""
+        if not is_blob_ref(value):
+            return value
+        return await self.artifacts.get(value[len(BLOB_REF_PREFIX) :])
+
+    async def slim(self, update: dict[str, Any]) -> dict[str, Any]:
+        """Replace the large strings of a state update with references."""
+        return {key: await self.ref(value) for key, value in update.items()}
+
+    async def resolve_all(self, values: dict[str, Any]) -> dict[str, Any]:
+        """Resolve every reference of a state, e.g. the final output of a run."""
+        return {key: await self.resolve(value) for key, value in values.items()}
+
+
+def get_blob_store(configuration: Configuration) -> Optional[BlobStore]:
+    """Return the blob store when large state fields are stored by reference."""
+    if not configuration.state_blobs:
+        return None
+    return BlobStore.from_configuration(configuration)
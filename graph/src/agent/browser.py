@@ -0,0 +1,120 @@
+"""A long-lived headless browser shared by every run in the process."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from .configuration import Configuration
+
+
+class BrowserPool:
+    """A single Chromium instance with a bounded, recycled set of pages.
+
+    The browser is launched on first use and relaunched if it disconnects.
+    At most `max_pages` pages are in use at once, and each page is closed
+    after `page_max_uses` navigations to keep memory in check.
+    """
+
+    def __init__(
+        self, headless: bool = True, max_pages: int = 4, page_max_uses: int = 20
+    ):
+        self.headless = headless
+        self.max_pages = max_pages
+        self.page_max_uses = page_max_uses
+
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._idle_pages: list[tuple[object, int]] = []
+        self._lock = asyncio.Lock()
+        self._semaphore = asyncio.Semaphore(max_pages)
+
+    async def _get_context(self):
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                from playwright.async_api import async_playwright
+
+                await self._stop()
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=self.headless
+                )
+                self._context = await self._browser.new_context()
+
+            return self._context
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[object]:
+        """Borrow a page, returning it to the pool (or recycling it) afterwards."""
+        async with self._semaphore:
+            context = await self._get_context()
+            if self._idle_pages:
+                page, uses = self._idle_pages.pop()
+            else:
+                page, uses = await context.new_page(), 0
+
+            healthy = False
+            try:
+                yield page
+                healthy = True
+            finally:
+                uses += 1
+                if healthy and uses < self.page_max_uses and not page.is_closed():
+                    self._idle_pages.append((page, uses))
+                elif not page.is_closed():
+                    await page.close()
+
+    async def _stop(self) -> None:
+        self._idle_pages = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._playwright = self._browser = self._context = None
+
+    async def close(self) -> None:
+        """Close the browser and stop Playwright."""
+        async with self._lock:
+            await self._stop()
+
+
+# One pool per event loop, since Playwright objects are bound to the loop that
+# started them. Each caller running the graph in its own loop closes its pool
+# with `close_browser_pool` before the loop ends.
+_browser_pools: dict[asyncio.AbstractEventLoop, BrowserPool] = {}
+
+
+def get_browser_pool(configuration: Configuration) -> BrowserPool:
+    """Return the process-wide browser pool for the running event loop."""
+    loop = asyncio.get_running_loop()
+    for other_loop in [other for other in _browser_pools if other.is_closed()]:
+        # Its browser can no longer be closed from here, so it is only dropped.
+        print("A browser pool was not closed before its event loop ended")
+        del _browser_pools[other_loop]
+
+    if loop not in _browser_pools:
+        _browser_pools[loop] = BrowserPool(
+            headless=configuration.browser_headless,
+            max_pages=configuration.browser_max_pages,
+            page_max_uses=configuration.browser_page_max_uses,
+        )
+
+    return _browser_pools[loop]
+
+
+async def close_browser_pool() -> None:
+    """Close the browser pools of this and every other open event loop."""
+    loop = asyncio.get_running_loop()
+    for other_loop, pool in list(_browser_pools.items()):
+        del _browser_pools[other_loop]
+        if other_loop is loop:
+            await pool.close()
+        elif other_loop.is_running():
+            await asyncio.wrap_future(
+                asyncio.run_coroutine_threadsafe(pool.close(), other_loop)
+            )
@@ -0,0 +1,135 @@
+"""Content-addressed cache for research node results."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Optional
+
+from .agents.base import ResearchAgent
+from .configuration import Configuration
+
+# Entries are written with their creation time first, so eviction can read it
+# from the start of each file.
+CREATED_PATTERN = re.compile(rb'^\{"created": ([0-9.eE+-]+)')
+
+
+class ResultCache:
+    """A directory of JSON entries with a TTL and a bound on the number of entries.
+
+    Entries are addressed by a content hash, so a change to any input (service,
+    prompt, model or state field) produces a new key. Entries expire `ttl`
+    seconds after they were created. The file modification time records the
+    last access and drives least-recently-used eviction.
+    File access blocks, so async code uses `aget` and `aset`, which run it in a
+    worker thread.
+    """
+
+    def __init__(self, directory: str | Path, ttl: float, max_entries: int):
+        """Keep entries in `directory` for `ttl` seconds, at most `max_entries`."""
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @classmethod
+    def from_configuration(cls, configuration: Configuration) -> Optional[ResultCache]:
+        """Create the cache described by the configuration, if it is enabled."""
+        if not configuration.result_cache:
+            return None
+
+        return cls(
+            configuration.result_cache_dir,
+            ttl=configuration.result_cache_ttl,
+            max_entries=configuration.result_cache_max_entries,
+        )
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.ttl
+
+    @staticmethod
+    def _created(path: Path) -> Optional[float]:
+        with open(path, "rb") as file:
+            match = CREATED_PATTERN.match(file.read(64))
+        return float(match.group(1)) if match else None
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if self._expired(entry["created"]):
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path)
+        return entry["value"]
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value and evict the oldest entries."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        path = self._path(key)
+        tmp_path = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_text(json.dumps({"created": time.time(), "value": value}))
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        self.evict()
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """Return the cached value without blocking the event loop."""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any) -> None:
+        """Store a value without blocking the event loop."""
+        await asyncio.to_thread(self.set, key, value)
+
+    def evict(self) -> None:
+        """Drop expired entries, then the least recently used beyond `max_entries`."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                accessed = path.stat().st_mtime
+                created = self._created(path)
+            except OSError:
+                continue
+            # Entries without a readable creation time could never be served.
+            if created is None or self._expired(created):
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((accessed, path))
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries :]:
+            path.unlink(missing_ok=True)
+
+
+async def cached_research(
+    agent: ResearchAgent, cache: Optional[ResultCache]
+) -> tuple[str, str]:
+    """Run `agent.research()`, reusing a cached result for identical inputs."""
+    if cache is None:
+        return await agent.research()
+
+    key = agent.cache_key()
+    cached = await cache.aget(key)
+    if cached is not None:
+        print(f"Using cached {type(agent).__name__} result ({key[:12]})")
+        return tuple(cached)
+
+    result = await agent.research()
+    await cache.aset(key, list(result))
+    return result
@@ -0,0 +1,52 @@
+"""Build the checkpointer the graph is compiled with and resume threads from it."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from .configuration import Configuration
+
+
+def build_checkpointer(configuration: Configuration) -> BaseCheckpointSaver:
+    """Create the checkpointer selected by the configuration."""
+    if configuration.checkpointer == "memory":
+        return MemorySaver()
+
+    if configuration.checkpointer == "sqlite":
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        path = Path(configuration.checkpoint_db)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # The connection is opened lazily by the saver on first use.
+        return AsyncSqliteSaver(aiosqlite.connect(path))
+
+    raise ValueError(f"Unknown checkpointer: {configuration.checkpointer}")
+
+
+async def close_checkpointer(checkpointer: BaseCheckpointSaver) -> None:
+    """Close the database connection held by a file-backed checkpointer."""
+    conn = getattr(checkpointer, "conn", None)
+    if conn is not None:
+        await conn.close()
+
+
+async def resume_thread(compiled_graph, thread_id: str) -> Dict[str, Any]:
+    """Restart a thread from the last node that completed successfully."""
+    config = {"configurable": {"thread_id": thread_id}}
+    snapshot = await compiled_graph.aget_state(config)
+
+    if not snapshot.values:
+        raise ValueError(f"No checkpoint found for thread {thread_id}")
+
+    if not snapshot.next:
+        print(f"Thread {thread_id} already completed.")
+        return snapshot.values
+
+    print(f"Resuming thread {thread_id} at {', '.join(snapshot.next)}...")
+    return await compiled_graph.ainvoke(None, config)
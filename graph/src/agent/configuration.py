@@ -18,6 +18,112 @@ class Configuration:
     # and when you invoke the graph
     my_configurable_param: str = "changeme"
 
+    # Where graph checkpoints are kept: "memory" or "sqlite". The SQLite
+    # checkpointer survives crashes so failed threads can be resumed.
+    checkpointer: str = "memory"
+    checkpoint_db: str = "my-docs/checkpoints.sqlite"
+
+    # Reports are written to `<artifacts_dir>/runs/<service>/<thread id>/`,
+    # as links to content-addressed objects so identical reports share storage.
+    artifacts_dir: str = "my-docs/artifacts"
+
+    # With `state_blobs`, state fields of at least `state_blob_min_bytes` are
+    # kept in the artifact store and checkpoints only hold their references.
+    state_blobs: bool = False
+    state_blob_min_bytes: int = 4096
+
+    # Research results are cached by service, prompt, models and input state,
+    # so repeated and retried runs skip the agents entirely.
+    result_cache: bool = True
+    result_cache_dir: str = "my-docs/.cache/results"
+    result_cache_ttl: int = 24 * 60 * 60
+    result_cache_max_entries: int = 512
+
+    # A single headless browser renders pages for every run in the process.
+    browser_headless: bool = True
+    browser_max_pages: int = 4
+    browser_page_max_uses: int = 20
+
+    # Documents are fetched over a pooled HTTP client before using the browser.
+    http_timeout: float = 30.0
+    http_max_connections: int = 20
+
+    # Fetched documents are kept on disk and revalidated with ETag and
+    # Last-Modified once they are older than `http_cache_max_age` seconds.
+    http_cache: bool = True
+    http_cache_dir: str = "my-docs/.cache/http"
+    http_cache_max_age: int = 60 * 60
+    http_cache_max_bytes: int = 256 * 1024 * 1024
+
+    # Code samples longer than this are truncated when reducing fetched pages.
+    reduce_max_code_lines: int = 20
+
+    # Documents larger than `pre_research_chunk_tokens` are split into chunks
+    # whose endpoints are extracted in parallel before the pre-research.
+    pre_research_chunk_tokens: int = 24000
+    pre_research_concurrency: int = 4
+    pre_research_chunk_model: str = "gpt-4o-mini"
+
+    # When the OAS URL is an OpenAPI document with a single list endpoint per
+    # identity resource, the indexed endpoints are used without the LLM.
+    oas_index_skip_llm: bool = True
+
+    # Candidate OAS URLs are probed concurrently to pick the one serving a spec.
+    oas_validation_concurrency: int = 8
+    oas_validation_timeout: float = 10.0
+
+    # Research prompts, including the SDK spec sent as the system prompt, are
+    # kept within this many tokens by trimming the pre-research report first.
+    prompt_token_budget: int = 100000
+
+    # Product and developer reports are written from one research pass over
+    # their sources instead of researching them twice.
+    shared_research: bool = True
+
+    # Pages scraped by GPT Researcher are shared by every agent of a run, and
+    # optionally kept on disk for `source_store_ttl` seconds across runs.
+    source_store: bool = True
+    source_store_persistent: bool = False
+    source_store_dir: str = "my-docs/.cache/sources"
+    source_store_ttl: int = 24 * 60 * 60
+    source_store_max_entries: int = 2048
+
+    # Embeddings of scraped chunks are cached per embedding model in
+    # memory-mapped files of at most `embedding_cache_max_entries` vectors.
+    embedding_cache: bool = True
+    embedding_cache_dir: str = "my-docs/.cache/embeddings"
+    embedding_cache_max_entries: int = 50000
+
+    # Each node reports its wall time, LLM, search and scraping time, tokens
+    # and estimated cost, and the totals of the process go to `metrics_file`
+    # in the Prometheus text format.
+    metrics: bool = True
+    metrics_file: str = "my-docs/metrics.prom"
+
+    # With `profile`, the stack of every node is sampled every
+    # `profile_interval` seconds and its allocations are traced, and the
+    # `profile_top` heaviest functions and lines are written under `profiles/`
+    # next to the run's reports.
+    profile: bool = False
+    profile_interval: float = 0.005
+    profile_top: int = 30
+
+    # Chat models are shared across nodes and runs, over kept-alive connections.
+    oas_url_model: str = "gpt-4o-search-preview"
+    oas_selection_model: str = "gpt-4o-mini"
+    llm_timeout: float = 600.0
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 60.0
+
+    # Chat model responses are cached in SQLite by model, parameters and prompt.
+    # Responses of web search models, such as `oas_url_model`, expire after
+    # `llm_cache_search_ttl` seconds so that newly published specs are found.
+    llm_cache: bool = True
+    llm_cache_path: str = "my-docs/.cache/llm.sqlite"
+    llm_cache_max_entries_per_model: int = 10000
+    llm_cache_search_ttl: int = 24 * 60 * 60
+
     @classmethod
     def from_runnable_config(
         cls, config: Optional[RunnableConfig] = None
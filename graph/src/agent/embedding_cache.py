@@ -0,0 +1,327 @@
+"""Embeddings of scraped chunks cached per model in memory-mapped files."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .configuration import Configuration
+
+# The vector file grows by this many rows at a time, up to `max_entries`.
+GROW_ROWS = 1024
+
+
+def _slug(model: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_.-]+", "_", model).strip("_") or "default"
+
+
+def _text_hash(text: str, kind: str) -> str:
+    # Some providers embed queries differently from documents, so they never share.
+    return hashlib.sha256(f"{kind}\n{text}".encode()).hexdigest()
+
+
+class VectorStore:
+    """Vectors of one embedding model, addressed by text hash.
+
+    Vectors live in a memory-mapped float32 matrix that grows in chunks of
+    `GROW_ROWS` rows up to `max_entries`, and a SQLite index maps each hash to
+    its row. When every row is taken, the least recently used rows are reused.
+    """
+
+    def __init__(self, directory: str | Path, max_entries: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.memmap] = None
+        self._conn = sqlite3.connect(
+            self.directory / "index.sqlite", check_same_thread=False
+        )
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS vectors (
+                    hash TEXT PRIMARY KEY,
+                    slot INTEGER UNIQUE NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS vectors_accessed ON vectors (accessed)"
+            )
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if row is not None:
+            self._open(row[0])
+
+    @property
+    def _path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _capacity(self) -> int:
+        return 0 if self._vectors is None else self._vectors.shape[0]
+
+    def _row_bytes(self, dim: int) -> int:
+        return dim * np.dtype(np.float32).itemsize
+
+    def _end(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(MAX(slot) + 1, 0) FROM vectors"
+        ).fetchone()[0]
+
+    def _open(self, dim: int) -> None:
+        """Map the vector file, starting over if its shape no longer matches."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        size = self._path.stat().st_size if self._path.exists() else 0
+        rows, partial = divmod(size, self._row_bytes(dim))
+        reuse = (
+            row is not None
+            and row[0] == dim
+            and not partial
+            and self._end() <= rows <= self.max_entries
+        )
+        if not reuse:
+            with self._conn:
+                self._conn.execute("DELETE FROM vectors")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (dim,)
+                )
+            self._path.write_bytes(b"")
+            rows = 0
+
+        self._dim = dim
+        self._map(rows)
+
+    def _map(self, rows: int) -> None:
+        # An empty file cannot be mapped; there is nothing to read from it yet.
+        self._vectors = None
+        if rows:
+            self._vectors = np.memmap(
+                self._path, dtype=np.float32, mode="r+", shape=(rows, self._dim)
+            )
+
+    def _grow(self, rows: int) -> None:
+        """Extend the vector file to hold at least `rows` rows."""
+        rows = min(-(-rows // GROW_ROWS) * GROW_ROWS, self.max_entries)
+        if self._vectors is not None:
+            self._vectors.flush()
+        with open(self._path, "r+b") as file:
+            file.truncate(rows * self._row_bytes(self._dim))
+        self._map(rows)
+
+    def _slots(self, hashes: list[str]) -> list[tuple[str, int]]:
+        rows = []
+        # Stay below SQLite's limit on the number of query parameters.
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start : start + 500]
+            rows += self._conn.execute(
+                "SELECT hash, slot FROM vectors WHERE hash IN "
+                f"({', '.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+        return rows
+
+    def get_many(self, hashes: list[str]) -> dict[str, list[float]]:
+        """Return the known vectors among `hashes`."""
+        if self._dim is None or not hashes:
+            return {}
+
+        with self._lock:
+            rows = self._slots(hashes)
+            with self._conn:
+                self._conn.executemany(
+                    "UPDATE vectors SET accessed = ? WHERE hash = ?",
+                    [(time.time(), text_hash) for text_hash, _ in rows],
+                )
+            return {text_hash: self._vectors[slot].tolist() for text_hash, slot in rows}
+
+    def put_many(self, vectors: dict[str, list[float]]) -> None:
+        """Store vectors, reusing the least recently used rows when full."""
+        if not vectors:
+            return
+
+        vectors = dict(vectors)
+        with self._lock:
+            if self._dim is None:
+                self._open(len(next(iter(vectors.values()))))
+
+            for text_hash, _ in self._slots(list(vectors)):
+                vectors.pop(text_hash)
+            vectors = dict(list(vectors.items())[-self.max_entries :])
+            if not vectors:
+                return
+
+            end = self._end()
+            free = list(range(end, min(end + len(vectors), self.max_entries)))
+            if free and free[-1] >= self._capacity:
+                self._grow(free[-1] + 1)
+            if len(free) < len(vectors):
+                evicted = self._conn.execute(
+                    "SELECT hash, slot FROM vectors ORDER BY accessed LIMIT ?",
+                    (len(vectors) - len(free),),
+                ).fetchall()
+                with self._conn:
+                    self._conn.executemany(
+                        "DELETE FROM vectors WHERE hash = ?",
+                        [(text_hash,) for text_hash, _ in evicted],
+                    )
+                free += [slot for _, slot in evicted]
+
+            now = time.time()
+            with self._conn:
+                for (text_hash, vector), slot in zip(vectors.items(), free):
+                    self._vectors[slot] = vector
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)",
+                        (text_hash, slot, now),
+                    )
+            self._vectors.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            self._dim = None
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings that only call the model for texts it has not embedded before."""
+
+    def __init__(self, embeddings: Embeddings, store: VectorStore):
+        self.embeddings = embeddings
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(
+        self, texts: list[str], kind: str
+    ) -> tuple[list[str], dict[str, list[float]], dict[str, str]]:
+        hashes = [_text_hash(text, kind) for text in texts]
+        found = self.store.get_many(list(dict.fromkeys(hashes)))
+        missing = {
+            text_hash: text
+            for text_hash, text in zip(hashes, texts)
+            if text_hash not in found
+        }
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        return hashes, found, missing
+
+    def _store(
+        self, missing: dict[str, str], vectors: list[list[float]]
+    ) -> dict[str, list[float]]:
+        embedded = dict(zip(missing, (list(map(float, v)) for v in vectors)))
+        self.store.put_many(embedded)
+        return embedded
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes, found, missing = self._lookup(texts, "document")
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            found.update(self._store(missing, vectors))
+        return [found[text_hash] for text_hash in hashes]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes, found, missing = await asyncio.to_thread(
+            self._lookup, texts, "document"
+        )
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            found.update(await asyncio.to_thread(self._store, missing, vectors))
+        return [found[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        hashes, found, missing = self._lookup([text], "query")
+        if missing:
+            found.update(self._store(missing, [self.embeddings.embed_query(text)]))
+        return found[hashes[0]]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        hashes, found, missing = await asyncio.to_thread(self._lookup, [text], "query")
+        if missing:
+            vector = await self.embeddings.aembed_query(text)
+            found.update(await asyncio.to_thread(self._store, missing, [vector]))
+        return found[hashes[0]]
+
+
+class EmbeddingCache:
+    """One vector store per embedding model under a directory."""
+
+    def __init__(self, directory: str | Path, max_entries: int):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self._stores: dict[str, VectorStore] = {}
+        self._lock = threading.Lock()
+
+    def store(self, model: str) -> VectorStore:
+        with self._lock:
+            if model not in self._stores:
+                self._stores[model] = VectorStore(
+                    self.directory / _slug(model), self.max_entries
+                )
+            return self._stores[model]
+
+    def attach(self, researcher: Any) -> None:
+        """Route a GPT Researcher's embeddings through the cache."""
+        # GPT Researcher has no public way to replace its embeddings, so without
+        # the private attribute the researcher keeps its uncached embeddings.
+        memory = getattr(researcher, "memory", None)
+        if not hasattr(memory, "_embeddings"):
+            print("Embedding cache skipped: unsupported GPT Researcher memory")
+            return
+
+        embeddings = memory.get_embeddings()
+        if embeddings is None or isinstance(embeddings, CachedEmbeddings):
+            return
+
+        cfg = researcher.cfg
+        store = self.store(f"{cfg.embedding_provider}:{cfg.embedding_model}")
+        memory._embeddings = CachedEmbeddings(embeddings, store)
+
+    def close(self) -> None:
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+            self._stores.clear()
+
+
+_embedding_caches: dict[str, EmbeddingCache] = {}
+
+
+def get_embedding_cache(configuration: Configuration) -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, if it is enabled."""
+    if not configuration.embedding_cache:
+        return None
+
+    directory = configuration.embedding_cache_dir
+    if directory not in _embedding_caches:
+        _embedding_caches[directory] = EmbeddingCache(
+            directory, max_entries=configuration.embedding_cache_max_entries
+        )
+    return _embedding_caches[directory]
+
+
+def close_embedding_caches() -> None:
+    """Flush and close every open embedding cache."""
+    for cache in _embedding_caches.values():
+        cache.close()
+    _embedding_caches.clear()
@@ -0,0 +1,226 @@
+"""Fetch the documents researched by the agents.
+
+Documents are requested over plain HTTP first. Only HTML pages that need
+JavaScript to show their content, and responses that look like bot protection
+turning the HTTP client away, are rendered with the shared browser.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+from .browser import get_browser_pool
+from .configuration import Configuration
+from .http_cache import CachedResponse, HTTPCache
+from .metrics import timed
+from .reduction import reduce_document
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36"
+)
+
+# Pages with less visible text than this are assumed to be rendered client-side.
+MIN_STATIC_TEXT_LENGTH = 500
+
+# Statuses bot protection answers HTTP clients with, which a browser may get past.
+BLOCKED_STATUS_CODES = {403, 429, 503}
+
+SPA_MARKERS = (
+    '<div id="root"></div>',
+    '<div id="app"></div>',
+    '<div id="__next"></div>',
+    "enable javascript",
+    "requires javascript",
+)
+
+
+@dataclass
+class FetchedDocument:
+    """A fetched document and how it was obtained."""
+
+    url: str
+    content_type: str
+    body: str
+    rendered: bool = False
+
+    @property
+    def text(self) -> str:
+        """The readable text of the document."""
+        if self.content_type == "html":
+            return html_to_text(self.body)
+        return self.body
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_http_client(configuration: Configuration) -> httpx.AsyncClient:
+    """Return the process-wide HTTP client for the running event loop."""
+    global _http_client, _http_client_loop
+
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=configuration.http_timeout,
+            limits=httpx.Limits(max_connections=configuration.http_max_connections),
+            headers={"User-Agent": USER_AGENT},
+        )
+        _http_client_loop = loop
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the process-wide HTTP client, if one was created."""
+    global _http_client, _http_client_loop
+
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = _http_client_loop = None
+
+
+def sniff_content_type(url: str, content_type: str, body: str) -> str:
+    """Classify a document as "json", "yaml", "html" or "text"."""
+    content_type = content_type.lower()
+    if "json" in content_type:
+        return "json"
+    if "yaml" in content_type or "yml" in content_type:
+        return "yaml"
+    if "html" in content_type:
+        return "html"
+
+    # Spec files are often served as text/plain or application/octet-stream.
+    head = body.lstrip()[:200].lower()
+    path = url.lower().split("?")[0]
+    if head.startswith(("{", "[")) or path.endswith(".json"):
+        return "json"
+    if head.startswith(("openapi:", "swagger:", "---")) or path.endswith(
+        (".yaml", ".yml")
+    ):
+        return "yaml"
+    if head.startswith(("<!doctype html", "<html")):
+        return "html"
+    return "text"
+
+
+def html_to_text(html: str) -> str:
+    """Extract the visible text of an HTML page."""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(["script", "style", "noscript", "template", "svg"]):
+        element.decompose()
+
+    body = soup.body or soup
+    return body.get_text("\n", strip=True)
+
+
+def needs_javascript(html: str) -> bool:
+    """Guess whether an HTML page only shows its content once scripts run."""
+    lowered = html.lower()
+    if any(marker in lowered for marker in SPA_MARKERS):
+        return True
+    return len(html_to_text(html)) < MIN_STATIC_TEXT_LENGTH
+
+
+def needs_browser(response: httpx.Response) -> bool:
+    """Whether a response looks blocked or empty rather than definitive."""
+    if response.is_success:
+        return not response.text.strip()
+    return response.status_code in BLOCKED_STATUS_CODES
+
+
+def _cached_document(url: str, entry: CachedResponse) -> FetchedDocument:
+    return FetchedDocument(url=url, content_type=entry.content_type, body=entry.body)
+
+
+async def render_document(url: str, configuration: Configuration) -> FetchedDocument:
+    """Render a page with the shared browser once its network is idle."""
+    async with get_browser_pool(configuration).page() as page:
+        await page.goto(url)
+        await page.wait_for_load_state("networkidle")
+        html = await page.content()
+
+    return FetchedDocument(url=url, content_type="html", body=html, rendered=True)
+
+
+@timed("scrape")
+async def fetch_document(url: str, configuration: Configuration) -> FetchedDocument:
+    """Fetch a document over HTTP, falling back to the browser when needed.
+
+    Responses are served from the HTTP cache while fresh, and revalidated
+    with a conditional request once they are older than its max age. Failed
+    requests are served the cached copy if there is one. Otherwise, blocked
+    or empty responses are rendered with the browser, and any other error,
+    e.g. a 404, is raised.
+    """
+    cache = HTTPCache.from_configuration(configuration)
+    entry = await cache.aget(url) if cache else None
+
+    if entry and cache.is_fresh(entry):
+        if await cache.atouch(entry):
+            return _cached_document(url, entry)
+        # The entry was evicted since it was read, so it is fetched again.
+        entry = None
+
+    try:
+        response = await get_http_client(configuration).get(
+            url, headers=entry.validators() if entry else None
+        )
+        if entry and response.status_code == 304:
+            await cache.atouch(entry, revalidated=True)
+            return _cached_document(url, entry)
+        response.raise_for_status()
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        if entry:
+            print(f"HTTP fetch of {url} failed, using the cached copy: {e}")
+            return _cached_document(url, entry)
+        if not isinstance(e, httpx.HTTPStatusError) or not needs_browser(e.response):
+            raise
+        print(f"HTTP fetch of {url} was blocked, rendering it instead: {e}")
+        return await render_document(url, configuration)
+
+    content_type = sniff_content_type(
+        url, response.headers.get("content-type", ""), response.text
+    )
+    if needs_browser(response) or (
+        content_type == "html" and needs_javascript(response.text)
+    ):
+        return await render_document(url, configuration)
+
+    if cache:
+        await cache.aset(url, response, content_type)
+
+    return FetchedDocument(url=url, content_type=content_type, body=response.text)
+
+
+async def fetch_html(url: str, configuration: Configuration) -> str:
+    """Fetches the content of a given URL.
+
+    Args:
+        url (str): The URL to fetch content from
+        configuration (Configuration): HTTP client and browser settings
+
+    Returns:
+        str: The reduced text of the page or spec file, or error message if fetch fails
+    """
+    from playwright.async_api import Error as PlaywrightError
+
+    try:
+        document = await fetch_document(url, configuration)
+    except (PlaywrightError, httpx.HTTPError, httpx.InvalidURL) as e:
+        return f"Error fetching URL: {str(e)}"
+
+    reduced = reduce_document(
+        document, max_code_lines=configuration.reduce_max_code_lines
+    )
+    print(
+        f"Reduced {url} from {reduced.tokens_before} to {reduced.tokens_after} tokens"
+    )
+    return reduced.text
@@ -3,16 +3,11 @@
 This agent returns a predefined response without using an actual LLM.
 """
 
-import asyncio
 import os
-from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-import requests
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import StateGraph
 from langgraph.types import Command, interrupt
 
@@ -22,12 +17,66 @@ from graph.src.agent.agent import (
     OASRetrievalAgent,
     PreResearchAgent,
     ProductReqResearchAgent,
+    RequirementsResearchAgent,
 )
 
+from .agents.base import ResearchAgent
+from .artifacts import ArtifactStore
+from .blobs import BlobStore, get_blob_store
+from .cache import ResultCache, cached_research
+from .checkpoint import build_checkpointer
 from .configuration import Configuration
+from .embedding_cache import get_embedding_cache
+from .fetch import fetch_html
+from .llm import get_chat_model
+from .metrics import instrument
+from .oas_index import OASIndex
+from .oas_validation import validate_candidates
+from .profiling import profiled
+from .sources import get_source_store, release_source_store
 from .state import State
 
 
+def _run_id(config: RunnableConfig) -> str:
+    return (config or {}).get("configurable", {}).get("thread_id", "")
+
+
+async def _write_artifact(
+    state: State, config: RunnableConfig, name: str, content: str
+) -> None:
+    """Write an output into the directory of this run of the service."""
+    artifacts = ArtifactStore.from_configuration(
+        Configuration.from_runnable_config(config)
+    )
+    path = await artifacts.write(state.input, _run_id(config), name, content)
+    print(f"Wrote {path}")
+
+
+async def _slim(config: RunnableConfig, update: Dict[str, Any]) -> Dict[str, Any]:
+    """Store the large fields of a node's update by reference, when enabled."""
+    blobs = get_blob_store(Configuration.from_runnable_config(config))
+    return await blobs.slim(update) if blobs else update
+
+
+async def _resolve(config: RunnableConfig, value: str) -> str:
+    """The full value of a state field that may be stored by reference."""
+    blobs = BlobStore.from_configuration(Configuration.from_runnable_config(config))
+    return await blobs.resolve(value)
+
+
+def _share_resources(
+    agent: ResearchAgent, configuration: Configuration, config: RunnableConfig
+) -> None:
+    """Give an agent the run's source store and the embedding cache."""
+    agent.source_store = get_source_store(configuration, _run_id(config))
+    agent.embedding_cache = get_embedding_cache(configuration)
+
+
+def _instrument(node):
+    """Wrap a node with its metrics and, when enabled, its profiling."""
+    return instrument(profiled(node))
+
+
 def start(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Start the agent."""
     config_params = Configuration.from_runnable_config(config)
@@ -38,32 +87,50 @@ def start(state: State, config: RunnableConfig) -> Dict[str, Any]:
     return {"input": state.input}
 
 
-def oas_discovery(state: State) -> Dict[str, Any]:
+async def oas_discovery(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """OAS discovery."""
     service_name = state.input
-    oas_discovery_agent = OASDiscoveryAgent(None, service_name)
-
-    async def oas_discovery() -> str:
-        try:
-            oas_discovery_report, oas_url_list = await oas_discovery_agent.research()
-            Path("my-docs/oas_discovery_report.md").write_text(oas_discovery_report)
-            Path("my-docs/oas_url_list.md").write_text(oas_url_list)
-        except Exception as e:
-            print(f"Error in OAS discovery: {e}")
-            raise e
-
-        return oas_discovery_report, oas_url_list
-
-    oas_discovery_report, oas_url_list = asyncio.run(oas_discovery())
-
-    return {
-        "oas_discovery_report": oas_discovery_report,
-        "oas_discovery_urls": oas_url_list,
-    }
+    configuration = Configuration.from_runnable_config(config)
+    cache = ResultCache.from_configuration(configuration)
+    oas_discovery_agent = OASDiscoveryAgent(None, service_name, configuration)
+    _share_resources(oas_discovery_agent, configuration, config)
+
+    try:
+        oas_discovery_report, oas_url_list = await cached_research(
+            oas_discovery_agent, cache
+        )
+        await _write_artifact(
+            state, config, "oas_discovery_report.md", oas_discovery_report
+        )
+        await _write_artifact(state, config, "oas_url_list.md", oas_url_list)
+    except Exception as e:
+        print(f"Error in OAS discovery: {e}")
+        raise e
+
+    return await _slim(
+        config,
+        {
+            "oas_discovery_report": oas_discovery_report,
+            "oas_discovery_urls": oas_url_list,
+        },
+    )
 
 
-def oas_discovery_url(state: State) -> Dict[str, Any]:
+async def oas_discovery_url(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Get the OAS URL."""
+    configuration = Configuration.from_runnable_config(config)
+    oas_discovery_urls = await _resolve(config, state.oas_discovery_urls)
+
+    # Probe every candidate and take the best one that actually serves a spec,
+    # only asking the LLM to choose when none of them does.
+    candidates = await validate_candidates(oas_discovery_urls, configuration)
+    for candidate in candidates:
+        print(
+            f"{candidate.score:>4} {candidate.kind or 'unreachable':<11} "
+            f"{candidate.elapsed:5.2f}s {candidate.url}"
+        )
+    if candidates and candidates[0].is_spec:
+        return {"oas_discovery_oas_url": candidates[0].url}
 
     prompt = ChatPromptTemplate.from_template(
         """
@@ -76,170 +143,219 @@ def oas_discovery_url(state: State) -> Dict[str, Any]:
         """
     )
 
-    llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+    llm = get_chat_model(
+        configuration.oas_selection_model, configuration, temperature=0
+    )
     chain = prompt | llm
-    oas_url = chain.invoke({"oas_discovery_urls": state.oas_discovery_urls})
+    oas_url = await chain.ainvoke({"oas_discovery_urls": oas_discovery_urls})
     return {"oas_discovery_oas_url": oas_url.content}
 
 
-def pre_research(state: State) -> Dict[str, Any]:
+async def pre_research(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Pre-research."""
     service_name = state.input
+    configuration = Configuration.from_runnable_config(config)
+    cache = ResultCache.from_configuration(configuration)
+
+    html = await fetch_html(state.oas_discovery_oas_url, configuration)
+
+    # OpenAPI documents are indexed locally so that only identity endpoints are
+    # researched, skipping the LLM when the endpoints are unambiguous.
+    spec_index = OASIndex.from_text(html)
+    if spec_index is not None:
+        identity_endpoints = spec_index.identity_endpoints()
+        if identity_endpoints.unambiguous and configuration.oas_index_skip_llm:
+            pre_research_report = identity_endpoints.render()
+            print(pre_research_report)
+            await _write_artifact(
+                state, config, "pre_research_report.md", pre_research_report
+            )
+            return await _slim(config, {"pre_research_report": pre_research_report})
 
-    def fetch_html(url: str) -> str:
-        """Fetches HTML content from a given URL.
-        
-        Args:
-            url (str): The URL to fetch content from
-            
-        Returns:
-            str: The HTML content of the page, or error message if fetch fails
-        """
-
-        try:
-            from playwright.sync_api import sync_playwright
-
-            html = ""
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=False)
-                page = browser.new_page()
-                page.goto(url)
-                page.wait_for_load_state('networkidle')
-
-                html = page.locator('body').all_text_contents()
-                
-                browser.close()
-                
-            return html
-
-        except requests.RequestException as e:
-            return f"Error fetching URL: {str(e)}"
-    
-    html = fetch_html(state.oas_discovery_oas_url)
+        if identity_endpoints.operations:
+            html = identity_endpoints.render()
 
     # 0. Initialize
     pre_research_agent = PreResearchAgent(
-        None, service_name, html
+        None,
+        service_name,
+        html,
+        chunk_tokens=configuration.pre_research_chunk_tokens,
+        concurrency=configuration.pre_research_concurrency,
+        chunk_model=configuration.pre_research_chunk_model,
+        configuration=configuration,
     )
+    _share_resources(pre_research_agent, configuration, config)
 
     # 1. Do a pre-research
-    async def pre_research() -> str:
-        try:
-            _, pre_research_report = await pre_research_agent.research()
-            print(pre_research_report)
-            Path("my-docs/pre_research_report.md").write_text(pre_research_report)
-        except Exception as e:
-            print(f"Error in pre-research: {e}")
-            raise e
+    try:
+        _, pre_research_report = await cached_research(pre_research_agent, cache)
+        print(pre_research_report)
+        await _write_artifact(
+            state, config, "pre_research_report.md", pre_research_report
+        )
+    except Exception as e:
+        print(f"Error in pre-research: {e}")
+        raise e
+
+    return await _slim(config, {"pre_research_report": pre_research_report})
 
-        return pre_research_report
 
-    pre_research_report = asyncio.run(pre_research())
+async def requirements_research(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Research shared by the product and developer requirements reports."""
+    agent = "anthropic:claude-3-7-sonnet-latest"
+    service_name = state.input
+    configuration = Configuration.from_runnable_config(config)
+    cache = ResultCache.from_configuration(configuration)
+
+    # Without a shared context, each report researches its sources itself.
+    if not configuration.shared_research:
+        return {"research_context": ""}
+
+    requirements_research_agent = RequirementsResearchAgent(
+        agent,
+        service_name,
+        [state.oas_discovery_oas_url],
+        await _resolve(config, state.pre_research_report),
+        configuration=configuration,
+    )
+    _share_resources(requirements_research_agent, configuration, config)
 
-    return {"pre_research_report": pre_research_report}
+    try:
+        research_context, research_sources = await cached_research(
+            requirements_research_agent, cache
+        )
+        print(f"Researched sources:\n{research_sources}")
+    except Exception as e:
+        print(f"Error in requirements research: {e}")
+        raise e
 
+    return await _slim(config, {"research_context": research_context})
 
-def product_req_research(state: State) -> Dict[str, Any]:
+
+async def product_req_research(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Product requirements research."""
     agent = "anthropic:claude-3-7-sonnet-latest"
     service_name = state.input
+    configuration = Configuration.from_runnable_config(config)
+    cache = ResultCache.from_configuration(configuration)
 
     # 2. Do a product requirements research
     product_req_research_agent = ProductReqResearchAgent(
-        agent, service_name, [state.oas_discovery_oas_url], state.pre_research_report
+        agent,
+        service_name,
+        [state.oas_discovery_oas_url],
+        await _resolve(config, state.pre_research_report),
+        configuration=configuration,
+        context=await _resolve(config, state.research_context),
     )
+    _share_resources(product_req_research_agent, configuration, config)
 
-    async def product_req_research() -> str:
-        try:
-            _, product_req_report = await product_req_research_agent.research()
-            print(product_req_report)
-            Path("my-docs/product_req_report.md").write_text(product_req_report)
-        except Exception as e:
-            print(f"Error in product requirements research: {e}")
-            raise e
-
-        return product_req_report
+    try:
+        _, product_req_report = await cached_research(product_req_research_agent, cache)
+        print(product_req_report)
+        await _write_artifact(
+            state, config, "product_req_report.md", product_req_report
+        )
+    except Exception as e:
+        print(f"Error in product requirements research: {e}")
+        raise e
 
-    product_req_report = asyncio.run(product_req_research())
+    return await _slim(config, {"product_req_report": product_req_report})
 
-    return {"product_req_report": product_req_report}
 
-
-def dev_req_research(state: State) -> Dict[str, Any]:
+async def dev_req_research(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """Developer requirements research."""
     agent = "anthropic:claude-3-7-sonnet-latest"
     service_name = state.input
+    configuration = Configuration.from_runnable_config(config)
+    cache = ResultCache.from_configuration(configuration)
 
     # 3. Do a developer requirements research
     dev_req_research_agent = DevReqResearchAgent(
-        agent, service_name, [state.oas_discovery_oas_url], state.pre_research_report
+        agent,
+        service_name,
+        [state.oas_discovery_oas_url],
+        await _resolve(config, state.pre_research_report),
+        configuration=configuration,
+        context=await _resolve(config, state.research_context),
     )
+    _share_resources(dev_req_research_agent, configuration, config)
 
-    async def dev_req_research() -> str:
-        try:
-            _, dev_req_report = await dev_req_research_agent.research()
-            print(dev_req_report)
-            Path("my-docs/dev_req_report.md").write_text(dev_req_report)
-        except Exception as e:
-            print(f"Error in developer requirements research: {e}")
-            raise e
-
-        return dev_req_report
+    try:
+        _, dev_req_report = await cached_research(dev_req_research_agent, cache)
+        print(dev_req_report)
+        await _write_artifact(state, config, "dev_req_report.md", dev_req_report)
+    except Exception as e:
+        print(f"Error in developer requirements research: {e}")
+        raise e
 
-    dev_req_report = asyncio.run(dev_req_research())
-
-    return {"dev_req_report": dev_req_report}
+    return await _slim(config, {"dev_req_report": dev_req_report})
 
 
 # TODO: This is a placeholder for the OAS retrieval agent
-def oas_retrieval(state: State) -> Dict[str, Any]:
+async def oas_retrieval(state: State, config: RunnableConfig) -> Dict[str, Any]:
     """OAS retrieval."""
     agent = "anthropic:claude-3-7-sonnet-latest"
     service_name = state.input
+    configuration = Configuration.from_runnable_config(config)
+    cache = ResultCache.from_configuration(configuration)
 
     # TODO: 4. retrieve OAS/Postman collection (currently manually done)
     oas_retrieval_agent = OASRetrievalAgent(
         agent, service_name, [state.oas_discovery_oas_url]
     )
+    _share_resources(oas_retrieval_agent, configuration, config)
 
-    async def oas_retrieval() -> str:
-        try:
-            _, oas_retrieval_report = await oas_retrieval_agent.research()
-            print(oas_retrieval_report)
-            Path("my-docs/oas_retrieval_report.md").write_text(oas_retrieval_report)
-        except Exception as e:
-            print(f"Error in OAS retrieval: {e}")
-            raise e
+    try:
+        _, oas_retrieval_report = await cached_research(oas_retrieval_agent, cache)
+        print(oas_retrieval_report)
+        await _write_artifact(
+            state, config, "oas_retrieval_report.md", oas_retrieval_report
+        )
+    except Exception as e:
+        print(f"Error in OAS retrieval: {e}")
+        raise e
 
-        return oas_retrieval_report
+    return await _slim(config, {"oas_retrieval_report": oas_retrieval_report})
 
-    oas_retrieval_report = asyncio.run(oas_retrieval())
 
-    return {"oas_retrieval_report": oas_retrieval_report}
+def finish(state: State, config: RunnableConfig) -> Dict[str, Any]:
+    """Release the resources of the run once both reports are written."""
+    release_source_store(_run_id(config))
+    return {}
 
 
-def graph():
+def graph(config: Optional[RunnableConfig] = None):
     # Define a new graph
     workflow = StateGraph(State, config_schema=Configuration)
 
-    memory = MemorySaver()
+    memory = build_checkpointer(Configuration.from_runnable_config(config))
 
-    # Add the nodes to the graph
-    workflow.add_node("start", start)
-    workflow.add_node("oas_discovery", oas_discovery)
-    workflow.add_node("oas_discovery_url", oas_discovery_url)
-    workflow.add_node("pre_research", pre_research)
-    workflow.add_node("product_req_research", product_req_research)
-    workflow.add_node("dev_req_research", dev_req_research)
-    workflow.add_node("oas_retrieval", oas_retrieval)
+    # Add the nodes to the graph, each reporting its timings, tokens and cost
+    # and, when enabled, its profiles
+    workflow.add_node("start", _instrument(start))
+    workflow.add_node("oas_discovery", _instrument(oas_discovery))
+    workflow.add_node("oas_discovery_url", _instrument(oas_discovery_url))
+    workflow.add_node("pre_research", _instrument(pre_research))
+    workflow.add_node("requirements_research", _instrument(requirements_research))
+    workflow.add_node("product_req_research", _instrument(product_req_research))
+    workflow.add_node("dev_req_research", _instrument(dev_req_research))
+    workflow.add_node("oas_retrieval", _instrument(oas_retrieval))
+    workflow.add_node("finish", _instrument(finish))
 
     workflow.add_edge("__start__", "start")
     workflow.add_edge("start", "oas_discovery")
     workflow.add_edge("oas_discovery", "oas_discovery_url")
     workflow.add_edge("oas_discovery_url", "pre_research")
-    workflow.add_edge("pre_research", "product_req_research")
-    workflow.add_edge("product_req_research", "dev_req_research")
-    workflow.add_edge("dev_req_research", "__end__")
+
+    # Both reports are written from one shared research pass, in parallel,
+    # and join in the last node, which releases what the run shared.
+    workflow.add_edge("pre_research", "requirements_research")
+    workflow.add_edge("requirements_research", "product_req_research")
+    workflow.add_edge("requirements_research", "dev_req_research")
+    workflow.add_edge(["product_req_research", "dev_req_research"], "finish")
+    workflow.add_edge("finish", "__end__")
 
     # Compile the workflow into an executable graph
     graph = workflow.compile(checkpointer=memory)
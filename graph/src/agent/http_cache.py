@@ -0,0 +1,149 @@
+"""On-disk cache of fetched documents, revalidated with conditional requests."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+from .configuration import Configuration
+
+
+@dataclass
+class CachedResponse:
+    """The body of a cached response and the headers needed to revalidate it."""
+
+    url: str
+    content_type: str
+    body: str
+    etag: str = ""
+    last_modified: str = ""
+    fetched_at: float = 0.0
+
+    def validators(self) -> dict[str, str]:
+        """Headers for a conditional request against the cached copy."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPCache:
+    """Response bodies keyed by URL, evicted least-recently-used past `max_bytes`.
+
+    Each entry is a JSON file named after the hash of its URL. The file
+    modification time records the last access. File access blocks, so async
+    code uses `aget`, `atouch` and `aset`, which run it in a worker thread.
+    """
+
+    def __init__(self, directory: str | Path, max_age: float, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_configuration(cls, configuration: Configuration) -> Optional[HTTPCache]:
+        """Create the cache described by the configuration, if it is enabled."""
+        if not configuration.http_cache:
+            return None
+
+        return cls(
+            configuration.http_cache_dir,
+            max_age=configuration.http_cache_max_age,
+            max_bytes=configuration.http_cache_max_bytes,
+        )
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for a URL, if any."""
+        try:
+            return CachedResponse(**json.loads(self._path(url).read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        """Whether the entry can be used without revalidating it."""
+        return time.time() - entry.fetched_at < self.max_age
+
+    def touch(self, entry: CachedResponse, revalidated: bool = False) -> bool:
+        """Mark an entry as recently used, restarting its max age if revalidated.
+
+        Returns False when the entry was removed since it was read, e.g. evicted
+        by another fetch or process.
+        """
+        if revalidated:
+            entry.fetched_at = time.time()
+            self._write(entry)
+            return True
+
+        try:
+            os.utime(self._path(entry.url))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def set(self, url: str, response: httpx.Response, content_type: str) -> None:
+        """Store a successful response and evict old entries beyond the size limit."""
+        self._write(
+            CachedResponse(
+                url=url,
+                content_type=content_type,
+                body=response.text,
+                etag=response.headers.get("etag", ""),
+                last_modified=response.headers.get("last-modified", ""),
+                fetched_at=time.time(),
+            )
+        )
+        self.evict()
+
+    async def aget(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response without blocking the event loop."""
+        return await asyncio.to_thread(self.get, url)
+
+    async def atouch(self, entry: CachedResponse, revalidated: bool = False) -> bool:
+        """Mark an entry as recently used without blocking the event loop."""
+        return await asyncio.to_thread(self.touch, entry, revalidated)
+
+    async def aset(self, url: str, response: httpx.Response, content_type: str) -> None:
+        """Store a response without blocking the event loop."""
+        await asyncio.to_thread(self.set, url, response, content_type)
+
+    def _write(self, entry: CachedResponse) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        path = self._path(entry.url)
+        tmp_path = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(asdict(entry)))
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def evict(self) -> None:
+        """Drop the least recently used entries until the cache fits in `max_bytes`."""
+        entries = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
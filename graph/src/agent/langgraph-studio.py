@@ -3,18 +3,152 @@
 This agent returns a predefined response without using an actual LLM.
 """
 
+import argparse
+import asyncio
+import time
+
+from graph.src.agent.batch import load_services, run_batch, write_summary
+from graph.src.agent.blobs import BlobStore
+from graph.src.agent.browser import close_browser_pool
+from graph.src.agent.checkpoint import close_checkpointer, resume_thread
+from graph.src.agent.configuration import Configuration
+from graph.src.agent.embedding_cache import close_embedding_caches
+from graph.src.agent.fetch import close_http_client
 from graph.src.agent.graph import graph
+from graph.src.agent.llm import close_chat_models
+from graph.src.agent.llm_cache import response_cache_stats
+from graph.src.agent.sources import close_source_stores, release_source_store
 
 compiled_graph = graph()
 
-if __name__ == "__main__":
+
+async def shutdown():
+    await close_browser_pool()
+    await close_http_client()
+    await close_chat_models()
+    close_source_stores()
+    close_embedding_caches()
+
+    for model, counts in response_cache_stats().items():
+        print(f"LLM cache {model}: {counts['hits']} hits, {counts['misses']} misses")
+    await close_checkpointer(compiled_graph.checkpointer)
+
+
+async def main():
     print("Starting the agent...")
     thread_id = "1"
-    while True:
-        # Get user input from console
-        service_input = input("Service name: ")
+    blobs = BlobStore.from_configuration(Configuration())
+    try:
+        while True:
+            # Get user input from console
+            service_input = input("Service name: ")
+
+            try:
+                result = await compiled_graph.ainvoke(
+                    {"input": service_input},
+                    {"configurable": {"thread_id": thread_id}},
+                )
+            finally:
+                # Runs that fail before their last node release their pages here.
+                release_source_store(thread_id)
+            print(await blobs.resolve_all(result))
+    finally:
+        await shutdown()
+
 
-        result = compiled_graph.invoke(
-            {"input": service_input}, {"configurable": {"thread_id": thread_id}}
+async def batch(path: str, key: str | None, concurrency: int, summary: str):
+    service_names = load_services(path, key=key)
+    print(f"Researching {len(service_names)} services, {concurrency} at a time...")
+
+    started = time.perf_counter()
+    try:
+        results = await run_batch(
+            compiled_graph, service_names, concurrency=concurrency
         )
-        print(result)
+    finally:
+        await shutdown()
+    write_summary(results, summary, wall_time=time.perf_counter() - started)
+
+    for result in results:
+        print(
+            f"{result.status:<8} {result.duration:8.1f}s "
+            f"{result.service_name} ({result.thread_id})"
+        )
+    print(f"Summary written to {summary}")
+
+
+async def resume(thread_id: str):
+    try:
+        try:
+            result = await resume_thread(compiled_graph, thread_id)
+        finally:
+            release_source_store(thread_id)
+        result = await BlobStore.from_configuration(Configuration()).resolve_all(result)
+    finally:
+        await shutdown()
+    print(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Research connector services.")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="JSONL or text file with one service name per line",
+    )
+    parser.add_argument(
+        "--key",
+        help="JSON field holding the service name in each batch record",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum number of services researched at the same time",
+    )
+    parser.add_argument(
+        "--summary",
+        default="my-docs/batch_summary.json",
+        help="Where to write the batch status and timings summary",
+    )
+    parser.add_argument(
+        "--checkpointer",
+        choices=["memory", "sqlite"],
+        help=(
+            "Keep checkpoints in memory or in a SQLite file that survives crashes "
+            "(default: memory, or sqlite with --resume)"
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint-db",
+        default="my-docs/checkpoints.sqlite",
+        help="SQLite file used by the sqlite checkpointer",
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="THREAD_ID",
+        help="Resume a thread from its last successful node in the checkpoint db",
+    )
+    args = parser.parse_args()
+
+    # Threads can only be resumed from checkpoints that outlived their process.
+    if args.resume and args.checkpointer == "memory":
+        parser.error("--resume requires the sqlite checkpointer")
+    if args.checkpointer is None:
+        args.checkpointer = "sqlite" if args.resume else "memory"
+
+    compiled_graph = graph(
+        {
+            "configurable": {
+                "checkpointer": args.checkpointer,
+                "checkpoint_db": args.checkpoint_db,
+            }
+        }
+    )
+
+    if args.resume:
+        asyncio.run(resume(args.resume))
+    elif args.batch:
+        asyncio.run(batch(args.batch, args.key, args.concurrency, args.summary))
+    else:
+        asyncio.run(main())
@@ -0,0 +1,169 @@
+"""Process-wide chat model clients shared by every node and agent.
+
+Models are keyed by model id, options and connection pool settings, and all
+OpenAI models with the same pool settings share one pair of HTTP clients so
+that concurrent runs reuse warm, kept-alive connections. Model ids can name
+their provider as GPT Researcher does, e.g. "anthropic:claude-3-5-haiku-latest".
+Responses go through the persistent SQLite response cache when it is enabled.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_openai import ChatOpenAI
+
+from .configuration import Configuration
+from .llm_cache import get_response_cache
+
+CHAT_MODEL_PROVIDERS = ("openai", "anthropic")
+
+_models: dict[tuple[Any, ...], BaseChatModel] = {}
+_http_clients: dict[tuple[float, ...], httpx.Client] = {}
+_http_async_clients: dict[tuple[float, ...], httpx.AsyncClient] = {}
+_registry_loop: Optional[asyncio.AbstractEventLoop] = None
+_closing: set[asyncio.Task] = set()
+
+
+def _pool_key(configuration: Configuration) -> tuple[float, ...]:
+    return (
+        configuration.llm_max_connections,
+        configuration.llm_max_keepalive_connections,
+        configuration.llm_keepalive_expiry,
+        configuration.llm_timeout,
+    )
+
+
+def _limits(configuration: Configuration) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=configuration.llm_max_connections,
+        max_keepalive_connections=configuration.llm_max_keepalive_connections,
+        keepalive_expiry=configuration.llm_keepalive_expiry,
+    )
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception as e:
+        # Connections of a closed loop cannot always be shut down cleanly.
+        print(f"Error closing a chat model HTTP client: {e}")
+
+
+def _close_async_clients(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    """Close the async clients of a previous event loop, on it if it still runs."""
+    clients = list(_http_async_clients.values())
+    _http_async_clients.clear()
+    for client in clients:
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            continue
+        try:
+            task = asyncio.get_running_loop().create_task(_aclose_quietly(client))
+        except RuntimeError:
+            asyncio.run(_aclose_quietly(client))
+        else:
+            _closing.add(task)
+            task.add_done_callback(_closing.discard)
+
+
+def parse_model(model: str) -> tuple[str, str]:
+    """Split a model id into its provider and model name."""
+    provider, separator, name = model.partition(":")
+    if not separator:
+        provider, name = "anthropic" if model.startswith("claude") else "openai", model
+    if provider not in CHAT_MODEL_PROVIDERS:
+        raise ValueError(f"Unsupported chat model provider: {provider}")
+    return provider, name
+
+
+def get_chat_model(
+    model: str, configuration: Optional[Configuration] = None, **options: Any
+) -> BaseChatModel:
+    """Return the shared chat model for a model id and options.
+
+    OpenAI models with the same connection pool settings share a pair of HTTP
+    clients. Async connections are bound to an event loop, so when the
+    registry is used from a new loop, the clients of the previous one are
+    closed and the registry starts over. Anthropic models keep the clients of
+    the Anthropic SDK, which cannot be shared.
+    """
+    global _registry_loop
+
+    configuration = configuration or Configuration()
+    provider, name = parse_model(model)
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    if _registry_loop is not loop:
+        _models.clear()
+        _close_async_clients(_registry_loop)
+        _registry_loop = loop
+
+    pool_key = _pool_key(configuration)
+    if pool_key not in _http_clients:
+        _http_clients[pool_key] = httpx.Client(
+            limits=_limits(configuration), timeout=configuration.llm_timeout
+        )
+    if pool_key not in _http_async_clients:
+        _http_async_clients[pool_key] = httpx.AsyncClient(
+            limits=_limits(configuration), timeout=configuration.llm_timeout
+        )
+
+    response_cache = None
+    if configuration.llm_cache:
+        response_cache = get_response_cache(
+            configuration.llm_cache_path,
+            max_entries_per_model=configuration.llm_cache_max_entries_per_model,
+            search_ttl=configuration.llm_cache_search_ttl,
+        )
+
+    key = (
+        model,
+        json.dumps(options, sort_keys=True, default=str),
+        configuration.llm_cache_path if response_cache else "",
+        pool_key,
+    )
+    if key in _models:
+        return _models[key]
+
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+
+        _models[key] = ChatAnthropic(
+            model=name,
+            default_request_timeout=configuration.llm_timeout,
+            cache=response_cache,
+            **options,
+        )
+    else:
+        _models[key] = ChatOpenAI(
+            model=name,
+            http_client=_http_clients[pool_key],
+            http_async_client=_http_async_clients[pool_key],
+            cache=response_cache,
+            **options,
+        )
+
+    return _models[key]
+
+
+async def close_chat_models() -> None:
+    """Close the shared HTTP clients and forget the registered models."""
+    global _registry_loop
+
+    for client in _http_async_clients.values():
+        await client.aclose()
+    for client in _http_clients.values():
+        client.close()
+
+    _models.clear()
+    _http_clients.clear()
+    _http_async_clients.clear()
+    _registry_loop = None
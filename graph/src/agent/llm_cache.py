@@ -0,0 +1,175 @@
+"""Persistent SQLite cache of chat model responses."""
+
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+MODEL_PATTERN = re.compile(r"['\"]model(?:_name)?['\"]: ['\"]([^'\"]+)['\"]")
+
+# Web search models answer from live results, e.g. gpt-4o-search-preview.
+SEARCH_MODEL_PATTERN = re.compile(r"search", re.IGNORECASE)
+
+
+def _model(llm_string: str) -> str:
+    match = MODEL_PATTERN.search(llm_string)
+    return match.group(1) if match else "unknown"
+
+
+def _normalize(prompt: str) -> str:
+    return re.sub(r"\s+", " ", prompt).strip()
+
+
+class SQLiteResponseCache(BaseCache):
+    """Chat model responses keyed by model, parameters and normalized prompt hash.
+
+    Hits and misses are counted per model, and each model keeps at most
+    `max_entries_per_model` responses, evicting the least recently used.
+    Responses of web search models expire `search_ttl` seconds after they
+    were stored, since the pages they found change.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries_per_model: int = 10000,
+        search_ttl: Optional[float] = None,
+    ):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.max_entries_per_model = max_entries_per_model
+        self.search_ttl = search_ttl
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_model_accessed"
+                " ON responses (model, accessed)"
+            )
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        prompt_hash = hashlib.sha256(_normalize(prompt).encode()).hexdigest()
+        return hashlib.sha256(f"{llm_string}\n{prompt_hash}".encode()).hexdigest()
+
+    def _expired(self, model: str, created: float) -> bool:
+        if self.search_ttl is None or not SEARCH_MODEL_PATTERN.search(model):
+            return False
+        return time.time() - created > self.search_ttl
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Return the cached generations for a prompt, if any."""
+        key = self._key(prompt, llm_string)
+        model = _model(llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._expired(model, row[1]):
+                with self._conn:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses[model] += 1
+                return None
+
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE responses SET accessed = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+
+        try:
+            generations = loads(row[0])
+        except Exception as e:
+            print(f"Error reading cached {model} response: {e}")
+            self.misses[model] += 1
+            return None
+
+        self.hits[model] += 1
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations for a prompt and evict the model's oldest entries."""
+        key = self._key(prompt, llm_string)
+        model = _model(llm_string)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, dumps(list(return_val)), now, now),
+            )
+            self._conn.execute(
+                """
+                DELETE FROM responses WHERE model = ? AND key NOT IN (
+                    SELECT key FROM responses WHERE model = ?
+                    ORDER BY accessed DESC LIMIT ?
+                )
+                """,
+                (model, model, self.max_entries_per_model),
+            )
+
+    def clear(self, model: Optional[str] = None, **kwargs: Any) -> None:
+        """Remove every cached response, or only those of one model."""
+        with self._lock, self._conn:
+            if model is None:
+                self._conn.execute("DELETE FROM responses")
+            else:
+                self._conn.execute("DELETE FROM responses WHERE model = ?", (model,))
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Hits and misses per model since the cache was opened."""
+        return {
+            model: {"hits": self.hits[model], "misses": self.misses[model]}
+            for model in sorted(set(self.hits) | set(self.misses))
+        }
+
+
+_response_caches: dict[str, SQLiteResponseCache] = {}
+
+
+def get_response_cache(
+    path: str, max_entries_per_model: int, search_ttl: Optional[float] = None
+) -> SQLiteResponseCache:
+    """Return the process-wide response cache stored at `path`."""
+    if path not in _response_caches:
+        _response_caches[path] = SQLiteResponseCache(
+            path, max_entries_per_model=max_entries_per_model, search_ttl=search_ttl
+        )
+    return _response_caches[path]
+
+
+def response_cache_stats() -> dict[str, dict[str, int]]:
+    """Hits and misses per model across every open response cache."""
+    stats: dict[str, dict[str, int]] = {}
+    for cache in _response_caches.values():
+        for model, counts in cache.stats().items():
+            totals = stats.setdefault(model, {"hits": 0, "misses": 0})
+            totals["hits"] += counts["hits"]
+            totals["misses"] += counts["misses"]
+    return stats
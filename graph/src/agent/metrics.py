@@ -0,0 +1,477 @@
+"""Per-node timings, token usage and estimated cost of the research graph.
+
+Every node registered in `graph()` runs through `instrument`, which measures
+its wall time and how much of it was spent waiting on LLM calls, searches
+and fetching or scraping pages; the rest is local work. LLM calls are seen
+through a LangChain callback handler that applies to every chat model
+called during the node, including GPT Researcher's.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler, adispatch_custom_event
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tracers.context import register_configure_hook
+
+from .artifacts import ArtifactStore
+from .configuration import Configuration
+from .utils import count_tokens
+
+# USD per million input and output tokens, matched by model name prefix.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o4-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "claude-3-7-sonnet": (3.00, 15.00),
+    "claude-3-5-sonnet": (3.00, 15.00),
+    "claude-3-5-haiku": (0.80, 4.00),
+    "claude-sonnet-4": (3.00, 15.00),
+    "claude-opus-4": (15.00, 75.00),
+}
+
+WAIT_KINDS = ("llm", "search", "scrape")
+
+
+def model_price(model: str) -> Optional[tuple[float, float]]:
+    """The price of a model, if it is known."""
+    name = model.split(":", 1)[-1].split("/")[-1]
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if name.startswith(prefix):
+            return MODEL_PRICES[prefix]
+    return None
+
+
+class Stopwatch:
+    """Time during which at least one operation is in progress.
+
+    Overlapping operations, such as concurrent LLM calls, are only counted
+    once, so the total never exceeds the wall time of the node.
+    """
+
+    def __init__(self):
+        """Start with no time counted and no operation in progress."""
+        self.total = 0.0
+        self._active = 0
+        self._since = 0.0
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Note that an operation started."""
+        with self._lock:
+            if self._active == 0:
+                self._since = time.perf_counter()
+            self._active += 1
+
+    def stop(self) -> None:
+        """Note that an operation ended."""
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self.total += time.perf_counter() - self._since
+
+
+@dataclass
+class NodeMetrics:
+    """What one execution of a node spent its time and tokens on."""
+
+    node: str
+    service_name: str
+    run_id: str
+    status: str = "success"
+    wall_time: float = 0.0
+    llm_calls: int = 0
+    tokens: dict[str, dict[str, int]] = field(
+        default_factory=lambda: defaultdict(lambda: {"input": 0, "output": 0})
+    )
+    clocks: dict[str, Stopwatch] = field(
+        default_factory=lambda: {kind: Stopwatch() for kind in (*WAIT_KINDS, "any")}
+    )
+    # The token breakdown of each prompt composed by the node, by agent.
+    prompt_tokens: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    @contextmanager
+    def waiting(self, kind: str) -> Iterator[None]:
+        """Count the time of the block as waiting on `kind`."""
+        self.clocks[kind].start()
+        self.clocks["any"].start()
+        try:
+            yield
+        finally:
+            self.clocks[kind].stop()
+            self.clocks["any"].stop()
+
+    @property
+    def local_time(self) -> float:
+        """The wall time not spent waiting on anything."""
+        return max(self.wall_time - self.clocks["any"].total, 0.0)
+
+    def cost(self, model: str) -> float:
+        """The estimated cost of the tokens of a model, or 0 if its price is unknown."""
+        price = model_price(model)
+        if price is None:
+            return 0.0
+        tokens = self.tokens[model]
+        return (tokens["input"] * price[0] + tokens["output"] * price[1]) / 1e6
+
+    def to_event(self) -> dict[str, Any]:
+        """The metrics as a JSON-serializable dict."""
+        return {
+            "node": self.node,
+            "service_name": self.service_name,
+            "run_id": self.run_id,
+            "status": self.status,
+            "wall_time": self.wall_time,
+            "time": {
+                **{kind: self.clocks[kind].total for kind in WAIT_KINDS},
+                "local": self.local_time,
+            },
+            "llm_calls": self.llm_calls,
+            "tokens": {model: dict(tokens) for model, tokens in self.tokens.items()},
+            "cost": {model: self.cost(model) for model in self.tokens},
+            "total_cost": sum(self.cost(model) for model in self.tokens),
+            "unpriced_models": [m for m in self.tokens if model_price(m) is None],
+            "prompt_tokens": self.prompt_tokens,
+        }
+
+    def summary(self) -> str:
+        """A one-line summary for the logs."""
+        times = ", ".join(
+            f"{kind} {self.clocks[kind].total:.1f}s" for kind in WAIT_KINDS
+        )
+        tokens = sum(t["input"] + t["output"] for t in self.tokens.values())
+        cost = sum(self.cost(model) for model in self.tokens)
+        return (
+            f"{self.node}: {self.wall_time:.1f}s ({times}, "
+            f"local {self.local_time:.1f}s), {tokens} tokens, ${cost:.4f}"
+        )
+
+
+_current_node: ContextVar[Optional[NodeMetrics]] = ContextVar(
+    "current_node_metrics", default=None
+)
+
+
+@contextmanager
+def waiting(kind: str) -> Iterator[None]:
+    """Count the time of the block as waiting on `kind` for the current node."""
+    metrics = _current_node.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.waiting(kind):
+        yield
+
+
+def timed(kind: str) -> Callable:
+    """Decorate a function whose calls are time spent waiting on `kind`."""
+
+    def decorator(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with waiting(kind):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with waiting(kind):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_prompt_tokens(agent: str, breakdown: dict[str, Any]) -> None:
+    """Record the token breakdown of a prompt composed by the current node."""
+    metrics = _current_node.get()
+    if metrics is not None:
+        metrics.prompt_tokens[agent] = breakdown
+
+
+def attach_timers(researcher: Any) -> None:
+    """Time a GPT Researcher's searches and scraping for the node metrics."""
+    scraper_manager = researcher.scraper_manager
+    scraper_manager.browse_urls = timed("scrape")(scraper_manager.browse_urls)
+    researcher.retrievers = [
+        type(
+            retriever.__name__,
+            (retriever,),
+            {"search": timed("search")(retriever.search)},
+        )
+        for retriever in researcher.retrievers
+    ]
+
+
+class NodeMetricsHandler(BaseCallbackHandler):
+    """Times the LLM calls of a node and counts their tokens per model."""
+
+    run_inline = True
+
+    def __init__(self, metrics: NodeMetrics):
+        """Count the LLM calls into `metrics`."""
+        self.metrics = metrics
+        self._calls: dict[uuid.UUID, tuple[str, list[str]]] = {}
+
+    @staticmethod
+    def _model(serialized: dict[str, Any], kwargs: dict[str, Any]) -> str:
+        metadata = kwargs.get("metadata") or {}
+        params = kwargs.get("invocation_params") or {}
+        return (
+            metadata.get("ls_model_name")
+            or params.get("model")
+            or params.get("model_name")
+            or (serialized or {}).get("kwargs", {}).get("model_name")
+            or "unknown"
+        )
+
+    def _start(self, run_id: uuid.UUID, model: str, prompts: list[str]) -> None:
+        self._calls[run_id] = (model, prompts)
+        self.metrics.llm_calls += 1
+        self.metrics.clocks["llm"].start()
+        self.metrics.clocks["any"].start()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        """Start timing a completion call."""
+        self._start(run_id, self._model(serialized, kwargs), prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        """Start timing a chat model call."""
+        prompts = [str(m.content) for batch in messages for m in batch]
+        self._start(run_id, self._model(serialized, kwargs), prompts)
+
+    def _stop(self, run_id: uuid.UUID) -> Optional[tuple[str, list[str]]]:
+        call = self._calls.pop(run_id, None)
+        if call is not None:
+            self.metrics.clocks["llm"].stop()
+            self.metrics.clocks["any"].stop()
+        return call
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs) -> None:
+        """Stop timing a call and count its tokens."""
+        call = self._stop(run_id)
+        if call is None:
+            return
+        model, prompts = call
+        input_tokens, output_tokens = _usage(response)
+        # Streamed responses may come without usage, so it is estimated.
+        if input_tokens is None:
+            input_tokens = sum(count_tokens(prompt) for prompt in prompts)
+            output_tokens = sum(
+                count_tokens(generation.text)
+                for generations in response.generations
+                for generation in generations
+            )
+        self.metrics.tokens[model]["input"] += input_tokens
+        self.metrics.tokens[model]["output"] += output_tokens
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        """Stop timing a failed call."""
+        self._stop(run_id)
+
+
+def _usage(response: LLMResult) -> tuple[Optional[int], Optional[int]]:
+    usage = None
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if getattr(message, "usage_metadata", None):
+                usage = usage or {"input_tokens": 0, "output_tokens": 0}
+                usage["input_tokens"] += message.usage_metadata["input_tokens"]
+                usage["output_tokens"] += message.usage_metadata["output_tokens"]
+    if usage:
+        return usage["input_tokens"], usage["output_tokens"]
+
+    llm_output = response.llm_output or {}
+    usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+    if "prompt_tokens" in usage:
+        return usage["prompt_tokens"], usage.get("completion_tokens", 0)
+    if "input_tokens" in usage:
+        return usage["input_tokens"], usage.get("output_tokens", 0)
+    return None, None
+
+
+_metrics_handler: ContextVar[Optional[NodeMetricsHandler]] = ContextVar(
+    "node_metrics_handler", default=None
+)
+register_configure_hook(_metrics_handler, inheritable=True)
+
+
+class PrometheusRegistry:
+    """Counters of every node executed by the process, in the text format."""
+
+    HELP = {
+        "research_node_runs_total": "Node executions by status.",
+        "research_node_seconds_total": "Node time by kind: wall, llm, search, "
+        "scrape and local.",
+        "research_llm_calls_total": "LLM calls made by nodes.",
+        "research_llm_tokens_total": "LLM tokens by node, model and direction.",
+        "research_llm_cost_usd_total": "Estimated LLM cost by node and model.",
+    }
+
+    def __init__(self):
+        """Start with no counters."""
+        self._counters: dict[str, dict[tuple[tuple[str, str], ...], float]] = (
+            defaultdict(lambda: defaultdict(float))
+        )
+        self._lock = threading.Lock()
+
+    def _add(self, name: str, value: float, **labels: str) -> None:
+        self._counters[name][tuple(sorted(labels.items()))] += value
+
+    def observe(self, metrics: NodeMetrics) -> None:
+        """Add the metrics of a node execution to the counters."""
+        node = metrics.node
+        with self._lock:
+            self._add("research_node_runs_total", 1, node=node, status=metrics.status)
+            self._add("research_llm_calls_total", metrics.llm_calls, node=node)
+            self._add(
+                "research_node_seconds_total", metrics.wall_time, node=node, kind="wall"
+            )
+            self._add(
+                "research_node_seconds_total",
+                metrics.local_time,
+                node=node,
+                kind="local",
+            )
+            for kind in WAIT_KINDS:
+                self._add(
+                    "research_node_seconds_total",
+                    metrics.clocks[kind].total,
+                    node=node,
+                    kind=kind,
+                )
+            for model, tokens in metrics.tokens.items():
+                for direction, count in tokens.items():
+                    self._add(
+                        "research_llm_tokens_total",
+                        count,
+                        node=node,
+                        model=model,
+                        direction=direction,
+                    )
+                self._add(
+                    "research_llm_cost_usd_total",
+                    metrics.cost(model),
+                    node=node,
+                    model=model,
+                )
+
+    @staticmethod
+    def _escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def render(self) -> str:
+        """The counters in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            for name, series in self._counters.items():
+                lines.append(f"# HELP {name} {self.HELP[name]}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in series.items():
+                    rendered = ",".join(
+                        f'{key}="{self._escape(label)}"' for key, label in labels
+                    )
+                    lines.append(f"{name}{{{rendered}}} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | Path) -> None:
+        """Replace the file atomically, as textfile collectors expect."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_text(self.render())
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+
+registry = PrometheusRegistry()
+
+
+async def emit(metrics: NodeMetrics, config: RunnableConfig) -> None:
+    """Publish the metrics of a node execution.
+
+    They are dispatched as a `node_metrics` custom event to the run's
+    callbacks and event stream, written as `metrics/<node>.json` next to the
+    run's reports, and added to the Prometheus text file of the process.
+    """
+    configuration = Configuration.from_runnable_config(config)
+    event = metrics.to_event()
+    print(f"Metrics {metrics.summary()}")
+
+    # Dispatching fails outside of a run, e.g. when a node is called directly,
+    # which must not keep the metrics from being written.
+    try:
+        await adispatch_custom_event("node_metrics", event, config=config)
+    except Exception as e:
+        print(f"Error dispatching the metrics of {metrics.node}: {e}")
+    await ArtifactStore.from_configuration(configuration).write(
+        metrics.service_name,
+        metrics.run_id,
+        f"metrics/{metrics.node}.json",
+        json.dumps(event, indent=2),
+    )
+    registry.observe(metrics)
+    await asyncio.to_thread(registry.write, configuration.metrics_file)
+
+
+def instrument(node: Callable) -> Callable:
+    """Wrap a graph node so that each of its executions emits its metrics."""
+
+    @functools.wraps(node)
+    async def instrumented(state: Any, config: RunnableConfig) -> Any:
+        if not Configuration.from_runnable_config(config).metrics:
+            result = node(state, config)
+            return await result if inspect.isawaitable(result) else result
+
+        metrics = NodeMetrics(
+            node=node.__name__,
+            service_name=state.input,
+            run_id=(config or {}).get("configurable", {}).get("thread_id", ""),
+        )
+        node_token = _current_node.set(metrics)
+        handler_token = _metrics_handler.set(NodeMetricsHandler(metrics))
+        started = time.perf_counter()
+        try:
+            result = node(state, config)
+            return await result if inspect.isawaitable(result) else result
+        except BaseException:
+            metrics.status = "error"
+            raise
+        finally:
+            metrics.wall_time = time.perf_counter() - started
+            _metrics_handler.reset(handler_token)
+            _current_node.reset(node_token)
+            # Failing to publish metrics must not fail, or mask the error of, the node.
+            try:
+                await emit(metrics, config)
+            except Exception as e:
+                print(f"Error emitting the metrics of {metrics.node}: {e}")
+
+    return instrumented
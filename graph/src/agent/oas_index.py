@@ -0,0 +1,289 @@
+"""Index the operations of an OpenAPI/Swagger document and pick identity endpoints."""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import yaml
+
+HTTP_METHODS = ("get", "post", "put", "patch", "delete")
+
+IDENTITY_RESOURCES = {
+    "users": {
+        "user",
+        "users",
+        "member",
+        "members",
+        "account",
+        "accounts",
+        "people",
+        "person",
+    },
+    "groups": {
+        "group",
+        "groups",
+        "team",
+        "teams",
+        "organization",
+        "organizations",
+        "org",
+        "orgs",
+    },
+    "roles": {
+        "role",
+        "roles",
+        "permission",
+        "permissions",
+        "entitlement",
+        "entitlements",
+        "policy",
+        "policies",
+        "license",
+        "licenses",
+    },
+}
+
+TENANT_RESOURCES = {
+    "organization",
+    "organizations",
+    "org",
+    "orgs",
+    "tenant",
+    "tenants",
+    "workspace",
+    "workspaces",
+    "account",
+    "accounts",
+}
+
+
+def load_spec(text: str) -> Optional[dict[str, Any]]:
+    """Parse an OpenAPI/Swagger document, or return None if the text is not one."""
+    head = text.lstrip()[:1000]
+    try:
+        if head.startswith("{"):
+            spec = json.loads(text)
+        elif re.search(r"^(openapi|swagger)\s*:", head, re.MULTILINE):
+            spec = yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+        else:
+            return None
+    except (ValueError, yaml.YAMLError):
+        return None
+
+    if isinstance(spec, dict) and ("openapi" in spec or "swagger" in spec):
+        return spec
+    return None
+
+
+def _schema_name(schema: Any) -> str:
+    if not isinstance(schema, dict):
+        return ""
+    if "$ref" in schema:
+        return schema["$ref"].rsplit("/", 1)[-1]
+    if schema.get("type") == "array":
+        return f"array of {_schema_name(schema.get('items')) or 'items'}"
+    return schema.get("type", "")
+
+
+def _content_schema(body: Any) -> str:
+    if not isinstance(body, dict):
+        return ""
+    # OpenAPI 3 nests schemas under media types, Swagger 2 puts them on the body.
+    for media_type in (body.get("content") or {}).values():
+        return _schema_name(media_type.get("schema"))
+    return _schema_name(body.get("schema"))
+
+
+def _body_parameter_schema(parameters: list[Any]) -> str:
+    # Swagger 2 sends request bodies as an "in: body" parameter.
+    for parameter in parameters:
+        if isinstance(parameter, dict) and parameter.get("in") == "body":
+            return _schema_name(parameter.get("schema"))
+    return ""
+
+
+def _words(text: str) -> list[str]:
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
+    return [word for word in re.split(r"[^a-z0-9]+", text.lower()) if word]
+
+
+@dataclass
+class Operation:
+    """A single path and method of the API."""
+
+    path: str
+    method: str
+    summary: str = ""
+    operation_id: str = ""
+    tags: list[str] = field(default_factory=list)
+    parameters: list[str] = field(default_factory=list)
+    request_schema: str = ""
+    response_schema: str = ""
+
+    @property
+    def segments(self) -> list[str]:
+        return [segment for segment in self.path.strip("/").split("/") if segment]
+
+    @property
+    def resource_segments(self) -> list[str]:
+        """Path segments that name resources rather than parameters."""
+        return [segment.lower() for segment in self.segments if "{" not in segment]
+
+    @property
+    def is_collection(self) -> bool:
+        """Whether this lists a collection, e.g. `GET /users`."""
+        return (
+            self.method == "GET"
+            and bool(self.segments)
+            and "{" not in self.segments[-1]
+        )
+
+    def resource(self) -> Optional[str]:
+        """The identity resource this operation manages, if any.
+
+        Nested resources only count when every parent is a tenant or organization.
+        """
+        segments = self.resource_segments
+        if not segments:
+            return None
+
+        parents = [
+            segment
+            for segment in segments[:-1]
+            if not re.fullmatch(r"v\d+(\.\d+)*|api", segment)
+        ]
+        if not all(set(_words(parent)) & TENANT_RESOURCES for parent in parents):
+            return None
+
+        # The last path segment names the resource, falling back to the tags.
+        candidates = [set(_words(segments[-1])), set(_words(" ".join(self.tags)))]
+        for words in candidates:
+            for resource, resource_words in IDENTITY_RESOURCES.items():
+                if words & resource_words:
+                    return resource
+        return None
+
+
+@dataclass
+class OASIndex:
+    """All operations of an API document, with their servers."""
+
+    title: str
+    base_url: str
+    operations: list[Operation]
+
+    @classmethod
+    def from_spec(cls, spec: dict[str, Any]) -> OASIndex:
+        """Build the index from a parsed OpenAPI 3 or Swagger 2 document."""
+        if spec.get("servers"):
+            base_url = spec["servers"][0].get("url", "")
+        elif spec.get("host"):
+            scheme = (spec.get("schemes") or ["https"])[0]
+            base_url = f"{scheme}://{spec['host']}{spec.get('basePath', '')}"
+        else:
+            base_url = ""
+
+        operations = []
+        for path, item in (spec.get("paths") or {}).items():
+            if not isinstance(item, dict):
+                continue
+            shared_parameters = item.get("parameters") or []
+            for method in HTTP_METHODS:
+                operation = item.get(method)
+                if not isinstance(operation, dict):
+                    continue
+
+                parameters = shared_parameters + (operation.get("parameters") or [])
+                responses = operation.get("responses") or {}
+                success = next(
+                    (code for code in responses if str(code).startswith("2")), None
+                )
+                operations.append(
+                    Operation(
+                        path=path,
+                        method=method.upper(),
+                        summary=operation.get("summary")
+                        or operation.get("description", ""),
+                        operation_id=operation.get("operationId", ""),
+                        tags=operation.get("tags") or [],
+                        parameters=[
+                            f"{parameter.get('name')} ({parameter.get('in')})"
+                            for parameter in parameters
+                            if isinstance(parameter, dict) and "name" in parameter
+                        ],
+                        request_schema=_content_schema(operation.get("requestBody"))
+                        or _body_parameter_schema(parameters),
+                        response_schema=_content_schema(responses.get(success)),
+                    )
+                )
+
+        return cls(
+            title=(spec.get("info") or {}).get("title", ""),
+            base_url=base_url.rstrip("/"),
+            operations=operations,
+        )
+
+    @classmethod
+    def from_text(cls, text: str) -> Optional[OASIndex]:
+        """Build the index from a document, or return None if it is not a spec."""
+        spec = load_spec(text)
+        return cls.from_spec(spec) if spec else None
+
+    def identity_endpoints(self) -> IdentityEndpoints:
+        """Group the operations managing users, groups and roles."""
+        endpoints = IdentityEndpoints(base_url=self.base_url)
+        for operation in self.operations:
+            resource = operation.resource()
+            if resource:
+                endpoints.operations.setdefault(resource, []).append(operation)
+        return endpoints
+
+
+@dataclass
+class IdentityEndpoints:
+    """The operations of an API grouped by identity resource."""
+
+    base_url: str
+    operations: dict[str, list[Operation]] = field(default_factory=dict)
+
+    @property
+    def unambiguous(self) -> bool:
+        """Whether users, and any groups or roles, each have a single list endpoint."""
+        collections = {
+            resource: [operation for operation in operations if operation.is_collection]
+            for resource, operations in self.operations.items()
+        }
+        if len(collections.get("users", [])) != 1:
+            return False
+        return all(len(operations) <= 1 for operations in collections.values())
+
+    @staticmethod
+    def _parameters(operation: Operation) -> str:
+        parameters = list(operation.parameters)
+        if operation.request_schema:
+            parameters.append(f"{operation.request_schema} (body)")
+        return ", ".join(parameters) or "None"
+
+    def render(self) -> str:
+        """Render the endpoints in the pre-research output format."""
+        sections = []
+        for resource, operations in self.operations.items():
+            lines = [f"## {resource.capitalize()}"]
+            for operation in operations:
+                lines.extend(
+                    [
+                        "",
+                        f"- {operation.operation_id or operation.summary or operation.path}",
+                        f"- {operation.summary}",
+                        f"- {self.base_url}{operation.path}",
+                        f"- {operation.method}",
+                        f"- {self._parameters(operation)}",
+                        f"- {operation.response_schema or 'None'}",
+                    ]
+                )
+            sections.append("\n".join(lines))
+
+        return "\n\n".join(sections)
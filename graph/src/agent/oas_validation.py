@@ -0,0 +1,204 @@
+"""Probe candidate OAS URLs concurrently and rank them on what they return."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from .configuration import Configuration
+from .fetch import get_http_client, sniff_content_type
+from .http_cache import HTTPCache
+from .metrics import timed
+from .oas_index import load_spec
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'`\)\]]+")
+CONFIDENCE_PATTERN = re.compile(r"confidence_level\W*(\d)")
+
+# A line holding a field of a candidate, e.g. `- "url": ...` or `1. **URL**: ...`.
+LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s")
+FIELD_PATTERN = re.compile(r"^[\s\-*+>#\d.)]*[*_\"'`]*(\w+)[*_\"'`]*\s*[:=|]")
+
+# How much each kind of document is worth when choosing the OAS URL.
+KIND_SCORES = {
+    "openapi": 100,
+    "swagger": 90,
+    "postman": 70,
+    "html": 20,
+    "other": 0,
+}
+
+
+@dataclass
+class Candidate:
+    """A candidate OAS URL and the evidence gathered by probing it."""
+
+    url: str
+    confidence: int = 0
+    kind: str = ""
+    status_code: Optional[int] = None
+    elapsed: float = 0.0
+    error: str = ""
+
+    @property
+    def is_spec(self) -> bool:
+        """Whether the URL returned a parseable OAS, Swagger or Postman document."""
+        return self.kind in ("openapi", "swagger", "postman")
+
+    @property
+    def reachable(self) -> bool:
+        """Whether the URL answered with a status code."""
+        return not self.error and self.status_code is not None
+
+    @property
+    def score(self) -> int:
+        """How good a choice the URL is, from its kind and confidence."""
+        if not self.reachable:
+            return -1
+        return KIND_SCORES.get(self.kind, 0) + self.confidence
+
+
+def _table_url_spans(lines: list[tuple[int, str]]) -> list[tuple[int, int, int]]:
+    """The `url` cells of Markdown tables, with their `confidence_level`."""
+    spans = []
+    columns: dict[str, int] = {}
+    for offset, line in lines:
+        if not line.lstrip().startswith("|"):
+            columns = {}
+            continue
+
+        cells, start = [], offset
+        for cell in line.split("|"):
+            cells.append((start, start + len(cell), cell.strip(" *`\"'").lower()))
+            start += len(cell) + 1
+        if not columns:
+            columns = {name: index for index, (_, _, name) in enumerate(cells)}
+            columns.setdefault("url", -1)
+        elif 0 <= columns["url"] < len(cells):
+            start, end, _ = cells[columns["url"]]
+            confidence = columns.get("confidence_level", len(cells))
+            value = cells[confidence][2] if confidence < len(cells) else ""
+            spans.append((start, end, int(value) if value.isdigit() else 0))
+    return spans
+
+
+def _candidate_spans(markdown: str) -> list[tuple[int, int, Optional[int]]]:
+    """The parts of a candidate list that hold candidate URLs.
+
+    Those are the `url` fields of the candidates, or the `url` column of a
+    table. Lists without such fields fall back to their list items, except
+    explanations, so that URLs mentioned in prose are never candidates.
+    Table cells come with their confidence, which is read from the text
+    following the URL otherwise.
+    """
+    lines, offset = [], 0
+    for line in markdown.splitlines(keepends=True):
+        lines.append((offset, line))
+        offset += len(line)
+
+    spans: list[tuple[int, int, Optional[int]]] = []
+    for offset, line in lines:
+        field = FIELD_PATTERN.match(line)
+        if field and field.group(1).lower() == "url":
+            spans.append((offset, offset + len(line), None))
+    spans += _table_url_spans(lines)
+    if spans:
+        return sorted(spans)
+
+    for offset, line in lines:
+        field = FIELD_PATTERN.match(line)
+        if field and field.group(1).lower() == "explanation":
+            continue
+        if LIST_ITEM_PATTERN.match(line):
+            spans.append((offset, offset + len(line), None))
+    return spans
+
+
+def extract_candidates(markdown: str) -> list[Candidate]:
+    """Find the URLs of a candidate list, with their self-reported confidence."""
+    matches = [
+        (match, confidence)
+        for start, end, confidence in _candidate_spans(markdown)
+        for match in URL_PATTERN.finditer(markdown, start, end)
+    ]
+    candidates = {}
+    for index, (match, confidence) in enumerate(matches):
+        url = match.group().rstrip(".,;:*")
+        if confidence is None:
+            end = len(markdown)
+            if index + 1 < len(matches):
+                end = matches[index + 1][0].start()
+            found = CONFIDENCE_PATTERN.search(markdown, match.end(), end)
+            confidence = int(found.group(1)) if found else 0
+        if url not in candidates:
+            candidates[url] = Candidate(url=url, confidence=confidence)
+    return list(candidates.values())
+
+
+def detect_kind(content_type: str, body: str) -> str:
+    """Classify a response as an OpenAPI, Swagger or Postman document, HTML or other."""
+    spec = load_spec(body) if content_type in ("json", "yaml", "text") else None
+    if spec is not None:
+        return "openapi" if "openapi" in spec else "swagger"
+
+    if content_type == "json":
+        try:
+            info = json.loads(body).get("info") or {}
+        except (ValueError, AttributeError):
+            return "other"
+        if "_postman_id" in info or "getpostman.com" in str(info.get("schema", "")):
+            return "postman"
+
+    return "html" if content_type == "html" else "other"
+
+
+@timed("scrape")
+async def probe(
+    candidate: Candidate, configuration: Configuration, cache: Optional[HTTPCache]
+) -> Candidate:
+    """Request a candidate URL and record what kind of document it returns."""
+    started = time.perf_counter()
+    try:
+        response = await get_http_client(configuration).get(
+            candidate.url, timeout=configuration.oas_validation_timeout
+        )
+        candidate.status_code = response.status_code
+        response.raise_for_status()
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        candidate.error = str(e) or type(e).__name__
+        return candidate
+    finally:
+        candidate.elapsed = time.perf_counter() - started
+
+    content_type = sniff_content_type(
+        candidate.url, response.headers.get("content-type", ""), response.text
+    )
+    candidate.kind = detect_kind(content_type, response.text)
+
+    # The chosen spec is fetched again by pre-research, so keep it around.
+    if cache and candidate.is_spec:
+        await cache.aset(candidate.url, response, content_type)
+
+    return candidate
+
+
+async def validate_candidates(
+    markdown: str, configuration: Configuration
+) -> list[Candidate]:
+    """Probe every candidate URL concurrently and rank them best first."""
+    cache = HTTPCache.from_configuration(configuration)
+    semaphore = asyncio.Semaphore(configuration.oas_validation_concurrency)
+
+    async def bounded_probe(candidate: Candidate) -> Candidate:
+        async with semaphore:
+            return await probe(candidate, configuration, cache)
+
+    candidates = await asyncio.gather(
+        *(bounded_probe(candidate) for candidate in extract_candidates(markdown))
+    )
+    return sorted(candidates, key=lambda candidate: candidate.score, reverse=True)
@@ -0,0 +1,406 @@
+"""Opt-in CPU and memory profiles of graph nodes.
+
+With `profile` enabled, a sampling profiler reads the stack of every thread
+each `profile_interval` seconds and attributes each sample to the node the
+thread is working for. A node is tagged through a context variable, which
+the tasks it starts and the work it sends to threads inherit, so nodes
+running concurrently get separate profiles. Allocations are traced with
+`tracemalloc` for the node's duration. Each node writes, under `profiles/`
+next to the run's reports:
+
+- `<node>.folded`: collapsed stacks, for flamegraph.pl or speedscope,
+- `<node>.cpu.txt`: the functions with the most samples,
+- `<node>.memory.txt`: the lines that allocated the most memory.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar
+from types import CodeType
+from typing import Any, Callable, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from .artifacts import ArtifactStore
+from .configuration import Configuration
+
+
+@functools.lru_cache(maxsize=None)
+def _label(code: CodeType) -> str:
+    directory, name = os.path.split(code.co_filename)
+    path = f"{os.path.basename(directory)}/{name}"
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class NodeProfile:
+    """The stack samples taken while one execution of a node was running."""
+
+    def __init__(self, node: str):
+        """Start with no samples."""
+        self.node = node
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.wall_time = 0.0
+
+    @property
+    def samples(self) -> int:
+        """How many samples were taken."""
+        return sum(self.stacks.values())
+
+    def render_folded(self) -> str:
+        """The samples as collapsed stacks, one per line with its count."""
+        return "".join(
+            f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items()
+        )
+
+    def render_top(self, interval: float, limit: int) -> str:
+        """The functions with the most samples, in them or in what they call."""
+        own: Counter[str] = Counter()
+        total: Counter[str] = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+
+        samples = max(self.samples, 1)
+        lines = [
+            f"{self.node}: {self.samples} samples every {interval * 1000:g}ms "
+            f"over {self.wall_time:.2f}s of wall time",
+            "",
+            f"{'own':>7} {'total':>7}  function",
+        ]
+        for label, count in total.most_common(limit):
+            lines.append(
+                f"{own[label] / samples:>7.1%} {count / samples:>7.1%}  {label}"
+            )
+        return "\n".join(lines) + "\n"
+
+
+_current_profile: ContextVar[Optional[NodeProfile]] = ContextVar(
+    "current_node_profile", default=None
+)
+# The profile each task and worker thread is working for, read by the sampler.
+_task_tags: dict[asyncio.Task, NodeProfile] = {}
+_thread_tags: dict[int, NodeProfile] = {}
+_loops: dict[int, asyncio.AbstractEventLoop] = {}
+
+
+def _tag_task(task: asyncio.Task, profile: NodeProfile) -> None:
+    _task_tags[task] = profile
+    task.add_done_callback(_untag_task)
+
+
+def _untag_task(task: asyncio.Task) -> None:
+    _task_tags.pop(task, None)
+
+
+def _tagging_task_factory(previous: Optional[Callable]) -> Callable:
+    """A task factory tagging the tasks created for a node with its profile."""
+
+    def factory(loop, coro, context=None):
+        kwargs = {} if context is None else {"context": context}
+        if previous is None:
+            task = asyncio.Task(coro, loop=loop, **kwargs)
+        else:
+            task = previous(loop, coro, **kwargs)
+        # Tasks inherit the context they are created in, and with it the node.
+        current = context or contextvars.copy_context()
+        profile = current.get(_current_profile)
+        if profile is not None:
+            _tag_task(task, profile)
+        return task
+
+    factory.previous = previous
+    return factory
+
+
+def _run_tagged(
+    profile: NodeProfile, function: Callable, /, *args: Any, **kwargs: Any
+) -> Any:
+    thread_id = threading.get_ident()
+    previous = _thread_tags.get(thread_id)
+    _thread_tags[thread_id] = profile
+    try:
+        return function(*args, **kwargs)
+    finally:
+        if previous is None:
+            _thread_tags.pop(thread_id, None)
+        else:
+            _thread_tags[thread_id] = previous
+
+
+_submit = ThreadPoolExecutor.submit
+
+# CPython's map of each event loop to the task it is running. The sampler reads
+# it without taking a lock, and falls back to the public API without it.
+_current_tasks = getattr(asyncio.tasks, "_current_tasks", None)
+
+
+def _running_task(loop: asyncio.AbstractEventLoop) -> Optional[asyncio.Task]:
+    if isinstance(_current_tasks, dict):
+        return _current_tasks.get(loop)
+    try:
+        return asyncio.current_task(loop)
+    except RuntimeError:
+        return None
+
+
+@functools.wraps(_submit)
+def _tagging_submit(
+    executor: ThreadPoolExecutor, function: Callable, /, *args: Any, **kwargs: Any
+) -> Future:
+    # Executors do not pass on the context, but their work is submitted in it.
+    profile = _current_profile.get()
+    if profile is not None:
+        return _submit(executor, _run_tagged, profile, function, *args, **kwargs)
+    return _submit(executor, function, *args, **kwargs)
+
+
+class StackSampler:
+    """Samples the stacks of every thread for the nodes being profiled.
+
+    Each sample goes to the node the thread is working for: worker threads
+    while they run work a node submitted, e.g. with `asyncio.to_thread` or
+    `run_in_executor`, and event loop threads while they run a task of the
+    node, including the tasks it gathers.
+    """
+
+    def __init__(self, interval: float):
+        """Sample every `interval` seconds while profiles are added."""
+        self.interval = interval
+        self._profiles: set[NodeProfile] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, profile: NodeProfile) -> None:
+        """Start sampling for a profile."""
+        with self._lock:
+            self._profiles.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="node-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def remove(self, profile: NodeProfile) -> None:
+        """Stop sampling for a profile."""
+        with self._lock:
+            self._profiles.discard(profile)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._profiles:
+                    self._thread = None
+                    return
+                try:
+                    self._sample()
+                except Exception as e:
+                    # Profiles end up partial, but the nodes keep running.
+                    print(f"Stopped sampling node stacks: {e}")
+                    self._thread = None
+                    return
+
+    @staticmethod
+    def _profile_of(thread_id: int) -> Optional[NodeProfile]:
+        profile = _thread_tags.get(thread_id)
+        if profile is None and thread_id in _loops:
+            task = _running_task(_loops[thread_id])
+            profile = _task_tags.get(task) if task is not None else None
+        return profile
+
+    def _sample(self) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            profile = self._profile_of(thread_id)
+            if profile not in self._profiles:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            profile.stacks[tuple(reversed(stack))] += 1
+
+
+_sampler: Optional[StackSampler] = None
+_tagging_loops: Counter[asyncio.AbstractEventLoop] = Counter()
+_tracing_nodes = 0
+_tracing_lock = threading.Lock()
+_started_tracing = False
+
+
+def _get_sampler(interval: float) -> StackSampler:
+    global _sampler
+    if _sampler is None:
+        _sampler = StackSampler(interval)
+    return _sampler
+
+
+def _start_tagging(loop: asyncio.AbstractEventLoop) -> None:
+    with _tracing_lock:
+        if not _tagging_loops:
+            ThreadPoolExecutor.submit = _tagging_submit
+        if not _tagging_loops[loop]:
+            _loops[threading.get_ident()] = loop
+            loop.set_task_factory(_tagging_task_factory(loop.get_task_factory()))
+        _tagging_loops[loop] += 1
+
+
+def _stop_tagging(loop: asyncio.AbstractEventLoop) -> None:
+    with _tracing_lock:
+        _tagging_loops[loop] -= 1
+        if not _tagging_loops[loop]:
+            del _tagging_loops[loop]
+            _loops.pop(threading.get_ident(), None)
+            loop.set_task_factory(getattr(loop.get_task_factory(), "previous", None))
+        if not _tagging_loops:
+            ThreadPoolExecutor.submit = _submit
+
+
+def _start_tracing() -> None:
+    global _tracing_nodes, _started_tracing
+    with _tracing_lock:
+        if _tracing_nodes == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_nodes += 1
+
+
+def _stop_tracing() -> None:
+    global _tracing_nodes, _started_tracing
+    with _tracing_lock:
+        _tracing_nodes -= 1
+        # Tracing started by someone else, e.g. the benchmark, is left running.
+        if _tracing_nodes == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def render_memory(
+    node: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int
+) -> str:
+    """The lines that allocated the most memory between two snapshots."""
+    ignored = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ]
+    before = before.filter_traces(ignored)
+    after = after.filter_traces(ignored)
+    differences = after.compare_to(before, "lineno")
+
+    lines = [
+        f"{node}: {sum(d.size_diff for d in differences) / 2**20:+.1f} MiB "
+        "allocated and still alive at the end of the node",
+        # Tracing is process-wide, so concurrent nodes are included.
+        "(allocations of concurrently running nodes are included)",
+        "",
+    ]
+    lines += [str(difference) for difference in differences[:limit]]
+    lines += ["", "Largest allocations alive at the end of the node:", ""]
+    lines += [str(stat) for stat in after.statistics("lineno")[:limit]]
+    return "\n".join(lines) + "\n"
+
+
+def profiled(node: Callable) -> Callable:
+    """Wrap a graph node so that it is profiled when `profile` is enabled."""
+
+    @functools.wraps(node)
+    async def profiled_node(state: Any, config: RunnableConfig) -> Any:
+        configuration = Configuration.from_runnable_config(config)
+        if not configuration.profile:
+            result = node(state, config)
+            return await result if inspect.isawaitable(result) else result
+
+        profile = NodeProfile(node.__name__)
+        loop = asyncio.get_running_loop()
+        _start_tracing()
+        _start_tagging(loop)
+        try:
+            # Snapshots are slow to take, so they do not hold up other nodes.
+            before = await asyncio.to_thread(tracemalloc.take_snapshot)
+            try:
+                return await _run_profiled(
+                    node, state, config, profile, configuration.profile_interval
+                )
+            finally:
+                after = await asyncio.to_thread(tracemalloc.take_snapshot)
+                await write_profile(profile, before, after, state, config)
+        finally:
+            # Task factories and executors are restored once no node is profiled.
+            _stop_tagging(loop)
+            _stop_tracing()
+
+    return profiled_node
+
+
+async def _run_profiled(
+    node: Callable,
+    state: Any,
+    config: RunnableConfig,
+    profile: NodeProfile,
+    interval: float,
+) -> Any:
+    """Run a node while sampling the stacks of the work done for it."""
+    sampler = _get_sampler(interval)
+    task = asyncio.current_task()
+    previous = _task_tags.get(task)
+    started = time.perf_counter()
+
+    # The node's own task is tagged for its duration, the work it starts
+    # through the context it inherits.
+    token = _current_profile.set(profile)
+    _task_tags[task] = profile
+    sampler.add(profile)
+    try:
+        result = node(state, config)
+        return await result if inspect.isawaitable(result) else result
+    finally:
+        sampler.remove(profile)
+        if previous is None:
+            _task_tags.pop(task, None)
+        else:
+            _task_tags[task] = previous
+        _current_profile.reset(token)
+        profile.wall_time = time.perf_counter() - started
+
+
+async def write_profile(
+    profile: NodeProfile,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    state: Any,
+    config: RunnableConfig,
+) -> None:
+    """Write the profiles of a node next to the run's reports."""
+    configuration = Configuration.from_runnable_config(config)
+    artifacts = ArtifactStore.from_configuration(configuration)
+    run_id = (config or {}).get("configurable", {}).get("thread_id", "")
+    top = configuration.profile_top
+
+    reports = {
+        "folded": profile.render_folded(),
+        "cpu.txt": profile.render_top(configuration.profile_interval, top),
+        # Comparing snapshots is slow, so it does not hold up other nodes.
+        "memory.txt": await asyncio.to_thread(
+            render_memory, profile.node, before, after, top
+        ),
+    }
+    for suffix, content in reports.items():
+        await artifacts.write(
+            state.input, run_id, f"profiles/{profile.node}.{suffix}", content
+        )
+    print(
+        f"Profiled {profile.node}: {profile.samples} samples, written to "
+        f"{artifacts.run_dir(state.input, run_id) / 'profiles'}"
+    )
@@ -0,0 +1,154 @@
+"""Reduce fetched documents to the API-reference content worth prompting with."""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from bs4 import BeautifulSoup
+
+from .utils import count_tokens
+
+if TYPE_CHECKING:
+    from .fetch import FetchedDocument
+
+NOISE_TAGS = ["script", "style", "noscript", "template", "svg", "iframe", "form"]
+BOILERPLATE_TAGS = ["nav", "footer", "aside"]
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search"}
+BOILERPLATE_NAMES = {
+    "nav",
+    "navbar",
+    "navigation",
+    "menu",
+    "sidebar",
+    "sidenav",
+    "toc",
+    "breadcrumb",
+    "breadcrumbs",
+    "footer",
+    "cookie",
+    "cookies",
+    "banner",
+    "feedback",
+}
+# Elements are only named like boilerplate when they are mostly links, so that a
+# "sidebar" or "menu" holding real content is kept.
+MIN_BOILERPLATE_LINK_DENSITY = 0.5
+
+CONTENT_SELECTORS = ["main", "[role=main]", "article", "#content", ".content"]
+
+# Lines shorter than this (labels such as "GET" or "Parameters") are never deduplicated.
+MIN_DEDUPE_LENGTH = 40
+
+
+@dataclass
+class ReducedDocument:
+    """The reduced text of a document and its size before and after reduction."""
+
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+
+def link_density(element) -> float:
+    """The share of an element's text that is the text of its links."""
+    text_length = len(element.get_text(strip=True))
+    if not text_length:
+        return 1.0
+    link_length = sum(len(a.get_text(strip=True)) for a in element.find_all("a"))
+    return link_length / text_length
+
+
+def _is_boilerplate(element) -> bool:
+    if element.name in ("html", "body", "main", "article"):
+        return False
+    if element.get("role") in BOILERPLATE_ROLES:
+        return True
+
+    names = [element.get("id") or "", *(element.get("class") or [])]
+    words = {word for name in names for word in re.split(r"[-_\s]+", name.lower())}
+    if not words & BOILERPLATE_NAMES:
+        return False
+    return link_density(element) >= MIN_BOILERPLATE_LINK_DENSITY
+
+
+def reduce_html(html: str, max_code_lines: int) -> str:
+    """Keep the main content of a page, without navigation or long code samples."""
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(NOISE_TAGS + BOILERPLATE_TAGS):
+        element.decompose()
+    for element in soup.find_all(_is_boilerplate):
+        element.decompose()
+
+    for pre in soup.find_all("pre"):
+        lines = pre.get_text().splitlines()
+        if len(lines) > max_code_lines:
+            pre.string = "\n".join(lines[:max_code_lines] + ["..."])
+
+    root = soup.body or soup
+    for selector in CONTENT_SELECTORS:
+        content = soup.select_one(selector)
+        if content is not None:
+            root = content
+            break
+
+    return root.get_text("\n", strip=True)
+
+
+def collapse_whitespace(text: str) -> str:
+    """Collapse runs of spaces and drop empty lines."""
+    lines = (re.sub(r"\s+", " ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def dedupe_blocks(text: str) -> str:
+    """Drop long lines that already appeared earlier in the text."""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        if len(line) >= MIN_DEDUPE_LENGTH:
+            key = line.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def reduce_json(body: str) -> str:
+    """Put one JSON value per line, without indentation, unless that is longer."""
+    body = body.strip()
+    # Lines let large specs be chunked between values rather than in the middle
+    # of a single minified line, but never at the cost of more tokens.
+    try:
+        text = json.dumps(
+            json.loads(body), indent=0, separators=(",", ":"), ensure_ascii=False
+        )
+    except ValueError:
+        return body
+    return text if count_tokens(text) <= count_tokens(body) else body
+
+
+def reduce_document(
+    document: FetchedDocument, max_code_lines: int = 20
+) -> ReducedDocument:
+    """Reduce a fetched document to the text passed to the pre-research prompt."""
+    if document.content_type == "html":
+        text = dedupe_blocks(
+            collapse_whitespace(reduce_html(document.body, max_code_lines))
+        )
+    elif document.content_type == "json":
+        text = reduce_json(document.body)
+    else:
+        # Indentation is significant in YAML, so only trailing whitespace goes.
+        text = "\n".join(
+            line.rstrip() for line in document.body.splitlines() if line.strip()
+        )
+
+    return ReducedDocument(
+        text=text,
+        tokens_before=count_tokens(document.body),
+        tokens_after=count_tokens(text),
+    )
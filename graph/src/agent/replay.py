@@ -0,0 +1,367 @@
+"""Record the network interactions of a run as fixtures and replay them offline.
+
+Every LLM, embedding, search and page request goes through `httpx` (the
+OpenAI and Anthropic clients, and our own fetches) or `requests` (GPT
+Researcher's retrievers and scrapers), so both are patched at the client
+level. Pages rendered with the browser are recorded by URL.
+"""
+
+from __future__ import annotations
+
+import base64
+import contextlib
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import fetch
+
+SECRET_PARAM = re.compile(r"key|token|secret|password|signature", re.IGNORECASE)
+
+# GPT Researcher tells its LLMs the current date, so prompts change every day.
+VOLATILE_DATE = re.compile(
+    rb"(current date is )(?:[A-Z][a-z]+ \d{1,2}, \d{4}|\d{4}-\d{2}-\d{2})"
+)
+
+# Recorded bodies are stored decoded, so these no longer describe them.
+DROPPED_HEADERS = {
+    "content-encoding",
+    "content-length",
+    "transfer-encoding",
+    "connection",
+    "set-cookie",
+}
+
+
+class ReplayMiss(LookupError):
+    """A request was made that the fixture holds no response for."""
+
+
+def redact_url(url: str) -> str:
+    """The URL without the values of query parameters that look like secrets."""
+    parts = urlsplit(url)
+    query = urlencode(
+        [
+            (name, "REDACTED" if SECRET_PARAM.search(name) else value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        ]
+    )
+    return urlunsplit(parts._replace(query=query))
+
+
+def redact_body(body: Optional[bytes]) -> bytes:
+    """The body without the top-level JSON fields that look like secrets."""
+    if not body:
+        return b""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if not isinstance(payload, dict):
+        return body
+    payload = {k: v for k, v in payload.items() if not SECRET_PARAM.search(k)}
+    return json.dumps(payload, sort_keys=True).encode()
+
+
+def _as_bytes(body: Any) -> bytes:
+    if body is None:
+        return b""
+    if isinstance(body, str):
+        return body.encode()
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    # Streamed uploads are not replayable by content, only by URL.
+    return b""
+
+
+def normalize_body(body: bytes) -> bytes:
+    """The body with the parts that change from one run to the next replaced."""
+    return VOLATILE_DATE.sub(rb"\1<date>", body)
+
+
+class Cassette:
+    """The recorded responses of one run, stored as a JSON fixture.
+
+    Requests are matched on their method, redacted URL and redacted body, in
+    which the current date is normalized. Identical requests are served their
+    recordings in order. A request that was not recorded is a `ReplayMiss`
+    rather than a guess, since the run it belongs to has changed.
+    """
+
+    def __init__(self, path: str | Path, load: bool = True):
+        """Open a fixture, loading its recordings unless `load` is false."""
+        self.path = Path(path)
+        self.interactions: list[dict[str, Any]] = []
+        if load and self.path.exists():
+            self.interactions = json.loads(self.path.read_text())["interactions"]
+
+        self.replayed = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._used: set[int] = set()
+        self._by_key: dict[str, list[int]] = defaultdict(list)
+        for index, interaction in enumerate(self.interactions):
+            self._by_key[interaction["key"]].append(index)
+
+    @staticmethod
+    def request_key(method: str, url: str, body: Optional[bytes]) -> str:
+        """What a request is matched on, without its secrets and volatile parts."""
+        digest = hashlib.sha256()
+        for part in (method.upper().encode(), redact_url(url).encode()):
+            digest.update(part + b"\n")
+        digest.update(normalize_body(redact_body(body)))
+        return digest.hexdigest()
+
+    @property
+    def network_time(self) -> float:
+        """How long the recorded interactions took when they were recorded."""
+        return sum(interaction["elapsed"] for interaction in self.interactions)
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        status: int,
+        headers: dict[str, str],
+        content: bytes,
+        response_url: str,
+        elapsed: float,
+    ) -> None:
+        """Add the response to a request."""
+        interaction = {
+            "key": self.request_key(method, url, body),
+            "method": method.upper(),
+            "url": redact_url(url),
+            "status": status,
+            "headers": {
+                name: value
+                for name, value in headers.items()
+                if name.lower() not in DROPPED_HEADERS
+            },
+            "content": base64.b64encode(content).decode(),
+            "response_url": redact_url(response_url),
+            "elapsed": elapsed,
+        }
+        with self._lock:
+            self._by_key[interaction["key"]].append(len(self.interactions))
+            self.interactions.append(interaction)
+            self.recorded += 1
+
+    def replay(self, method: str, url: str, body: Optional[bytes]) -> dict[str, Any]:
+        """Return the recorded response to a request."""
+        key = self.request_key(method, url, body)
+        with self._lock:
+            candidates = self._by_key.get(key)
+            if not candidates:
+                raise ReplayMiss(
+                    f"No recorded response for {method} {redact_url(url)} with "
+                    f"this body in {self.path}; record the fixture again"
+                )
+            unused = [index for index in candidates if index not in self._used]
+
+            # Once every recording is used, repeated requests get the last one.
+            index = unused[0] if unused else candidates[-1]
+            self._used.add(index)
+            self.replayed += 1
+
+        interaction = dict(self.interactions[index])
+        interaction["content"] = base64.b64decode(interaction["content"])
+        return interaction
+
+    def save(self) -> None:
+        """Write the recordings to the fixture."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = {"interactions": self.interactions}
+        self.path.write_text(json.dumps(payload, indent=1))
+
+
+def _httpx_body(request: httpx.Request) -> bytes:
+    try:
+        return request.content
+    except httpx.RequestNotRead:
+        return b""
+
+
+def _httpx_response(
+    interaction: dict[str, Any], request: httpx.Request
+) -> httpx.Response:
+    return httpx.Response(
+        interaction["status"],
+        headers=interaction["headers"],
+        content=interaction["content"],
+        request=request,
+    )
+
+
+def _requests_response(
+    interaction: dict[str, Any], request: requests.PreparedRequest
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = interaction["status"]
+    response.headers = CaseInsensitiveDict(interaction["headers"])
+    response._content = interaction["content"]
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = interaction["response_url"] or request.url
+    response.request = request
+    return response
+
+
+def _record_response(
+    cassette: Cassette,
+    method: str,
+    url: str,
+    body: Optional[bytes],
+    response: Any,
+    content: bytes,
+    started: float,
+) -> None:
+    cassette.record(
+        method,
+        url,
+        body,
+        response.status_code,
+        dict(response.headers),
+        content,
+        str(response.url),
+        time.perf_counter() - started,
+    )
+
+
+def _patched_async_send(cassette: Cassette, recording: bool, send: Callable):
+    async def patched_send(client, request, **kwargs):
+        body = _httpx_body(request)
+        if not recording:
+            return _httpx_response(
+                cassette.replay(request.method, str(request.url), body), request
+            )
+        started = time.perf_counter()
+        response = await send(client, request, **kwargs)
+        content = await response.aread()
+        _record_response(
+            cassette, request.method, str(request.url), body, response, content, started
+        )
+        return response
+
+    return patched_send
+
+
+def _patched_sync_send(cassette: Cassette, recording: bool, send: Callable):
+    def patched_send(client, request, **kwargs):
+        body = _httpx_body(request)
+        if not recording:
+            return _httpx_response(
+                cassette.replay(request.method, str(request.url), body), request
+            )
+        started = time.perf_counter()
+        response = send(client, request, **kwargs)
+        content = response.read()
+        _record_response(
+            cassette, request.method, str(request.url), body, response, content, started
+        )
+        return response
+
+    return patched_send
+
+
+def _patched_session_send(cassette: Cassette, recording: bool, send: Callable):
+    def patched_send(session, request, **kwargs):
+        body = _as_bytes(request.body)
+        if not recording:
+            return _requests_response(
+                cassette.replay(request.method, request.url, body), request
+            )
+        started = time.perf_counter()
+        response = send(session, request, **kwargs)
+        _record_response(
+            cassette,
+            request.method,
+            request.url,
+            body,
+            response,
+            response.content,
+            started,
+        )
+        return response
+
+    return patched_send
+
+
+def _patched_render_document(cassette: Cassette, recording: bool, render: Callable):
+    async def patched_render_document(url, configuration):
+        if not recording:
+            interaction = cassette.replay("RENDER", url, None)
+            return fetch.FetchedDocument(
+                url=url,
+                content_type="html",
+                body=interaction["content"].decode(),
+                rendered=True,
+            )
+        started = time.perf_counter()
+        document = await render(url, configuration)
+        cassette.record(
+            "RENDER",
+            url,
+            None,
+            200,
+            {"content-type": "text/html"},
+            document.body.encode(),
+            url,
+            time.perf_counter() - started,
+        )
+        return document
+
+    return patched_render_document
+
+
+# Every function requests go through, with what replaces it under a cassette.
+PATCHES = [
+    (httpx.AsyncClient, "send", _patched_async_send),
+    (httpx.Client, "send", _patched_sync_send),
+    (requests.Session, "send", _patched_session_send),
+    (fetch, "render_document", _patched_render_document),
+]
+
+
+def _install(functions: dict[tuple[Any, str], Callable]) -> None:
+    for (owner, name), function in functions.items():
+        setattr(owner, name, function)
+
+
+@contextlib.contextmanager
+def use_cassette(path: str | Path, mode: str = "replay") -> Iterator[Cassette]:
+    """Record to, or replay from, a fixture for the duration of the block.
+
+    In "record" mode requests go to the network and their responses are
+    saved to the fixture on exit, replacing what it held. In "replay" mode every
+    response comes from the fixture and nothing reaches the network.
+    """
+    if mode not in ("record", "replay"):
+        raise ValueError(f"Unknown cassette mode: {mode}")
+
+    recording = mode == "record"
+    cassette = Cassette(path, load=not recording)
+    originals = {(owner, name): getattr(owner, name) for owner, name, _ in PATCHES}
+    _install(
+        {
+            (owner, name): patch(cassette, recording, originals[owner, name])
+            for owner, name, patch in PATCHES
+        }
+    )
+    try:
+        yield cassette
+    finally:
+        _install(originals)
+        if recording:
+            cassette.save()
@@ -0,0 +1,200 @@
+"""Pages scraped by GPT Researcher, shared by every agent of a run."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from .cache import ResultCache
+from .configuration import Configuration
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Stores are released when their run ends. Runs that fail before, or never
+# end, are forgotten least recently used first.
+MAX_SOURCE_STORES = 16
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL, so trivially different spellings share a page.
+
+    The scheme and host are lowercased, default ports, fragments, tracking
+    parameters and trailing slashes are dropped, and the query is sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not name.lower().startswith("utm_")
+        )
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def content_hash(page: dict[str, Any]) -> str:
+    """Hash of the raw content of a scraped page."""
+    return hashlib.sha256(page.get("raw_content", "").encode()).hexdigest()
+
+
+class SourceStore:
+    """Scraped pages keyed by normalized URL, with the hash of their content.
+
+    Every page is scraped once per run: pages already in the store are served
+    from it, and pages another agent is scraping are awaited rather than
+    scraped again. With a persistent cache, pages also outlive the run.
+    """
+
+    def __init__(self, cache: Optional[ResultCache] = None):
+        """Keep pages in memory, and in `cache` when one is given."""
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self._pages: dict[str, dict[str, Any]] = {}
+        self._hashes: dict[str, str] = {}
+        self._pending: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def _cache_key(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    async def get(self, url: str) -> Optional[dict[str, Any]]:
+        """Return the page scraped from a URL, if it is known."""
+        key = normalize_url(url)
+        if key not in self._pages and self.cache is not None:
+            entry = await self.cache.aget(self._cache_key(key))
+            if entry is not None:
+                self._pages[key] = entry["page"]
+                self._hashes[key] = entry["content_hash"]
+        return self._pages.get(key)
+
+    async def put(self, page: dict[str, Any]) -> None:
+        """Store a scraped page under its normalized URL."""
+        key = normalize_url(page["url"])
+        self._pages[key] = page
+        self._hashes[key] = content_hash(page)
+        if self.cache is not None:
+            await self.cache.aset(
+                self._cache_key(key),
+                {"url": key, "content_hash": self._hashes[key], "page": page},
+            )
+
+    async def browse(
+        self,
+        urls: list[str],
+        scrape: Callable[[list[str]], Awaitable[list[dict[str, Any]]]],
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Scrape the URLs that are not known yet.
+
+        Returns the newly scraped pages and the pages served from the store.
+        """
+        # Claim the unknown URLs before awaiting anything, so that concurrent
+        # agents wait for this scrape instead of starting their own.
+        known, waiting, missing = [], [], {}
+        for url in urls:
+            key = normalize_url(url)
+            if key in missing:
+                continue
+            if key in self._pages:
+                known.append(self._pages[key])
+            elif key in self._pending:
+                waiting.append(self._pending[key])
+            else:
+                missing[key] = url
+
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in missing}
+        self._pending.update(futures)
+        scraped = []
+        try:
+            for key, url in list(missing.items()):
+                page = await self.get(url)
+                if page is not None:
+                    known.append(page)
+                    del missing[key]
+
+            self.hits += len(known) + len(waiting)
+            self.misses += len(missing)
+            if missing:
+                scraped = await scrape(list(missing.values()))
+            for page in scraped:
+                await self.put(page)
+        finally:
+            for key, future in futures.items():
+                self._pending.pop(key, None)
+                future.set_result(self._pages.get(key))
+
+        known.extend(page for page in await asyncio.gather(*waiting) if page)
+        return scraped, known
+
+    def attach(self, researcher: Any) -> None:
+        """Route a GPT Researcher's scraping through the store."""
+        scraper_manager = researcher.scraper_manager
+        browse_urls = scraper_manager.browse_urls
+
+        async def shared_browse_urls(urls: list[str]) -> list[dict[str, Any]]:
+            scraped, known = await self.browse(urls, browse_urls)
+            # Scraped pages are recorded by GPT Researcher itself, known ones here.
+            researcher.add_research_sources(known)
+            images = [image for page in known for image in page.get("image_urls", [])]
+            researcher.add_research_images(
+                scraper_manager.select_top_images(images, k=4)
+            )
+
+            # Mirrors of the same page only need to be read once.
+            pages, hashes = [], set()
+            for page in scraped + known:
+                digest = content_hash(page)
+                if digest not in hashes:
+                    hashes.add(digest)
+                    pages.append(page)
+            return pages
+
+        scraper_manager.browse_urls = shared_browse_urls
+
+
+_source_stores: OrderedDict[str, SourceStore] = OrderedDict()
+
+
+def get_source_store(
+    configuration: Configuration, run_id: str
+) -> Optional[SourceStore]:
+    """Return the source store of a run, if sharing sources is enabled."""
+    if not configuration.source_store:
+        return None
+
+    if run_id not in _source_stores:
+        cache = None
+        if configuration.source_store_persistent:
+            cache = ResultCache(
+                configuration.source_store_dir,
+                ttl=configuration.source_store_ttl,
+                max_entries=configuration.source_store_max_entries,
+            )
+        _source_stores[run_id] = SourceStore(cache)
+        while len(_source_stores) > MAX_SOURCE_STORES:
+            release_source_store(next(iter(_source_stores)))
+    _source_stores.move_to_end(run_id)
+    return _source_stores[run_id]
+
+
+def release_source_store(run_id: str) -> None:
+    """Forget the pages of a finished run."""
+    store = _source_stores.pop(run_id, None)
+    if store is not None:
+        print(f"Source store {run_id}: {store.hits} hits, {store.misses} misses")
+
+
+def close_source_stores() -> None:
+    """Forget the pages of every run."""
+    for run_id in list(_source_stores):
+        release_source_store(run_id)
@@ -19,6 +19,7 @@ class State:
     oas_discovery_urls: str = ""
     oas_discovery_oas_url: str = ""
     pre_research_report: str = ""
+    research_context: str = ""
     product_req_report: str = ""
     dev_req_report: str = ""
     oas_retrieval_report: str = ""
@@ -1,15 +1,228 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from gpt_researcher.config import Config
+
+TRUNCATION_MARKER = "\n\n[... truncated {tokens} tokens to fit the prompt budget]"
+
+
+@dataclass
+class PromptSection:
+    """
+    A named part of a prompt. Sections with a lower priority are trimmed first.
+    """
+
+    name: str
+    text: str
+    priority: int = 0
+    tokens: int = 0
+    trimmed_tokens: int = 0
+
+
+@dataclass
+class ComposedPrompt:
+    """
+    A prompt composed within a token budget, with the tokens of each section.
+    """
+
+    text: str
+    sections: list[PromptSection]
+    system_tokens: int = 0
+    max_tokens: Optional[int] = None
+
+    @property
+    def tokens(self) -> int:
+        return self.system_tokens + sum(section.tokens for section in self.sections)
+
+    def breakdown(self) -> dict[str, Any]:
+        """
+        Tokens per section, and how many were trimmed, for the run's metrics.
+        """
+        return {
+            "budget": self.max_tokens,
+            "total": self.tokens,
+            "sections": {
+                "system": {"tokens": self.system_tokens, "trimmed": 0},
+                **{
+                    section.name: {
+                        "tokens": section.tokens,
+                        "trimmed": section.trimmed_tokens,
+                    }
+                    for section in self.sections
+                },
+            },
+        }
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = "gpt-4o") -> str:
+    """
+    Cut a text on line boundaries to at most `max_tokens` tokens, noting the cut.
+    """
+    tokens = count_tokens(text, model)
+    if tokens <= max_tokens:
+        return text
+
+    marker_tokens = count_tokens(TRUNCATION_MARKER.format(tokens=tokens), model)
+    head = split_into_chunks(text, max(max_tokens - marker_tokens, 1), model)[0]
+    if count_tokens(head, model) + marker_tokens > max_tokens:
+        return ""
+    return head + TRUNCATION_MARKER.format(tokens=tokens - count_tokens(head, model))
+
+
+def fit_sections(
+    sections: list[PromptSection],
+    max_tokens: Optional[int],
+    model: str = "gpt-4o",
+    reserved_tokens: int = 0,
+) -> list[PromptSection]:
+    """
+    Count the tokens of each section and trim the lowest-priority ones until the
+    sections and `reserved_tokens` fit in `max_tokens`.
+    """
+    for section in sections:
+        section.tokens = count_tokens(section.text, model)
+    if max_tokens is None:
+        return sections
+
+    excess = reserved_tokens + sum(section.tokens for section in sections) - max_tokens
+    for section in sorted(sections, key=lambda section: section.priority):
+        if excess <= 0:
+            break
+        text = truncate_to_tokens(section.text, max(section.tokens - excess, 0), model)
+        tokens = count_tokens(text, model)
+        section.trimmed_tokens = section.tokens - tokens
+        excess -= section.trimmed_tokens
+        section.text, section.tokens = text, tokens
+
+    return sections
+
+
 def compose_prompt(
     pre_research: str,
     sdk_prompt: str,
     product_req_prompt: str | None = None,
     dev_req_prompt: str | None = None,
-) -> str:
+    max_tokens: Optional[int] = None,
+    model: str = "gpt-4o",
+    system_prompt: str = "",
+) -> ComposedPrompt:
     """
     Compose a prompt for a research agent.
+
+    Sections go from the most to the least stable across services, so that
+    provider-side prompt caches can reuse the longest possible prefix. Research
+    shared by both reports passes both instruction prompts. When the prompt and
+    `system_prompt` exceed `max_tokens`, the pre-research report is trimmed
+    first, as the sources are researched again anyway.
     """
+    sections = [PromptSection("sdk_prompt", sdk_prompt, priority=2)]
     if product_req_prompt:
-        return f"{product_req_prompt}\n\n{pre_research}\n\n{sdk_prompt}"
-    elif dev_req_prompt:
-        return f"{dev_req_prompt}\n\n{pre_research}\n\n{sdk_prompt}"
-    else:
-        return f"{pre_research}\n\n{sdk_prompt}"
+        sections.append(
+            PromptSection("product_req_prompt", product_req_prompt, priority=1)
+        )
+    if dev_req_prompt:
+        sections.append(PromptSection("dev_req_prompt", dev_req_prompt, priority=1))
+    sections.append(PromptSection("pre_research", pre_research, priority=0))
+
+    system_tokens = count_tokens(system_prompt, model) if system_prompt else 0
+    fit_sections(sections, max_tokens, model, reserved_tokens=system_tokens)
+
+    return ComposedPrompt(
+        text="\n\n".join(section.text for section in sections if section.text),
+        sections=sections,
+        system_tokens=system_tokens,
+        max_tokens=max_tokens,
+    )
+
+
+def slugify(text: str, default: str) -> str:
+    """
+    Lowercase a name to letters, digits and dashes, for ids and file names.
+    """
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or default
+
+
+def prompt_cache_kwargs(config: Config, system_prompt: str) -> dict[str, Any]:
+    """
+    LLM kwargs marking the system prompt of a report-writing call as cacheable.
+
+    GPT Researcher sends plain string messages, so on Anthropic models the system
+    message is sent as an equivalent content block carrying the cache-control
+    marker. The kwargs apply to every call made with them, so they must only be
+    used for calls whose system message is `system_prompt`. OpenAI caches long
+    prompt prefixes automatically and needs no marker.
+    """
+    if config.smart_llm_provider != "anthropic":
+        return {}
+
+    return {
+        "model_kwargs": {
+            "system": [
+                {
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        }
+    }
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken downloads its encodings on first use, which can fail offline.
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count the tokens of a text for a model, estimating when no tokenizer is available.
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4
+
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def split_into_chunks(text: str, max_tokens: int, model: str = "gpt-4o") -> list[str]:
+    """
+    Split a text on line boundaries into chunks of at most `max_tokens` tokens.
+    """
+    # Lines longer than a chunk (e.g. minified JSON) are cut by an approximate size.
+    max_chars = max_tokens * 4
+    lines = []
+    for line in text.splitlines():
+        if count_tokens(line, model) > max_tokens:
+            lines.extend(
+                line[i : i + max_chars] for i in range(0, len(line), max_chars)
+            )
+        else:
+            lines.append(line)
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    for line in lines:
+        line_tokens = count_tokens(line, model) + 1
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
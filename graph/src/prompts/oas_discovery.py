@@ -17,3 +17,23 @@ def oas_discovery_prompt(service_name: str):
 
         Service Name: {service_name}.
     """
+
+
+def oas_url_list_prompt(service_name: str):
+    """Template listing the likely OAS URLs found in a `research_result`."""
+    instructions = """
+
+            List the most likely URLs with the official documentation for the latest OAS spec of this service, and explain why.
+
+            Format as properly formatted MarkDown that includes the following keys:
+            - "url": Return only the URL
+            - "confidence_level": Numeric confidence level: 1-4 (1 is lowest, 4 is highest)
+            - "popularity": URL popularity as per Google rank: 1-4 (1 is lowest, 4 is highest)
+            - "validated": Did you validate that OAS available through a web request? 1 = True, 0 = False
+            - "explanation": Detailed explanation
+
+            <research_result>
+            {research_result}
+            </research_result>
+            """
+    return role_prompt(service_name) + instructions
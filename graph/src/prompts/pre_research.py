@@ -1,3 +1,19 @@
+RELEVANT_IDENTITY_RESOURCES = """<relevant-identity-resources>
+- Users
+- Groups (teams/user groups/organizations/etc.)
+- Roles (permissions/entitlements/policies)
+</relevant-identity-resources>"""
+
+ENDPOINT_OUTPUT_FORMAT = """<output-format>
+- <endpoint-name>
+- <endpoint-description>
+- <endpoint-url>
+- <endpoint-method>
+- <endpoint-parameters>
+- <endpoint-response>
+</output-format>"""
+
+
 def pre_research_prompt(html: str):
     return f"""<goal>
 - First, scan the entire API documentation found in the following HTML
@@ -11,11 +27,7 @@ def pre_research_prompt(html: str):
 {html}
 </html>
 
-<relevant-identity-resources>
-- Users
-- Groups (teams/user groups/organizations/etc.)
-- Roles (permissions/entitlements/policies)
-</relevant-identity-resources>
+{RELEVANT_IDENTITY_RESOURCES}
 
 <examples>
     <1> 
@@ -24,12 +36,24 @@ def pre_research_prompt(html: str):
     </1>
 </examples>
 
-<output-format>
-- <endpoint-name>
-- <endpoint-description>
-- <endpoint-url>
-- <endpoint-method>
-- <endpoint-parameters>
-- <endpoint-response>
-</output-format>
+{ENDPOINT_OUTPUT_FORMAT}
+"""
+
+
+def pre_research_chunk_prompt(chunk: str, index: int, total: int):
+    return f"""<goal>
+- The following HTML is part {index} of {total} of an API documentation
+- List every identity-related endpoint found in this part, both nested and general
+- Be precise and explicit regarding URLs, methods, parameters and responses for API endpoints
+- Do not guess endpoints that are not in this part
+- If this part has no identity-related endpoints, answer "None"
+</goal>
+
+<html>
+{chunk}
+</html>
+
+{RELEVANT_IDENTITY_RESOURCES}
+
+{ENDPOINT_OUTPUT_FORMAT}
 """
@@ -1,20 +1,71 @@
-def initial_read_prompt(service_name: str):
-    prompt = f"""
-Here is the OAS for the connectors API. We will be implementing a connector with READ capabilities on an external API - {service_name}.
+from functools import lru_cache
+from typing import Optional
+
+from .sdk_spec_index import SDKSpecIndex
+
+
+@lru_cache(maxsize=None)
+def sdk_spec_index() -> SDKSpecIndex:
+    """The read capabilities and the models they use, parsed once."""
+    return SDKSpecIndex.from_sections(
+        sdk_api_spec_read_capabilities,
+        sdk_api_spec_read_models,
+        common=(sdk_api_spec_common_models,),
+    )
+
+
+@lru_cache(maxsize=None)
+def sdk_spec_prompt(
+    capabilities: Optional[tuple[str, ...]] = None,
+    excluded_schemas: tuple[str, ...] = (),
+):
+    """The Lumos connector spec, identical for every service so it can be a cached prompt prefix.
+
+    With `capabilities`, only those read capabilities and the models they
+    reference, directly or transitively, are included. Like the full spec, the
+    slice leaves out the common models of the envelope shared by every
+    capability. Models an agent has no use for can be left out with
+    `excluded_schemas`.
+    """
+    read_models = sdk_api_spec_read_models
+    read_capabilities = sdk_api_spec_read_capabilities
+    if capabilities is not None:
+        index = sdk_spec_index()
+        read_models = index.render_schemas(
+            index.schemas_for(capabilities, excluded_schemas)
+        )
+        read_capabilities = index.render_capabilities(capabilities)
+
+    return f"""
+Here is the OAS for the connectors API.
 
 <domain-intro>
 {sdk_api_spec_intro}
 </domain-intro>
 
 <read-models>
-{sdk_api_spec_read_models}
+{read_models}
 </read-models>
 
 <read-capabilities>
-{sdk_api_spec_read_capabilities}
+{read_capabilities}
 </read-capabilities>
 """
 
+
+def connector_target_prompt(service_name: str):
+    return f"We will be implementing a connector with READ capabilities on an external API - {service_name}."
+
+
+def initial_read_prompt(
+    service_name: str,
+    capabilities: Optional[tuple[str, ...]] = None,
+    excluded_schemas: tuple[str, ...] = (),
+):
+    prompt = f"""{sdk_spec_prompt(capabilities, excluded_schemas)}
+{connector_target_prompt(service_name)}
+"""
+
     return prompt
 
 
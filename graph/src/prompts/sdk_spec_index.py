@@ -0,0 +1,135 @@
+"""Index the Lumos connector spec so prompts only include the parts an agent needs."""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+import yaml
+
+SCHEMA_REF_PREFIX = "#/components/schemas/"
+
+
+def _entries(section: str, indent: int) -> dict[str, str]:
+    """Split a YAML mapping into the raw text of each key at `indent` spaces."""
+    pattern = re.compile(rf"^ {{{indent}}}(\S[^\n]*?):\s*$", re.MULTILINE)
+    matches = list(pattern.finditer(section))
+    entries = {}
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(section)
+        entries[match.group(1).strip("'\"")] = section[match.start() : end].rstrip()
+    return entries
+
+
+def _refs(node: Any) -> set[str]:
+    """Names of the schemas referenced anywhere in a parsed YAML node."""
+    if isinstance(node, list):
+        return set().union(*(_refs(item) for item in node))
+    if not isinstance(node, dict):
+        return set()
+
+    refs = set().union(*(_refs(value) for value in node.values()))
+    ref = node.get("$ref")
+    if isinstance(ref, str) and ref.startswith(SCHEMA_REF_PREFIX):
+        refs.add(ref[len(SCHEMA_REF_PREFIX) :])
+    return refs
+
+
+@dataclass(frozen=True)
+class SpecEntry:
+    """A path or schema of the spec, with the schemas it references directly."""
+
+    name: str
+    text: str
+    refs: frozenset[str]
+
+
+@dataclass
+class SDKSpecIndex:
+    """Capabilities (paths keyed by operation id) and schemas of the connector spec.
+
+    The common schemas are those of the request and response envelope that
+    every capability shares (credentials, errors, pagination). They are only
+    included when the models of a capability reference them.
+    """
+
+    capabilities: dict[str, SpecEntry]
+    schemas: dict[str, SpecEntry]
+    common: frozenset[str] = frozenset()
+
+    @classmethod
+    def from_sections(
+        cls, paths: str, *models: str, common: Iterable[str] = ()
+    ) -> SDKSpecIndex:
+        """Build the index from a `paths:` section and `components.schemas` sections.
+
+        The `common` sections hold the common schemas.
+        """
+        common = tuple(common)
+        capabilities = {}
+        for path, text in _entries(paths, indent=2).items():
+            item = yaml.safe_load(text) or {}
+            operations = [
+                operation
+                for operation in (item.get(path) or {}).values()
+                if isinstance(operation, dict)
+            ]
+            name = next(
+                (op["operationId"] for op in operations if "operationId" in op),
+                path.rsplit("/", 1)[-1],
+            )
+            capabilities[name] = SpecEntry(name, text, frozenset(_refs(item)))
+
+        schemas = {}
+        common_names = set()
+        for section in (*common, *models):
+            for name, text in _entries(section, indent=4).items():
+                schema = yaml.safe_load(text) or {}
+                schemas[name] = SpecEntry(name, text, frozenset(_refs(schema)))
+                if section in common:
+                    common_names.add(name)
+
+        return cls(
+            capabilities=capabilities,
+            schemas=schemas,
+            common=frozenset(common_names),
+        )
+
+    def schemas_for(
+        self, capabilities: Iterable[str], excluded: Iterable[str] = ()
+    ) -> list[str]:
+        """Every schema the capabilities reference, transitively, in spec order.
+
+        The common schemas the capabilities reference only through their shared
+        envelope are left out. Excluded schemas are left out along with
+        everything only they reference.
+        """
+        pending = []
+        for name in capabilities:
+            if name not in self.capabilities:
+                raise ValueError(f"Unknown connector capability: {name}")
+            pending.extend(self.capabilities[name].refs - self.common)
+
+        needed = set()
+        excluded = set(excluded)
+        while pending:
+            name = pending.pop()
+            if name in needed or name in excluded or name not in self.schemas:
+                continue
+            needed.add(name)
+            pending.extend(self.schemas[name].refs)
+
+        return [name for name in self.schemas if name in needed]
+
+    def render_capabilities(self, capabilities: Iterable[str]) -> str:
+        """The `paths:` section restricted to the given capabilities."""
+        names = set(capabilities)
+        entries = [
+            entry.text for name, entry in self.capabilities.items() if name in names
+        ]
+        return "\n".join(["paths:", *entries])
+
+    def render_schemas(self, names: Iterable[str]) -> str:
+        """The schema definitions of the given names, as they appear in the spec."""
+        return "\n".join(self.schemas[name].text for name in names)
@@ -0,0 +1,83 @@
+import asyncio
+import hashlib
+import os
+
+from graph.src.agent import artifacts
+from graph.src.agent.artifacts import ArtifactStore
+
+REPORT = "# Acme\n\nUsers are listed with GET /v1/users.\n"
+
+
+def objects(root):
+    return [path for path in (root / "objects").rglob("*") if path.is_file()]
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = ArtifactStore(tmp_path)
+
+    async def write():
+        first = await store.write("Acme", "run-1", "report.md", REPORT)
+        second = await store.write("Acme", "run-2", "report.md", REPORT)
+        digest = await store.put(REPORT)
+        return first, second, digest
+
+    first, second, digest = asyncio.run(write())
+
+    assert digest == hashlib.sha256(REPORT.encode()).hexdigest()
+    assert first == tmp_path / "runs" / "acme" / "run-1" / "report.md"
+    assert first.read_text() == second.read_text() == REPORT
+    assert len(objects(tmp_path)) == 1
+    # Run files are hard links to the stored object.
+    assert os.path.samefile(first, objects(tmp_path)[0])
+    assert asyncio.run(store.get(digest)) == REPORT
+
+
+def test_rewriting_a_run_file_replaces_it(tmp_path):
+    store = ArtifactStore(tmp_path)
+
+    async def write():
+        await store.write("Acme", "run", "report.md", "draft")
+        return await store.write("Acme", "run", "report.md", REPORT)
+
+    path = asyncio.run(write())
+
+    assert path.read_text() == REPORT
+    assert len(objects(tmp_path)) == 2
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_files_are_copied_without_hard_links(tmp_path, monkeypatch):
+    def link(source, target):
+        raise OSError("hard links are not supported")
+
+    monkeypatch.setattr(artifacts.os, "link", link)
+    store = ArtifactStore(tmp_path)
+
+    path = asyncio.run(store.write("Acme", "run", "report.md", REPORT))
+
+    assert path.read_text() == REPORT
+    assert not os.path.samefile(path, objects(tmp_path)[0])
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_concurrent_writes_of_the_same_object(tmp_path):
+    store = ArtifactStore(tmp_path)
+    content = REPORT * 1000
+
+    async def write():
+        return await asyncio.gather(
+            *(store.put(content) for _ in range(16)),
+            *(
+                store.write("Acme", f"run-{index % 4}", "report.md", content)
+                for index in range(16)
+            ),
+        )
+
+    results = asyncio.run(write())
+
+    assert set(results[:16]) == {hashlib.sha256(content.encode()).hexdigest()}
+    assert [path.read_text() for path in objects(tmp_path)] == [content]
+    for path in set(results[16:]):
+        assert path.read_text() == content
+    assert len(set(results[16:])) == 4
+    assert not list(tmp_path.rglob("*.tmp"))
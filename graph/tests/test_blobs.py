@@ -0,0 +1,49 @@
+import asyncio
+
+from graph.src.agent.artifacts import ArtifactStore
+from graph.src.agent.blobs import BlobStore, get_blob_store, is_blob_ref
+from graph.src.agent.configuration import Configuration
+
+
+def test_large_strings_are_stored_by_reference(tmp_path):
+    store = BlobStore(ArtifactStore(tmp_path), min_bytes=16)
+    report = "# Report\n" + "lorem ipsum " * 10
+    update = {"report": report, "service_name": "acme", "urls": ["a"], "count": 3}
+
+    slim = asyncio.run(store.slim(update))
+
+    assert is_blob_ref(slim["report"])
+    assert slim["service_name"] == "acme"
+    assert slim["urls"] == ["a"]
+    assert slim["count"] == 3
+    assert asyncio.run(store.resolve_all(slim)) == update
+
+
+def test_identical_content_shares_one_reference(tmp_path):
+    store = BlobStore(ArtifactStore(tmp_path), min_bytes=1)
+
+    first = asyncio.run(store.slim({"a": "same content"}))
+    second = asyncio.run(store.slim({"b": "same content"}))
+
+    assert first["a"] == second["b"]
+    assert len(list((tmp_path / "objects").rglob("*"))) == 2
+
+
+def test_references_are_not_stored_again(tmp_path):
+    store = BlobStore(ArtifactStore(tmp_path), min_bytes=1)
+    ref = asyncio.run(store.ref("content"))
+
+    assert asyncio.run(store.ref(ref)) == ref
+    assert asyncio.run(store.resolve("content")) == "content"
+
+
+def test_blob_store_is_opt_in(tmp_path):
+    assert get_blob_store(Configuration()) is None
+
+    store = get_blob_store(
+        Configuration(
+            state_blobs=True, state_blob_min_bytes=8, artifacts_dir=str(tmp_path)
+        )
+    )
+    assert store.min_bytes == 8
+    assert store.artifacts.root == tmp_path
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+
+import pytest
+
+from graph.src.agent import browser
+from graph.src.agent.browser import BrowserPool, close_browser_pool, get_browser_pool
+from graph.src.agent.configuration import Configuration
+
+CONFIGURATION = Configuration()
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    pools = []
+
+    async def close(self):
+        pools.append(self)
+
+    monkeypatch.setattr(BrowserPool, "close", close)
+    monkeypatch.setattr(browser, "_browser_pools", {})
+    return pools
+
+
+async def get_pools():
+    return get_browser_pool(CONFIGURATION), get_browser_pool(CONFIGURATION)
+
+
+def test_each_event_loop_gets_its_own_pool(closed):
+    first, same = asyncio.run(get_pools())
+    second, _ = asyncio.run(get_pools())
+
+    assert first is same
+    assert second is not first
+    # The pool of the ended loop is dropped rather than kept forever.
+    assert list(browser._browser_pools.values()) == [second]
+
+
+def test_pools_of_every_open_loop_are_closed(closed):
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        other = asyncio.run_coroutine_threadsafe(get_pools(), other_loop).result()[0]
+
+        async def run():
+            pool = get_browser_pool(CONFIGURATION)
+            await close_browser_pool()
+            return pool
+
+        pool = asyncio.run(run())
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
+
+    assert {id(closed_pool) for closed_pool in closed} == {id(other), id(pool)}
+    assert not browser._browser_pools
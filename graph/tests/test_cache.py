@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+from graph.src.agent import cache as cache_module
+from graph.src.agent.cache import ResultCache, cached_research
+
+
+def test_entries_round_trip(tmp_path):
+    cache = ResultCache(tmp_path, ttl=60, max_entries=10)
+    cache.set("key", {"report": "text"})
+
+    assert cache.get("key") == {"report": "text"}
+    assert cache.get("missing") is None
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+def test_expired_entries_are_dropped(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path, ttl=60, max_entries=10)
+    cache.set("key", "value")
+
+    now = cache_module.time.time()
+    monkeypatch.setattr(cache_module.time, "time", lambda: now + 61)
+
+    assert cache.get("key") is None
+    assert not (tmp_path / "key.json").exists()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path, ttl=3600, max_entries=2)
+    cache.set("old", 1)
+    cache.set("used", 2)
+    # Access times are file modification times.
+    os.utime(tmp_path / "old.json", (0, os.path.getmtime(tmp_path / "old.json") - 20))
+    os.utime(tmp_path / "used.json", (0, os.path.getmtime(tmp_path / "used.json") - 10))
+    assert cache.get("old") == 1
+
+    cache.set("new", 3)
+
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["new", "old"]
+
+
+def test_cached_research_runs_the_agent_once(tmp_path):
+    class Agent:
+        runs = 0
+
+        def cache_key(self):
+            return "agent-key"
+
+        async def research(self):
+            self.runs += 1
+            return "context", "report"
+
+    cache = ResultCache(tmp_path, ttl=60, max_entries=10)
+    agent = Agent()
+
+    first = asyncio.run(cached_research(agent, cache))
+    second = asyncio.run(cached_research(agent, cache))
+
+    assert first == second == ("context", "report")
+    assert agent.runs == 1
+
+
+def test_eviction_expires_entries_by_creation_time(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path, ttl=60, max_entries=10)
+    cache.set("fresh", 1)
+    # An entry unused for longer than the TTL is still fresh, and a recently
+    # used one can be expired.
+    os.utime(tmp_path / "fresh.json", (0, 0))
+    created = cache_module.time.time() - 61
+    (tmp_path / "stale.json").write_text(json.dumps({"created": created, "value": 2}))
+    (tmp_path / "corrupt.json").write_text("{")
+
+    cache.evict()
+
+    assert sorted(path.stem for path in tmp_path.glob("*.json")) == ["fresh"]
+    assert cache.get("fresh") == 1
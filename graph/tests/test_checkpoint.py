@@ -0,0 +1,83 @@
+import asyncio
+import operator
+from typing import Annotated, TypedDict
+
+import pytest
+from langgraph.graph import StateGraph
+
+from graph.src.agent.checkpoint import (
+    build_checkpointer,
+    close_checkpointer,
+    resume_thread,
+)
+from graph.src.agent.configuration import Configuration
+
+CONFIG = {"configurable": {"thread_id": "acme"}}
+
+
+class State(TypedDict):
+    visited: Annotated[list[str], operator.add]
+
+
+def pipeline(db: str, calls: list[str], crash: bool):
+    """A discover -> research -> report graph that can crash in `research`."""
+
+    def node(name: str):
+        def run(state: State):
+            calls.append(name)
+            if name == "research" and crash:
+                raise RuntimeError("crashed")
+            return {"visited": [name]}
+
+        return run
+
+    workflow = StateGraph(State)
+    for name in ("discover", "research", "report"):
+        workflow.add_node(name, node(name))
+    workflow.add_edge("__start__", "discover")
+    workflow.add_edge("discover", "research")
+    workflow.add_edge("research", "report")
+    workflow.add_edge("report", "__end__")
+
+    configuration = Configuration(checkpointer="sqlite", checkpoint_db=db)
+    return workflow.compile(checkpointer=build_checkpointer(configuration))
+
+
+def test_crashed_thread_resumes_after_its_last_successful_node(tmp_path):
+    db = str(tmp_path / "checkpoints.sqlite")
+    calls: list[str] = []
+
+    async def crash():
+        crashed = pipeline(db, calls, crash=True)
+        try:
+            with pytest.raises(RuntimeError):
+                await crashed.ainvoke({"visited": []}, CONFIG)
+        finally:
+            await close_checkpointer(crashed.checkpointer)
+
+    async def resume():
+        # A new process, with a new connection to the same database.
+        resumed = pipeline(db, calls, crash=False)
+        try:
+            return await resume_thread(resumed, "acme")
+        finally:
+            await close_checkpointer(resumed.checkpointer)
+
+    asyncio.run(crash())
+    result = asyncio.run(resume())
+
+    assert result["visited"] == ["discover", "research", "report"]
+    # The discovery that completed before the crash is not run again.
+    assert calls == ["discover", "research", "research", "report"]
+
+
+def test_unknown_threads_cannot_be_resumed(tmp_path):
+    async def resume():
+        compiled = pipeline(str(tmp_path / "checkpoints.sqlite"), [], crash=False)
+        try:
+            await resume_thread(compiled, "unknown")
+        finally:
+            await close_checkpointer(compiled.checkpointer)
+
+    with pytest.raises(ValueError, match="No checkpoint found"):
+        asyncio.run(resume())
@@ -0,0 +1,113 @@
+import asyncio
+import itertools
+from types import SimpleNamespace
+
+from langchain_core.embeddings import Embeddings
+
+from graph.src.agent import embedding_cache
+from graph.src.agent.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    VectorStore,
+)
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as its length and first character, counting the calls."""
+
+    def __init__(self):
+        self.embedded: list[str] = []
+
+    def embed_documents(self, texts):
+        self.embedded += texts
+        return [[float(len(text)), float(ord(text[0]))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def cached(tmp_path, max_entries=100):
+    model = CountingEmbeddings()
+    return model, CachedEmbeddings(model, VectorStore(tmp_path, max_entries))
+
+
+def test_only_new_texts_are_embedded(tmp_path):
+    model, embeddings = cached(tmp_path)
+
+    first = embeddings.embed_documents(["alpha", "beta"])
+    second = embeddings.embed_documents(["beta", "gamma", "alpha"])
+
+    assert second == [first[1], [5.0, ord("g")], first[0]]
+    assert model.embedded == ["alpha", "beta", "gamma"]
+    assert (embeddings.hits, embeddings.misses) == (2, 3)
+
+
+def test_queries_and_documents_are_cached_apart(tmp_path):
+    model, embeddings = cached(tmp_path)
+
+    embeddings.embed_documents(["alpha"])
+    embeddings.embed_query("alpha")
+    embeddings.embed_query("alpha")
+
+    assert model.embedded == ["alpha", "alpha"]
+
+
+def test_async_embeddings_share_the_cache(tmp_path):
+    model, embeddings = cached(tmp_path)
+
+    async def embed():
+        await embeddings.aembed_documents(["alpha"])
+        return await embeddings.aembed_documents(["alpha"])
+
+    assert asyncio.run(embed()) == [[5.0, ord("a")]]
+    assert model.embedded == ["alpha"]
+
+
+def test_vectors_persist_across_processes(tmp_path):
+    store = VectorStore(tmp_path, max_entries=100)
+    store.put_many({"a": [1.0, 2.0], "b": [3.0, 4.0]})
+    store.close()
+
+    reopened = VectorStore(tmp_path, max_entries=100)
+
+    assert reopened.get_many(["a", "b", "c"]) == {"a": [1.0, 2.0], "b": [3.0, 4.0]}
+
+
+def test_vector_file_grows_with_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "GROW_ROWS", 4)
+    store = VectorStore(tmp_path, max_entries=10)
+    path = tmp_path / "vectors.f32"
+    row_bytes = 2 * 4
+
+    store.put_many({"a": [1.0, 1.0]})
+    assert path.stat().st_size == 4 * row_bytes
+
+    store.put_many({str(i): [float(i), 0.0] for i in range(5)})
+    assert path.stat().st_size == 8 * row_bytes
+
+    store.put_many({str(i): [float(i), 0.0] for i in range(5, 20)})
+    assert path.stat().st_size == 10 * row_bytes
+    assert store.get_many(["19"]) == {"19": [19.0, 0.0]}
+
+
+def test_least_recently_used_vectors_are_replaced_when_full(tmp_path, monkeypatch):
+    clock = itertools.count(1)
+    monkeypatch.setattr(
+        embedding_cache, "time", SimpleNamespace(time=lambda: next(clock))
+    )
+    store = VectorStore(tmp_path, max_entries=2)
+    store.put_many({"a": [1.0], "b": [2.0]})
+    store.get_many(["a"])
+    store.put_many({"c": [3.0]})
+
+    assert store.get_many(["a", "b", "c"]) == {"a": [1.0], "c": [3.0]}
+
+
+def test_researchers_without_private_memory_keep_their_embeddings(tmp_path):
+    cache = EmbeddingCache(tmp_path, max_entries=10)
+    memory = SimpleNamespace(get_embeddings=CountingEmbeddings)
+    researcher = SimpleNamespace(memory=memory, cfg=None)
+
+    cache.attach(researcher)
+
+    assert not hasattr(memory, "_embeddings")
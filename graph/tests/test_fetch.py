@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+
+from graph.src.agent import fetch
+from graph.src.agent.configuration import Configuration
+from graph.src.agent.fetch import FetchedDocument, needs_javascript, sniff_content_type
+
+CONFIGURATION = Configuration(http_cache=False)
+ARTICLE = "<html><body><main>" + "Users are listed with GET /users. " * 30
+URL = "https://acme.com/docs"
+
+
+@pytest.mark.parametrize(
+    "url, content_type, body, kind",
+    [
+        ("https://a.com/spec", "application/json; charset=utf-8", "{}", "json"),
+        ("https://a.com/spec", "application/x-yaml", "a: 1", "yaml"),
+        ("https://a.com/docs", "text/html", "<html></html>", "html"),
+        ("https://a.com/spec", "text/plain", ' {"openapi": "3.0.0"}', "json"),
+        ("https://a.com/spec.json?v=2", "application/octet-stream", "", "json"),
+        ("https://a.com/spec", "text/plain", "openapi: 3.0.0", "yaml"),
+        ("https://a.com/spec.yml", "", "", "yaml"),
+        ("https://a.com/page", "", "<!DOCTYPE html><html>", "html"),
+        ("https://a.com/notes", "text/plain", "Release notes", "text"),
+    ],
+)
+def test_sniff_content_type(url, content_type, body, kind):
+    assert sniff_content_type(url, content_type, body) == kind
+
+
+def test_needs_javascript():
+    assert needs_javascript('<html><body><div id="root"></div></body></html>')
+    assert needs_javascript("<html><body><p>Loading...</p></body></html>")
+    assert not needs_javascript(ARTICLE)
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    urls = []
+
+    async def render_document(url, configuration):
+        urls.append(url)
+        return FetchedDocument(url=url, content_type="html", body="", rendered=True)
+
+    monkeypatch.setattr(fetch, "render_document", render_document)
+    return urls
+
+
+def serve(monkeypatch, handler):
+    monkeypatch.setattr(
+        fetch,
+        "get_http_client",
+        lambda configuration: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def fetch_document():
+    return asyncio.run(fetch.fetch_document(URL, CONFIGURATION))
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        httpx.Response(200, html='<html><body><div id="root"></div></body></html>'),
+        httpx.Response(200, text=""),
+        httpx.Response(403, text="Checking your browser"),
+        httpx.Response(429),
+    ],
+)
+def test_blocked_and_client_side_pages_are_rendered(monkeypatch, rendered, response):
+    serve(monkeypatch, lambda request: response)
+
+    assert fetch_document().rendered
+    assert rendered == [URL]
+
+
+def test_static_pages_are_not_rendered(monkeypatch, rendered):
+    serve(monkeypatch, lambda request: httpx.Response(200, html=ARTICLE))
+
+    document = fetch_document()
+
+    assert document.content_type == "html"
+    assert not document.rendered
+    assert not rendered
+
+
+@pytest.mark.parametrize("status", [404, 410])
+def test_missing_pages_are_not_rendered(monkeypatch, rendered, status):
+    serve(monkeypatch, lambda request: httpx.Response(status))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        fetch_document()
+    assert not rendered
+    assert asyncio.run(fetch.fetch_html(URL, CONFIGURATION)).startswith(
+        "Error fetching URL"
+    )
+
+
+def test_unreachable_hosts_are_not_rendered(monkeypatch, rendered):
+    def unreachable(request):
+        raise httpx.ConnectError("unreachable")
+
+    serve(monkeypatch, unreachable)
+
+    with pytest.raises(httpx.ConnectError):
+        fetch_document()
+    assert not rendered
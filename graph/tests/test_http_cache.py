@@ -0,0 +1,116 @@
+import asyncio
+import os
+
+import httpx
+import pytest
+
+from graph.src.agent import fetch
+from graph.src.agent.configuration import Configuration
+from graph.src.agent.http_cache import HTTPCache
+
+URL = "https://api.example.com/openapi.json"
+SPEC = '{"openapi": "3.0.0"}'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(
+            200,
+            text=SPEC,
+            headers={"content-type": "application/json", "etag": '"v1"'},
+        )
+
+    def get_http_client(configuration):
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(fetch, "get_http_client", get_http_client)
+    return requests
+
+
+def fetch_document(configuration):
+    return asyncio.run(fetch.fetch_document(URL, configuration))
+
+
+def test_fresh_entries_are_served_without_a_request(tmp_path, server):
+    configuration = Configuration(http_cache_dir=str(tmp_path), http_cache_max_age=60)
+
+    first = fetch_document(configuration)
+    second = fetch_document(configuration)
+
+    assert first.body == second.body == SPEC
+    assert second.content_type == "json"
+    assert len(server) == 1
+
+
+def test_stale_entries_are_revalidated(tmp_path, server):
+    configuration = Configuration(http_cache_dir=str(tmp_path), http_cache_max_age=0)
+    cache = HTTPCache.from_configuration(configuration)
+
+    fetch_document(configuration)
+    fetched_at = cache.get(URL).fetched_at
+    document = fetch_document(configuration)
+
+    assert document.body == SPEC
+    assert server[1].headers["If-None-Match"] == '"v1"'
+    # A 304 restarts the max age of the cached copy.
+    assert cache.get(URL).fetched_at > fetched_at
+
+
+def test_cached_copy_is_used_when_the_network_fails(tmp_path, monkeypatch, server):
+    configuration = Configuration(http_cache_dir=str(tmp_path), http_cache_max_age=0)
+    fetch_document(configuration)
+
+    def unreachable(request):
+        raise httpx.ConnectError("unreachable")
+
+    monkeypatch.setattr(
+        fetch,
+        "get_http_client",
+        lambda configuration: httpx.AsyncClient(
+            transport=httpx.MockTransport(unreachable)
+        ),
+    )
+
+    assert fetch_document(configuration).body == SPEC
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    cache = HTTPCache(tmp_path, max_age=60, max_bytes=2**20)
+    response = httpx.Response(200, text=SPEC)
+    cache.set("https://a.com", response, "json")
+    # Room for two entries but not three, the first of which was used long ago.
+    # Entry sizes vary by a few bytes with the digits of their fetch time.
+    cache.max_bytes = 2.5 * cache._path("https://a.com").stat().st_size
+    os.utime(cache._path("https://a.com"), (0, 0))
+
+    cache.set("https://b.com", response, "json")
+    cache.set("https://c.com", response, "json")
+
+    assert cache.get("https://a.com") is None
+    assert cache.get("https://b.com") is not None
+    assert cache.get("https://c.com") is not None
+
+
+def test_entries_evicted_after_they_are_read_are_fetched_again(
+    tmp_path, monkeypatch, server
+):
+    configuration = Configuration(http_cache_dir=str(tmp_path), http_cache_max_age=60)
+    cache = HTTPCache.from_configuration(configuration)
+    fetch_document(configuration)
+    entry = cache.get(URL)
+    cache._path(URL).unlink()
+
+    assert not cache.touch(entry)
+
+    # Another process evicts the entry between the read and the touch.
+    monkeypatch.setattr(HTTPCache, "get", lambda self, url: entry)
+    assert fetch_document(configuration).body == SPEC
+    assert len(server) == 2
+    assert cache._path(URL).exists()
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from langchain_anthropic import ChatAnthropic
+from langchain_openai import ChatOpenAI
+
+from graph.src.agent.configuration import Configuration
+from graph.src.agent.llm import close_chat_models, get_chat_model, parse_model
+
+CONFIGURATION = Configuration(llm_cache=False)
+
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    yield
+    asyncio.run(close_chat_models())
+
+
+@pytest.mark.parametrize(
+    "model, parsed",
+    [
+        ("gpt-4o-mini", ("openai", "gpt-4o-mini")),
+        ("openai:gpt-4o-search-preview", ("openai", "gpt-4o-search-preview")),
+        (
+            "anthropic:claude-3-7-sonnet-latest",
+            ("anthropic", "claude-3-7-sonnet-latest"),
+        ),
+        ("claude-3-5-haiku-latest", ("anthropic", "claude-3-5-haiku-latest")),
+    ],
+)
+def test_parse_model(model, parsed):
+    assert parse_model(model) == parsed
+
+
+def test_unsupported_providers_are_rejected():
+    with pytest.raises(ValueError, match="mistral"):
+        get_chat_model("mistral:mistral-large", CONFIGURATION)
+
+
+def test_models_are_shared_by_id_and_options():
+    model = get_chat_model("gpt-4o-mini", CONFIGURATION, temperature=0)
+
+    assert get_chat_model("gpt-4o-mini", CONFIGURATION, temperature=0) is model
+    other = get_chat_model("gpt-4o", CONFIGURATION, temperature=0)
+    assert other is not model
+    assert get_chat_model("gpt-4o-mini", CONFIGURATION, temperature=1) is not model
+    # Models with the same pool settings share their connections.
+    assert other.http_async_client is model.http_async_client
+
+
+def test_models_are_built_for_their_provider():
+    model = get_chat_model("anthropic:claude-3-5-haiku-latest", CONFIGURATION)
+
+    assert isinstance(model, ChatAnthropic)
+    assert model.model == "claude-3-5-haiku-latest"
+    assert isinstance(get_chat_model("gpt-4o-mini", CONFIGURATION), ChatOpenAI)
+
+
+def test_each_event_loop_gets_new_clients():
+    async def get():
+        model = get_chat_model("gpt-4o-mini", CONFIGURATION)
+        # Let the clients of the previous loop close.
+        await asyncio.sleep(0)
+        return model
+
+    first = asyncio.run(get())
+    second = asyncio.run(get())
+
+    assert second is not first
+    assert second.http_async_client is not first.http_async_client
+    assert first.http_async_client.is_closed
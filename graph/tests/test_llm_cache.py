@@ -0,0 +1,80 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.outputs import Generation
+
+from graph.src.agent import llm_cache
+from graph.src.agent.llm_cache import SQLiteResponseCache
+
+SONNET = "{'model': 'claude-sonnet', 'temperature': 0}"
+HAIKU = "{'model_name': 'claude-haiku', 'temperature': 0}"
+SEARCH = "{'model_name': 'gpt-4o-search-preview'}"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    # Strictly increasing access times keep the eviction order deterministic.
+    clock = itertools.count(1)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: next(clock)))
+    return SQLiteResponseCache(tmp_path / "cache.sqlite", max_entries_per_model=2)
+
+
+def texts(generations):
+    return [generation.text for generation in generations]
+
+
+def test_responses_are_keyed_by_normalized_prompt(cache):
+    cache.update("Summarize  the\n docs", SONNET, [Generation(text="summary")])
+
+    assert texts(cache.lookup(" Summarize the docs ", SONNET)) == ["summary"]
+    assert cache.lookup("Summarize the docs", HAIKU) is None
+    assert cache.lookup("Summarize other docs", SONNET) is None
+    assert cache.stats() == {
+        "claude-haiku": {"hits": 0, "misses": 1},
+        "claude-sonnet": {"hits": 1, "misses": 1},
+    }
+
+
+def test_least_recently_used_responses_are_evicted_per_model(cache):
+    cache.update("a", SONNET, [Generation(text="a")])
+    cache.update("b", SONNET, [Generation(text="b")])
+    cache.update("h", HAIKU, [Generation(text="h")])
+    cache.lookup("a", SONNET)
+    cache.update("c", SONNET, [Generation(text="c")])
+
+    assert cache.lookup("b", SONNET) is None
+    assert texts(cache.lookup("a", SONNET)) == ["a"]
+    assert texts(cache.lookup("c", SONNET)) == ["c"]
+    assert texts(cache.lookup("h", HAIKU)) == ["h"]
+
+
+def test_search_model_responses_expire(tmp_path, cache):
+    search_cache = SQLiteResponseCache(tmp_path / "search.sqlite", search_ttl=3)
+    search_cache.update("okta openapi", SEARCH, [Generation(text="https://a")])
+    search_cache.update("okta openapi", SONNET, [Generation(text="answer")])
+
+    assert texts(search_cache.lookup("okta openapi", SEARCH)) == ["https://a"]
+    for _ in range(3):
+        llm_cache.time.time()
+
+    assert search_cache.lookup("okta openapi", SEARCH) is None
+    assert texts(search_cache.lookup("okta openapi", SONNET)) == ["answer"]
+    assert search_cache.stats()["gpt-4o-search-preview"] == {"hits": 1, "misses": 1}
+
+
+def test_clear_one_model(cache):
+    cache.update("a", SONNET, [Generation(text="a")])
+    cache.update("h", HAIKU, [Generation(text="h")])
+
+    cache.clear(model="claude-sonnet")
+
+    assert cache.lookup("a", SONNET) is None
+    assert texts(cache.lookup("h", HAIKU)) == ["h"]
+
+
+def test_responses_persist_across_connections(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    SQLiteResponseCache(path).update("a", SONNET, [Generation(text="a")])
+
+    assert texts(SQLiteResponseCache(path).lookup("a", SONNET)) == ["a"]
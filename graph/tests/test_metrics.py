@@ -0,0 +1,125 @@
+import asyncio
+import json
+import uuid
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from graph.src.agent import metrics as metrics_module
+from graph.src.agent.metrics import (
+    NodeMetrics,
+    NodeMetricsHandler,
+    PrometheusRegistry,
+    Stopwatch,
+    emit,
+    model_price,
+)
+
+
+def node_metrics(**tokens):
+    metrics = NodeMetrics(node="pre_research", service_name="acme", run_id="run")
+    for model, (input_tokens, output_tokens) in tokens.items():
+        metrics.tokens[model]["input"] += input_tokens
+        metrics.tokens[model]["output"] += output_tokens
+    return metrics
+
+
+def chat_call(handler, model, usage=None, text="answer"):
+    run_id = uuid.uuid4()
+    handler.on_chat_model_start(
+        {},
+        [[HumanMessage(content="Find the users endpoint")]],
+        run_id=run_id,
+        metadata={"ls_model_name": model},
+    )
+    message = AIMessage(content=text, usage_metadata=usage)
+    handler.on_llm_end(
+        LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id
+    )
+
+
+def test_model_prices_match_the_longest_prefix():
+    assert model_price("gpt-4o-mini-2024-07-18") == (0.15, 0.60)
+    assert model_price("openai:gpt-4o") == (2.50, 10.00)
+    assert model_price("anthropic:claude-3-7-sonnet-latest") == (3.00, 15.00)
+    assert model_price("llama-3") is None
+
+
+def test_cost_is_priced_per_million_tokens():
+    metrics = node_metrics(**{"gpt-4o": (1_000_000, 100_000), "llama-3": (10, 10)})
+
+    assert metrics.cost("gpt-4o") == pytest.approx(2.50 + 1.00)
+    assert metrics.cost("llama-3") == 0.0
+    event = metrics.to_event()
+    assert event["total_cost"] == pytest.approx(3.50)
+    assert event["unpriced_models"] == ["llama-3"]
+
+
+def test_llm_calls_are_counted_per_model():
+    metrics = node_metrics()
+    handler = NodeMetricsHandler(metrics)
+
+    usage = {"input_tokens": 100, "output_tokens": 20, "total_tokens": 120}
+    chat_call(handler, "gpt-4o", usage)
+    chat_call(handler, "gpt-4o", usage)
+    # Without usage, tokens are estimated from the prompt and the answer.
+    chat_call(handler, "gpt-4o-mini", text="x" * 40)
+
+    assert metrics.llm_calls == 3
+    assert metrics.tokens["gpt-4o"] == {"input": 200, "output": 40}
+    assert metrics.tokens["gpt-4o-mini"]["output"] > 0
+    assert metrics.clocks["llm"]._active == 0
+
+
+def test_overlapping_waits_are_counted_once():
+    stopwatch = Stopwatch()
+    stopwatch.start()
+    stopwatch.start()
+    stopwatch.stop()
+    assert stopwatch.total == 0.0
+    stopwatch.stop()
+
+    assert stopwatch.total > 0.0
+
+
+def test_prometheus_counters_add_up_node_executions():
+    registry = PrometheusRegistry()
+    metrics = node_metrics(**{"gpt-4o": (1000, 100)})
+    metrics.wall_time = 2.0
+    metrics.llm_calls = 1
+
+    registry.observe(metrics)
+    registry.observe(metrics)
+    text = registry.render()
+
+    assert "# TYPE research_node_runs_total counter" in text
+    assert 'research_node_runs_total{node="pre_research",status="success"} 2' in text
+    assert 'research_node_seconds_total{kind="wall",node="pre_research"} 4' in text
+    assert (
+        'research_llm_tokens_total{direction="input",model="gpt-4o",'
+        'node="pre_research"} 2000'
+    ) in text
+    assert 'research_llm_cost_usd_total{model="gpt-4o",node="pre_research"} 0.007' in (
+        text
+    )
+
+
+def test_metrics_are_written_when_dispatching_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_module, "registry", PrometheusRegistry())
+    metrics = node_metrics(**{"gpt-4o": (1000, 100)})
+    config = {
+        "configurable": {
+            "artifacts_dir": str(tmp_path / "artifacts"),
+            "metrics_file": str(tmp_path / "metrics.prom"),
+        }
+    }
+
+    # Called outside of a run, there is no parent run to dispatch the event to.
+    asyncio.run(emit(metrics, config))
+
+    (written,) = (tmp_path / "artifacts").rglob("metrics/pre_research.json")
+    assert json.loads(written.read_text())["tokens"] == {
+        "gpt-4o": {"input": 1000, "output": 100}
+    }
+    assert "research_node_runs_total" in (tmp_path / "metrics.prom").read_text()
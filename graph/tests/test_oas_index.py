@@ -0,0 +1,114 @@
+import json
+
+from graph.src.agent.oas_index import OASIndex, load_spec
+
+OPENAPI = {
+    "openapi": "3.0.0",
+    "info": {"title": "Acme"},
+    "servers": [{"url": "https://api.acme.com/"}],
+    "paths": {
+        "/v1/users": {
+            "get": {
+                "operationId": "listUsers",
+                "parameters": [{"name": "cursor", "in": "query"}],
+                "responses": {
+                    "200": {
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "array",
+                                    "items": {"$ref": "#/components/schemas/User"},
+                                }
+                            }
+                        }
+                    }
+                },
+            },
+            "post": {
+                "operationId": "createUser",
+                "requestBody": {
+                    "content": {
+                        "application/json": {
+                            "schema": {"$ref": "#/components/schemas/NewUser"}
+                        }
+                    }
+                },
+            },
+        },
+        "/v1/orgs/{org}/teams": {"get": {"operationId": "listTeams"}},
+        "/v1/projects/{project}/members": {"get": {"operationId": "listMembers"}},
+        "/v1/invoices": {"get": {"operationId": "listInvoices", "tags": ["Billing"]}},
+        "/v1/things": {"get": {"operationId": "listThings", "tags": ["Roles"]}},
+    },
+}
+
+SWAGGER = """swagger: "2.0"
+info:
+  title: Legacy
+host: legacy.example.com
+basePath: /api
+paths:
+  /users:
+    get:
+      operationId: getUsers
+      responses:
+        "200":
+          schema:
+            $ref: "#/definitions/Users"
+"""
+
+
+def operation_ids(endpoints, resource):
+    return [op.operation_id for op in endpoints.operations.get(resource, [])]
+
+
+def test_identity_endpoints_group_operations_by_resource():
+    endpoints = OASIndex.from_spec(OPENAPI).identity_endpoints()
+
+    assert operation_ids(endpoints, "users") == ["listUsers", "createUser"]
+    assert operation_ids(endpoints, "groups") == ["listTeams"]
+    # Falls back to the tags when the path does not name the resource.
+    assert operation_ids(endpoints, "roles") == ["listThings"]
+    assert endpoints.base_url == "https://api.acme.com"
+    assert endpoints.unambiguous
+
+
+def test_resources_nested_under_other_resources_are_ignored():
+    endpoints = OASIndex.from_spec(OPENAPI).identity_endpoints()
+
+    assert "listMembers" not in operation_ids(endpoints, "users")
+    assert "listInvoices" not in sum(
+        (operation_ids(endpoints, resource) for resource in endpoints.operations), []
+    )
+
+
+def test_operation_schemas_and_parameters():
+    endpoints = OASIndex.from_spec(OPENAPI).identity_endpoints()
+    list_users, create_user = endpoints.operations["users"]
+
+    assert list_users.parameters == ["cursor (query)"]
+    assert list_users.response_schema == "array of User"
+    assert create_user.request_schema == "NewUser"
+    assert "- https://api.acme.com/v1/users" in endpoints.render()
+
+
+def test_two_user_lists_are_ambiguous():
+    spec = json.loads(json.dumps(OPENAPI))
+    spec["paths"]["/v2/users"] = {"get": {"operationId": "listUsersV2"}}
+
+    assert not OASIndex.from_spec(spec).identity_endpoints().unambiguous
+
+
+def test_swagger_2_documents_are_indexed():
+    index = OASIndex.from_text(SWAGGER)
+
+    assert index.base_url == "https://legacy.example.com/api"
+    assert index.identity_endpoints().operations["users"][0].response_schema == (
+        "Users"
+    )
+
+
+def test_other_documents_are_not_specs():
+    assert load_spec("<html>API reference</html>") is None
+    assert load_spec('{"name": "not a spec"}') is None
+    assert OASIndex.from_text("openapi: [unclosed") is None
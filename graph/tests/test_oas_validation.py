@@ -0,0 +1,154 @@
+import asyncio
+
+import httpx
+import pytest
+
+from graph.src.agent import oas_validation
+from graph.src.agent.configuration import Configuration
+from graph.src.agent.oas_validation import (
+    Candidate,
+    detect_kind,
+    extract_candidates,
+    validate_candidates,
+)
+
+OPENAPI = '{"openapi": "3.0.0", "paths": {}}'
+SWAGGER = "swagger: '2.0'\npaths: {}\n"
+POSTMAN = '{"info": {"_postman_id": "1", "name": "Acme"}, "item": []}'
+
+
+def urls(candidates):
+    return [(candidate.url, candidate.confidence) for candidate in candidates]
+
+
+def test_candidates_are_read_from_url_fields():
+    markdown = """
+1. "url": "https://acme.com/openapi.json", "confidence_level": 5
+   "explanation": "Linked from https://acme.com/docs."
+2. "url": "https://acme.com/swagger.yaml",
+   "confidence_level": 3
+"""
+
+    assert urls(extract_candidates(markdown)) == [
+        ("https://acme.com/openapi.json", 5),
+        ("https://acme.com/swagger.yaml", 3),
+    ]
+
+
+def test_candidates_are_read_from_the_url_column_of_tables():
+    markdown = """
+| url | confidence_level | notes |
+| --- | --- | --- |
+| https://acme.com/openapi.json | 4 | see https://acme.com/blog |
+| `https://acme.com/postman.json` | 2 | |
+"""
+
+    assert urls(extract_candidates(markdown)) == [
+        ("https://acme.com/openapi.json", 4),
+        ("https://acme.com/postman.json", 2),
+    ]
+
+
+def test_list_items_are_candidates_when_there_are_no_url_fields():
+    markdown = """
+The reference at https://acme.com/docs describes the API.
+
+- https://acme.com/openapi.json (confidence_level: 4)
+- https://acme.com/openapi.json again
+"""
+
+    assert urls(extract_candidates(markdown)) == [("https://acme.com/openapi.json", 4)]
+
+
+@pytest.mark.parametrize(
+    "content_type, body, kind",
+    [
+        ("json", OPENAPI, "openapi"),
+        ("yaml", SWAGGER, "swagger"),
+        ("text", SWAGGER, "swagger"),
+        ("json", POSTMAN, "postman"),
+        ("json", '{"name": "not a spec"}', "other"),
+        ("json", "[1, 2]", "other"),
+        ("html", "<html>openapi: 3.0.0</html>", "html"),
+    ],
+)
+def test_detect_kind(content_type, body, kind):
+    assert detect_kind(content_type, body) == kind
+
+
+def test_unreachable_candidates_rank_last():
+    assert Candidate("a", confidence=5, error="timeout").score == -1
+    assert Candidate("a", confidence=5, status_code=200, kind="html").score == 25
+    assert Candidate("a", confidence=0, status_code=200, kind="openapi").score == 100
+
+
+def test_candidates_are_ranked_on_what_they_serve(monkeypatch, tmp_path):
+    pages = {
+        "/docs": httpx.Response(200, html="<html>API docs</html>"),
+        "/openapi.json": httpx.Response(200, text=OPENAPI),
+        "/postman.json": httpx.Response(200, text=POSTMAN),
+        "/gone.json": httpx.Response(404),
+    }
+    monkeypatch.setattr(
+        oas_validation,
+        "get_http_client",
+        lambda configuration: httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: pages[request.url.path])
+        ),
+    )
+    markdown = "\n".join(
+        f'- "url": "https://acme.com{path}", "confidence_level": {confidence}'
+        for path, confidence in [
+            ("/docs", 5),
+            ("/gone.json", 5),
+            ("/postman.json", 1),
+            ("/openapi.json", 2),
+        ]
+    )
+
+    candidates = asyncio.run(
+        validate_candidates(markdown, Configuration(http_cache_dir=str(tmp_path)))
+    )
+
+    assert [(candidate.url, candidate.kind) for candidate in candidates] == [
+        ("https://acme.com/openapi.json", "openapi"),
+        ("https://acme.com/postman.json", "postman"),
+        ("https://acme.com/docs", "html"),
+        ("https://acme.com/gone.json", ""),
+    ]
+    assert not candidates[3].reachable
+    assert not candidates[2].is_spec
+
+
+def select_url(monkeypatch, candidates):
+    from langchain_core.language_models import FakeListChatModel
+
+    from graph.src.agent import graph
+    from graph.src.agent.state import State
+
+    async def validate(markdown, configuration):
+        return candidates
+
+    monkeypatch.setattr(graph, "validate_candidates", validate)
+    monkeypatch.setattr(
+        graph,
+        "get_chat_model",
+        lambda *args, **kwargs: FakeListChatModel(responses=["https://llm.choice"]),
+    )
+    state = State(input="acme", oas_discovery_urls="- https://acme.com/docs")
+    update = asyncio.run(graph.oas_discovery_url(state, {}))
+    return update["oas_discovery_oas_url"]
+
+
+def test_the_best_spec_is_selected_without_the_llm(monkeypatch):
+    spec = Candidate("https://acme.com/openapi.json", status_code=200, kind="openapi")
+
+    assert select_url(monkeypatch, [spec]) == "https://acme.com/openapi.json"
+
+
+def test_the_llm_selects_when_no_candidate_serves_a_spec(monkeypatch):
+    docs = Candidate(
+        "https://acme.com/docs", confidence=5, status_code=200, kind="html"
+    )
+
+    assert select_url(monkeypatch, [docs]) == "https://llm.choice"
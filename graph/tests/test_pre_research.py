@@ -0,0 +1,85 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from graph.src.agent import utils
+from graph.src.agent.agents import pre_research
+from graph.src.agent.agents.pre_research import PreResearchAgent
+
+# Ten lines of ten tokens each, at four characters a token.
+DOCUMENT = "\n".join(f"GET /v1/resource{line:02d} " + "x" * 21 for line in range(10))
+
+
+class StubResearcher:
+    """Records the query a GPT Researcher was created with."""
+
+    queries: list[str] = []
+
+    def __init__(self, query, **kwargs):
+        self.queries.append(query)
+
+    async def conduct_research(self):
+        return "context"
+
+    async def write_report(self):
+        return "report"
+
+
+class StubChunkModel:
+    """Extracts the first line of each chunk, except the first chunk."""
+
+    def __init__(self):
+        self.chunks: list[str] = []
+
+    async def ainvoke(self, prompt):
+        chunk = prompt.split("<html>\n")[1].split("\n</html>")[0]
+        self.chunks.append(chunk)
+        lines = chunk.splitlines()
+        content = "None" if DOCUMENT.startswith(chunk) else lines[0]
+        return SimpleNamespace(content=content)
+
+
+@pytest.fixture
+def chunk_model(monkeypatch):
+    model = StubChunkModel()
+    StubResearcher.queries = []
+    # Count four characters a token, as when tiktoken is unavailable.
+    monkeypatch.setattr(utils, "_encoding", lambda model: None)
+    monkeypatch.setattr(pre_research, "GPTResearcher", StubResearcher)
+    monkeypatch.setattr(PreResearchAgent, "share_resources", lambda self, r: None)
+    monkeypatch.setattr(pre_research, "get_chat_model", lambda *a, **k: model)
+    return model
+
+
+def research(chunk_tokens: int):
+    agent = PreResearchAgent(None, "acme", DOCUMENT, chunk_tokens=chunk_tokens)
+    return agent, asyncio.run(agent.research())
+
+
+def test_small_documents_are_researched_whole(chunk_model):
+    agent, result = research(chunk_tokens=1000)
+
+    assert result == ("context", "report")
+    assert not chunk_model.chunks
+    assert DOCUMENT in StubResearcher.queries[0]
+
+
+def test_large_documents_are_researched_from_their_chunks(chunk_model):
+    research(chunk_tokens=50)
+    (query,) = StubResearcher.queries
+
+    assert len(chunk_model.chunks) > 1
+    assert "\n".join(chunk_model.chunks) == DOCUMENT
+    # Chunks without identity endpoints are left out of the research.
+    assert chunk_model.chunks[-1].splitlines()[0] in query
+    assert "GET /v1/resource00" not in query
+    assert "None" not in query
+
+
+def test_the_prompt_holds_the_instructions_only(chunk_model):
+    agent = PreResearchAgent(None, "acme", DOCUMENT)
+    other = PreResearchAgent(None, "acme", DOCUMENT + "\nGET /v1/users")
+
+    assert DOCUMENT not in agent.prompt
+    assert agent.cache_key() != other.cache_key()
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+
+import pytest
+
+from graph.src.agent import profiling
+
+CONFIG = {"configurable": {"profile": True, "profile_interval": 0.001}}
+
+
+def spin(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def spin_in_thread() -> None:
+    spin(0.2)
+
+
+async def spin_in_task() -> None:
+    spin(0.2)
+
+
+def spin_elsewhere() -> None:
+    spin(0.2)
+
+
+@pytest.fixture
+def profiles(monkeypatch):
+    written = {}
+
+    async def write_profile(profile, before, after, state, config):
+        written[profile.node] = profile
+
+    monkeypatch.setattr(profiling, "write_profile", write_profile)
+    return written
+
+
+def functions(profile: profiling.NodeProfile) -> set[str]:
+    return {label.split(" ")[0] for stack in profile.stacks for label in stack}
+
+
+def test_gathered_tasks_and_threads_are_attributed_to_the_node(profiles):
+    async def research(state, config):
+        await asyncio.gather(spin_in_task(), asyncio.to_thread(spin_in_thread))
+
+    asyncio.run(profiling.profiled(research)(None, CONFIG))
+
+    assert {"spin_in_task", "spin_in_thread"} <= functions(profiles["research"])
+
+
+def test_concurrent_nodes_get_separate_profiles(profiles):
+    async def research(state, config):
+        await asyncio.to_thread(spin_in_thread)
+
+    async def other(state, config):
+        await asyncio.sleep(0.01)
+        await asyncio.to_thread(spin_elsewhere)
+
+    async def main():
+        await asyncio.gather(
+            profiling.profiled(research)(None, CONFIG),
+            profiling.profiled(other)(None, CONFIG),
+        )
+
+    asyncio.run(main())
+
+    assert "spin_in_thread" in functions(profiles["research"])
+    assert "spin_elsewhere" not in functions(profiles["research"])
+    assert "spin_elsewhere" in functions(profiles["other"])
+    assert "spin_in_thread" not in functions(profiles["other"])
+
+
+def test_tagging_is_removed_after_the_node(profiles):
+    async def research(state, config):
+        await asyncio.to_thread(spin, 0.01)
+
+    asyncio.run(profiling.profiled(research)(None, CONFIG))
+
+    assert profiling.ThreadPoolExecutor.submit is profiling._submit
+    assert not profiling._task_tags
+    assert not profiling._thread_tags
+
+
+def test_tasks_are_attributed_without_the_private_task_map(profiles, monkeypatch):
+    monkeypatch.setattr(profiling, "_current_tasks", None)
+
+    async def research(state, config):
+        await asyncio.gather(spin_in_task())
+
+    asyncio.run(profiling.profiled(research)(None, CONFIG))
+
+    assert "spin_in_task" in functions(profiles["research"])
+
+
+def test_snapshots_are_taken_off_the_event_loop(profiles, monkeypatch):
+    threads = []
+    take_snapshot = tracemalloc.take_snapshot
+
+    def recording_take_snapshot():
+        threads.append(threading.get_ident())
+        return take_snapshot()
+
+    monkeypatch.setattr(tracemalloc, "take_snapshot", recording_take_snapshot)
+
+    async def research(state, config):
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(profiling.profiled(research)(None, CONFIG))
+
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def test_tagging_is_removed_after_a_failed_node(profiles):
+    async def research(state, config):
+        raise RuntimeError("failed")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(profiling.profiled(research)(None, CONFIG))
+
+    assert profiling.ThreadPoolExecutor.submit is profiling._submit
+    assert not profiling._task_tags
+    assert not profiling._loops
+    assert "research" in profiles
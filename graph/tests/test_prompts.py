@@ -0,0 +1,68 @@
+import pytest
+
+from graph.src.agent import utils
+from graph.src.agent.utils import PromptSection, compose_prompt, fit_sections
+
+# Twenty lines of ten tokens each, at four characters a token.
+REPORT = "\n".join(f"{line:02d} " + "x" * 36 for line in range(20))
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Count four characters a token, as when tiktoken is unavailable, so the
+    # budgets below do not depend on the installed encodings.
+    monkeypatch.setattr(utils, "_encoding", lambda model: None)
+
+
+def test_sections_within_budget_are_untouched():
+    sections = fit_sections(
+        [PromptSection("a", REPORT), PromptSection("b", "y" * 40, priority=1)], 1000
+    )
+
+    assert [section.tokens for section in sections] == [
+        utils.count_tokens(REPORT),
+        10,
+    ]
+    assert not any(section.trimmed_tokens for section in sections)
+    assert sections[0].text == REPORT
+
+
+def test_lowest_priority_sections_are_trimmed_first():
+    low = PromptSection("low", REPORT, priority=0)
+    high = PromptSection("high", REPORT, priority=1)
+    budget = 2 * utils.count_tokens(REPORT) - 50
+
+    fit_sections([high, low], budget)
+
+    assert high.text == REPORT and high.trimmed_tokens == 0
+    assert low.trimmed_tokens >= 50
+    assert low.tokens + high.tokens <= budget
+    assert low.text.startswith("00 ")
+    assert "[... truncated" in low.text
+
+
+def test_reserved_tokens_count_against_the_budget():
+    section = PromptSection("report", REPORT)
+
+    fit_sections([section], utils.count_tokens(REPORT), reserved_tokens=60)
+
+    assert section.tokens <= utils.count_tokens(REPORT) - 60
+
+
+def test_compose_prompt_trims_the_pre_research_report():
+    prompt = compose_prompt(
+        pre_research=REPORT,
+        sdk_prompt="Connector for Acme.",
+        dev_req_prompt="Developer requirements.",
+        max_tokens=80,
+        system_prompt="s" * 40,
+    )
+    breakdown = prompt.breakdown()
+
+    assert prompt.text.startswith("Connector for Acme.\n\nDeveloper requirements.")
+    assert prompt.tokens <= 80
+    assert breakdown["budget"] == 80
+    assert breakdown["sections"]["system"] == {"tokens": 10, "trimmed": 0}
+    assert breakdown["sections"]["dev_req_prompt"]["trimmed"] == 0
+    assert breakdown["sections"]["pre_research"]["trimmed"] > 0
+    assert "product_req_prompt" not in breakdown["sections"]
@@ -0,0 +1,85 @@
+import json
+
+from graph.src.agent.fetch import FetchedDocument
+from graph.src.agent.reduction import dedupe_blocks, reduce_document, reduce_html
+
+PAGE = """
+<html>
+  <head><script>track()</script><style>p {}</style></head>
+  <body>
+    <nav><a href="/">Home</a><a href="/docs">Docs</a></nav>
+    <div class="sidebar"><a href="/a">Accounts</a> <a href="/b">Groups</a></div>
+    <div class="sidebar-note">
+      Rate limits: every token is allowed 100 requests per minute.
+    </div>
+    <main>
+      <h1>List users</h1>
+      <p>GET /v1/users returns the users of the tenant.</p>
+      <pre>line 1
+line 2
+line 3
+line 4</pre>
+    </main>
+    <footer>Copyright</footer>
+  </body>
+</html>
+"""
+
+
+def test_reduce_html_keeps_the_main_content():
+    text = reduce_html(PAGE, max_code_lines=2)
+
+    assert text.startswith("List users")
+    assert "GET /v1/users returns the users of the tenant." in text
+    for boilerplate in ("track()", "Home", "Accounts", "Copyright"):
+        assert boilerplate not in text
+
+
+def test_reduce_html_shortens_long_code_samples():
+    text = reduce_html(PAGE, max_code_lines=2)
+
+    assert "line 2\n..." in text
+    assert "line 3" not in text
+
+
+def test_reduce_html_keeps_sidebars_with_content():
+    page = PAGE.replace("<main>", "<section>").replace("</main>", "</section>")
+
+    text = reduce_html(page, max_code_lines=20)
+
+    assert "Rate limits: every token is allowed 100 requests per minute." in text
+    assert "Accounts" not in text
+
+
+def test_dedupe_blocks_drops_repeated_long_lines_only():
+    repeated = "Authentication uses a bearer token in the header."
+    text = "\n".join(["GET", repeated, "GET", repeated.upper()])
+
+    assert dedupe_blocks(text) == "\n".join(["GET", repeated, "GET"])
+
+
+def test_reduce_document_puts_json_values_on_lines():
+    document = FetchedDocument(
+        url="https://a.com/openapi.json",
+        content_type="json",
+        body=json.dumps({"openapi": "3.0.0", "paths": {"/users": {}}}, indent=4),
+    )
+
+    reduced = reduce_document(document)
+
+    assert len(reduced.text.splitlines()) > 1
+    assert '"/users":{}' in reduced.text
+    assert reduced.tokens_after < reduced.tokens_before
+
+
+def test_reduce_document_never_grows_minified_json():
+    spec = {"paths": {f"/v1/r{i}": {"get": {"summary": "x"}} for i in range(50)}}
+    body = json.dumps(spec, separators=(",", ":"))
+    document = FetchedDocument(
+        url="https://a.com/openapi.json", content_type="json", body=body
+    )
+
+    reduced = reduce_document(document)
+
+    assert reduced.tokens_after <= reduced.tokens_before
+    assert json.loads(reduced.text) == spec
@@ -0,0 +1,85 @@
+import json
+
+import httpx
+import pytest
+
+from graph.src.agent.replay import (
+    Cassette,
+    ReplayMiss,
+    redact_url,
+    use_cassette,
+)
+
+URL = "https://api.example.com/search?q=okta&api_key=secret"
+
+
+def prompt(date: str) -> bytes:
+    return json.dumps(
+        {"messages": f"The current date is {date}. Research Okta.", "token": "sk"}
+    ).encode()
+
+
+def client(handler) -> httpx.Client:
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+def unreachable(request):
+    raise AssertionError("replay reached the network")
+
+
+def test_secrets_are_redacted_from_urls():
+    assert redact_url(URL) == ("https://api.example.com/search?q=okta&api_key=REDACTED")
+
+
+def test_requests_match_regardless_of_secrets_and_date():
+    recorded = Cassette.request_key("POST", URL, prompt("May 1, 2025"))
+
+    assert recorded == Cassette.request_key(
+        "post",
+        "https://api.example.com/search?q=okta&api_key=other",
+        prompt("2026-10-18").replace(b'"sk"', b'"other"'),
+    )
+    assert recorded != Cassette.request_key("POST", URL, b"another prompt")
+
+
+def test_recorded_responses_are_replayed_in_order(tmp_path):
+    path = tmp_path / "run.json"
+    answers = iter(["first", "second"])
+
+    with use_cassette(path, mode="record") as cassette:
+        with client(lambda request: httpx.Response(200, text=next(answers))) as c:
+            c.post(URL, content=prompt("May 1, 2025"))
+            c.post(URL, content=prompt("May 1, 2025"))
+    assert cassette.recorded == 2
+    assert "secret" not in path.read_text()
+
+    with use_cassette(path) as cassette:
+        with client(unreachable) as c:
+            texts = [
+                c.post(URL, content=prompt("October 18, 2026")).text for _ in range(3)
+            ]
+
+    # Once every recording is used, repeated requests get the last one.
+    assert texts == ["first", "second", "second"]
+    assert cassette.replayed == 3
+
+
+def test_unrecorded_requests_are_a_miss(tmp_path):
+    with use_cassette(tmp_path / "empty.json") as cassette:
+        with client(unreachable) as c, pytest.raises(ReplayMiss):
+            c.get("https://api.example.com/other")
+    assert cassette.replayed == 0
+
+
+def test_clients_are_restored_after_the_block(tmp_path):
+    send = httpx.Client.send
+
+    with pytest.raises(ReplayMiss):
+        with use_cassette(tmp_path / "empty.json"):
+            with client(unreachable) as c:
+                c.get(URL)
+
+    assert httpx.Client.send is send
+    with pytest.raises(ValueError):
+        with use_cassette(tmp_path / "empty.json", mode="live"):
+            pass
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from graph.src.agent import utils
+from graph.src.agent.agents import sdk_research
+from graph.src.agent.agents.dev_requirement_research import DevReqResearchAgent
+from graph.src.agent.agents.product_requirements import ProductReqResearchAgent
+from graph.src.agent.agents.requirements_research import RequirementsResearchAgent
+from graph.src.agent.agents.sdk_research import SDKResearchAgent
+from graph.src.prompts.sdk_open_api import sdk_spec_prompt
+
+SOURCES = ["https://acme.test/docs/users", "https://acme.test/docs/auth"]
+
+
+class StubResearcher:
+    """Records how each GPT Researcher was created and used."""
+
+    instances: list["StubResearcher"] = []
+
+    def __init__(self, query, role, source_urls, **kwargs):
+        self.query = query
+        self.role = role
+        self.visited_urls = set(source_urls)
+        self.research_calls = 0
+        self.report_kwargs: list[dict] = []
+        self.instances.append(self)
+
+    async def conduct_research(self):
+        self.research_calls += 1
+        return ["Users are listed with GET /v1/users.", "Tokens are bearer."]
+
+    async def write_report(self, **kwargs):
+        self.report_kwargs.append(kwargs)
+        return f"report {len(self.instances)}"
+
+
+@pytest.fixture(autouse=True)
+def researcher(monkeypatch):
+    StubResearcher.instances = []
+    # Count four characters a token, as when tiktoken is unavailable.
+    monkeypatch.setattr(utils, "_encoding", lambda model: None)
+    monkeypatch.setattr(sdk_research, "GPTResearcher", StubResearcher)
+    monkeypatch.setattr(SDKResearchAgent, "share_resources", lambda self, r: None)
+    monkeypatch.setattr(
+        SDKResearchAgent, "cache_report_prompt", lambda self, r, prompt: None
+    )
+
+
+def test_shared_context_is_researched_once():
+    agent = RequirementsResearchAgent(None, "acme", SOURCES, "pre-research")
+
+    context, sources = asyncio.run(agent.research())
+
+    (researcher,) = StubResearcher.instances
+    assert researcher.research_calls == 1
+    assert not researcher.report_kwargs
+    assert context == "Users are listed with GET /v1/users.\n\nTokens are bearer."
+    assert sources == "\n".join(sorted(SOURCES))
+    assert "product_req_prompt" in agent.instruction_prompts()
+    assert "dev_req_prompt" in agent.instruction_prompts()
+
+
+@pytest.mark.parametrize(
+    ("agent_class", "other_class"),
+    [
+        (ProductReqResearchAgent, DevReqResearchAgent),
+        (DevReqResearchAgent, ProductReqResearchAgent),
+    ],
+)
+def test_reports_are_written_from_the_shared_context(agent_class, other_class):
+    shared = RequirementsResearchAgent(None, "acme", SOURCES, "pre-research")
+    context, _ = asyncio.run(shared.research())
+    agent = agent_class(None, "acme", SOURCES, "pre-research", context=context)
+
+    result = asyncio.run(agent.research())
+
+    _, researcher = StubResearcher.instances
+    assert result == (context, "report 2")
+    assert researcher.research_calls == 0
+    assert researcher.report_kwargs == [{"ext_context": context}]
+    # Each report is written against its own slice of the SDK capabilities.
+    assert researcher.role == sdk_spec_prompt(
+        agent_class.sdk_capabilities, agent_class.sdk_excluded_schemas
+    )
+    assert researcher.role != sdk_spec_prompt(
+        other_class.sdk_capabilities, other_class.sdk_excluded_schemas
+    )
+    assert set(agent_class.sdk_capabilities) < set(shared.sdk_capabilities)
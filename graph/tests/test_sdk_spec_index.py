@@ -0,0 +1,112 @@
+import pytest
+
+from graph.src.prompts.sdk_spec_index import SDKSpecIndex
+
+PATHS = """paths:
+  /list_accounts:
+    post:
+      operationId: list_accounts
+      requestBody:
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ListAccountsRequest'
+      responses:
+        '200':
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/ListAccountsResponse'
+        '400':
+          content:
+            application/json:
+              schema:
+                $ref: '#/components/schemas/ErrorResponse'
+  /validate_credentials:
+    post:
+      operationId: validate_credentials
+      requestBody:
+        content:
+          application/json:
+            schema:
+              $ref: '#/components/schemas/ValidateCredentialsRequest'
+"""
+
+COMMON = """components:
+  schemas:
+    ErrorResponse:
+      type: object
+    Pagination:
+      type: object
+"""
+
+MODELS = """    ListAccountsRequest:
+      properties:
+        page:
+          $ref: '#/components/schemas/Pagination'
+    ListAccountsResponse:
+      properties:
+        accounts:
+          items:
+            $ref: '#/components/schemas/FoundAccountData'
+    FoundAccountData:
+      properties:
+        status:
+          $ref: '#/components/schemas/AccountStatus'
+    AccountStatus:
+      type: string
+    ValidateCredentialsRequest:
+      type: object
+"""
+
+
+@pytest.fixture
+def index():
+    return SDKSpecIndex.from_sections(PATHS, MODELS, common=(COMMON,))
+
+
+def test_referenced_schemas_are_closed_over_in_spec_order(index):
+    assert index.schemas_for(["list_accounts"]) == [
+        "Pagination",
+        "ListAccountsRequest",
+        "ListAccountsResponse",
+        "FoundAccountData",
+        "AccountStatus",
+    ]
+
+
+def test_envelope_schemas_are_only_included_through_models(index):
+    # ErrorResponse is only referenced by the path itself, and Pagination is
+    # referenced by a model of the capability.
+    assert index.common == {"ErrorResponse", "Pagination"}
+    assert index.schemas_for(["validate_credentials"]) == ["ValidateCredentialsRequest"]
+
+
+def test_excluded_schemas_drop_what_only_they_reference(index):
+    schemas = index.schemas_for(["list_accounts"], excluded=["FoundAccountData"])
+
+    assert schemas == ["Pagination", "ListAccountsRequest", "ListAccountsResponse"]
+
+
+def test_unknown_capabilities_are_rejected(index):
+    with pytest.raises(ValueError, match="list_users"):
+        index.schemas_for(["list_users"])
+
+
+def test_common_sections_can_be_any_iterable():
+    index = SDKSpecIndex.from_sections(
+        PATHS, MODELS, common=(section for section in [COMMON])
+    )
+
+    assert index.common == {"ErrorResponse", "Pagination"}
+    assert "Pagination" in index.schemas
+
+
+def test_render_only_the_requested_capabilities(index):
+    rendered = index.render_capabilities(["validate_credentials"])
+
+    assert rendered.startswith("paths:\n  /validate_credentials:")
+    assert "/list_accounts" not in rendered
+    assert index.render_schemas(["AccountStatus"]) == (
+        "    AccountStatus:\n      type: string"
+    )
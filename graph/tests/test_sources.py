@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from graph.src.agent import sources
+from graph.src.agent.configuration import Configuration
+from graph.src.agent.sources import SourceStore, normalize_url
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://Docs.Example.com/api/",
+        "https://docs.example.com:443/api",
+        "https://docs.example.com/api#authentication",
+        "https://docs.example.com/api?utm_source=google",
+        " https://docs.example.com/api ",
+    ],
+)
+def test_normalize_url_spellings_of_the_same_page(url):
+    assert normalize_url(url) == "https://docs.example.com/api"
+
+
+def test_normalize_url_sorts_the_query_and_keeps_other_ports():
+    assert (
+        normalize_url("http://example.com:8080/?b=2&a=1")
+        == "http://example.com:8080/?a=1&b=2"
+    )
+
+
+def test_concurrent_browses_scrape_each_page_once():
+    store = SourceStore()
+    scraped = []
+
+    async def scrape(urls):
+        scraped.extend(urls)
+        await asyncio.sleep(0.01)
+        return [{"url": url, "raw_content": f"content of {url}"} for url in urls]
+
+    async def main():
+        return await asyncio.gather(
+            store.browse(["https://a.com/", "https://b.com"], scrape),
+            store.browse(["https://A.com", "https://c.com"], scrape),
+        )
+
+    (first_scraped, first_known), (second_scraped, second_known) = asyncio.run(main())
+
+    assert sorted(scraped) == ["https://a.com/", "https://b.com", "https://c.com"]
+    assert [page["url"] for page in second_scraped] == ["https://c.com"]
+    assert (store.hits, store.misses) == (1, 3)
+
+
+def test_source_stores_are_bounded_and_released(monkeypatch):
+    monkeypatch.setattr(sources, "_source_stores", sources.OrderedDict())
+    monkeypatch.setattr(sources, "MAX_SOURCE_STORES", 2)
+    configuration = Configuration(source_store_persistent=False)
+
+    first = sources.get_source_store(configuration, "first")
+    sources.get_source_store(configuration, "second")
+    assert sources.get_source_store(configuration, "first") is first
+    sources.get_source_store(configuration, "third")
+    assert list(sources._source_stores) == ["first", "third"]
+
+    sources.release_source_store("first")
+    assert list(sources._source_stores) == ["third"]